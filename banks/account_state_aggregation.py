@@ -0,0 +1,170 @@
+from collections import namedtuple
+from typing import Iterable
+
+from banks.account_state_index import get_account_key
+from banks.field_extraction import FieldExtractionPlan
+from banks.records import BankAccountStateRecord
+
+# a statement whose balance doesn't follow from the amounts: its own summary
+# ('saldo_anterior + depositos - retiros != saldo_final', or 'saldo_anterior - depositos
+# + retiros != saldo_final' for a credit card, previous_record is None)
+# or the previous statement of the account ('saldo_final' != next 'saldo_anterior')
+BalanceIssue = namedtuple("BalanceIssue", ["previous_record", "record", "difference"])
+
+
+class BankAccountAmountsAggregation:
+    """
+    Summary amounts of the statements packed into NumPy arrays, one row per
+    statement sorted by account (see 'get_account_key') and period:
+
+        account_codes:  int32 (index in 'account_keys')
+        periodo_inicio: datetime64[D]
+        is_credit:      bool (the balance of a credit card is what is owed)
+        <amount field>: int64, in cents (see FieldExtractionPlan.AMOUNT_FIELDS)
+        has_<amount field>: bool, False when the amount was not found (the amount is 0)
+
+    The aggregations are computed over the whole arrays (no Python loop over
+    the statements): the per-account operations use the account boundaries
+    of the sorted rows.
+    """
+
+    AMOUNT_FIELDS = FieldExtractionPlan.AMOUNT_FIELDS
+
+    def __init__(self, records: Iterable[BankAccountStateRecord]):
+        import numpy as np
+
+        self.records = sorted(
+            records,
+            key=lambda record: (
+                tuple("" if value is None else value for value in get_account_key(record)),
+                record.periodo_inicio,
+            ),
+        )  # type: list[BankAccountStateRecord]
+        self.account_keys = []  # type: list[tuple]
+        account_codes_by_key = {}
+        account_codes = []
+        for record in self.records:
+            account_key = get_account_key(record)
+            if account_key not in account_codes_by_key:
+                account_codes_by_key[account_key] = len(self.account_keys)
+                self.account_keys.append(account_key)
+            account_codes.append(account_codes_by_key[account_key])
+        self.account_codes = np.array(account_codes, dtype=np.int32)
+        self.periodo_inicio = np.array(
+            [record.periodo_inicio.date() for record in self.records], dtype="datetime64[D]"
+        )
+        self.is_credit = np.array([record.is_credit_account() for record in self.records], dtype=bool)
+        self.amounts = {}
+        self.has_amounts = {}
+        for amount_field_name in self.AMOUNT_FIELDS:
+            amount_values = [getattr(record, amount_field_name) for record in self.records]
+            self.has_amounts[amount_field_name] = np.array(
+                [amount_value is not None for amount_value in amount_values], dtype=bool
+            )
+            self.amounts[amount_field_name] = np.array(
+                [amount_value or 0 for amount_value in amount_values], dtype=np.int64
+            )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _get_is_first_of_account(self):
+        import numpy as np
+
+        is_first_of_account = np.ones(len(self), dtype=bool)
+        is_first_of_account[1:] = self.account_codes[1:] != self.account_codes[:-1]
+        return is_first_of_account
+
+    def _get_net_amounts(self):
+        """
+        Get how much the balance of each statement changed with its 'depositos'
+        and 'retiros' (the deposits pay off the balance of a credit card, the
+        charges add to it).
+        """
+        import numpy as np
+
+        net_amounts = self.amounts["depositos"] - self.amounts["retiros"]
+        return np.where(self.is_credit, -net_amounts, net_amounts)
+
+    def get_monthly_totals(self) -> dict[tuple, dict[str, dict[str, int]]]:
+        """
+        Get the totals of 'depositos'/'retiros' (in cents) by account and month
+        (of 'periodo_inicio'): {account_key: {'YYYY-MM': {'depositos': .., 'retiros': ..}}}
+        """
+        import numpy as np
+
+        months, month_codes = np.unique(self.periodo_inicio.astype("datetime64[M]"), return_inverse=True)
+        # one cell per (account, month)
+        cell_codes = self.account_codes.astype(np.int64) * len(months) + month_codes
+        cells, cell_inverse = np.unique(cell_codes, return_inverse=True)
+        totals = {}
+        for amount_field_name in ("depositos", "retiros"):
+            amount_totals = np.zeros(len(cells), dtype=np.int64)
+            np.add.at(amount_totals, cell_inverse, self.amounts[amount_field_name])
+            totals[amount_field_name] = amount_totals
+
+        monthly_totals = {}
+        for cell_index, cell_code in enumerate(cells.tolist()):
+            account_code, month_code = divmod(cell_code, len(months))
+            monthly_totals.setdefault(self.account_keys[account_code], {})[str(months[month_code])] = {
+                amount_field_name: int(amount_totals[cell_index])
+                for amount_field_name, amount_totals in totals.items()
+            }
+        return monthly_totals
+
+    def get_running_balances(self):
+        """
+        Get the balance (in cents) expected at the end of each statement: the
+        'saldo_anterior' of the first statement of its account, plus the
+        'depositos' minus the 'retiros' of all its statements so far (minus
+        the 'depositos' plus the 'retiros' for a credit card).
+        """
+        import numpy as np
+
+        net_amounts = self._get_net_amounts()
+        cumulative_net_amounts = np.cumsum(net_amounts)
+        is_first_of_account = self._get_is_first_of_account()
+        first_indexes = np.flatnonzero(is_first_of_account)
+        # index of the first statement of the account of each row
+        account_first_indexes = first_indexes[np.cumsum(is_first_of_account) - 1]
+        account_net_amounts = (
+            cumulative_net_amounts
+            - cumulative_net_amounts[account_first_indexes]
+            + net_amounts[account_first_indexes]
+        )
+        return self.amounts["saldo_anterior"][account_first_indexes] + account_net_amounts
+
+    def get_balance_issues(self) -> list[BalanceIssue]:
+        """
+        Get the statements whose balances don't add up (only with the amounts found).
+        """
+        import numpy as np
+
+        has_amounts = self.has_amounts
+        summary_differences = self.amounts["saldo_anterior"] + self._get_net_amounts() - self.amounts["saldo_final"]
+        has_summary = (
+            has_amounts["saldo_anterior"] & has_amounts["depositos"]
+            & has_amounts["retiros"] & has_amounts["saldo_final"]
+        )
+        summary_issue_indexes = np.flatnonzero(has_summary & (summary_differences != 0))
+
+        # the 'saldo_anterior' of a statement is the 'saldo_final' of the previous one of the account
+        continuity_differences = self.amounts["saldo_anterior"][1:] - self.amounts["saldo_final"][:-1]
+        has_continuity = (
+            ~self._get_is_first_of_account()[1:]
+            & has_amounts["saldo_anterior"][1:]
+            & has_amounts["saldo_final"][:-1]
+        )
+        continuity_issue_indexes = np.flatnonzero(has_continuity & (continuity_differences != 0)) + 1
+
+        balance_issues = [
+            (index, BalanceIssue(None, self.records[index], int(summary_differences[index])))
+            for index in summary_issue_indexes.tolist()
+        ] + [
+            (
+                index,
+                BalanceIssue(self.records[index - 1], self.records[index], int(continuity_differences[index - 1])),
+            )
+            for index in continuity_issue_indexes.tolist()
+        ]
+        return [balance_issue for _, balance_issue in sorted(balance_issues, key=lambda item: item[0])]
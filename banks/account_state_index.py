@@ -0,0 +1,258 @@
+import bisect
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Iterator, Union
+
+from banks.records import BankAccountStateRecord
+
+# consecutive statements of an account that do not meet:
+# 'gap' (days without a statement) or 'overlap' (days in both statements)
+PeriodIssue = namedtuple("PeriodIssue", ["kind", "previous_record", "next_record", "days"])
+
+PERIOD_ISSUE_GAP = "gap"
+PERIOD_ISSUE_OVERLAP = "overlap"
+
+
+def _as_date(value: Union[date, datetime]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def get_account_key(bank_account_state_record: BankAccountStateRecord) -> tuple:
+    """
+    Key of the account of a statement: (bank name, account type name, account number).
+    """
+    return (
+        bank_account_state_record.get_bank_name(),
+        bank_account_state_record.get_account_type_name(),
+        bank_account_state_record.get_account_number(),
+    )
+
+
+class BankAccountStateIndex:
+    """
+    Secondary indexes of the bank account states loaded, maintained on each
+    add/remove so the queries never walk all the records:
+
+    - by bank name, account number and account type: {key: {unique hash: record}}
+      (insertion ordered, like the records themselves)
+    - by period: lists sorted by 'periodo_inicio', for all the records and per
+      account (see 'get_account_key'), searched with 'bisect'.
+
+    The statements of a bank cover about a month, so the records that cover
+    a date can only start within the longest period of the records indexed
+    before that date: the interval queries bisect that window of starts and
+    filter the ends, O(log n + k) with k the statements in the window. The
+    lengths of the periods are counted, so the longest one shrinks back when
+    its records are removed.
+    """
+
+    def __init__(self):
+        # {unique hash: (periodo inicio, sequence, unique hash)}
+        self._period_entries = {}
+        self._records = {}  # type: dict[str, BankAccountStateRecord]
+        self._records_by_bank_name = {}  # type: dict[str, dict[str, BankAccountStateRecord]]
+        self._records_by_account_number = {}  # type: dict[str, dict[str, BankAccountStateRecord]]
+        self._records_by_account_type = {}  # type: dict[str, dict[str, BankAccountStateRecord]]
+        # sorted [(periodo inicio, sequence, unique hash)]
+        self._periods = []  # type: list[tuple[date, int, str]]
+        self._periods_by_account = {}  # type: dict[tuple, list[tuple[date, int, str]]]
+        # the sequence keeps the insertion order of the records with the same 'periodo_inicio'
+        self._sequence = 0
+        # {days of a period: records with it}
+        self._period_days_counts = Counter()  # type: Counter[int]
+        self._max_period_days = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, unique_hash: str) -> bool:
+        return unique_hash in self._records
+
+    @staticmethod
+    def _add_to_group(groups: dict, key, unique_hash: str, record: BankAccountStateRecord):
+        if key is not None:
+            groups.setdefault(key, {})[unique_hash] = record
+
+    @staticmethod
+    def _remove_from_group(groups: dict, key, unique_hash: str):
+        group = groups.get(key)
+        if group is not None:
+            group.pop(unique_hash, None)
+            if not group:
+                del groups[key]
+
+    def add(self, record: BankAccountStateRecord):
+        unique_hash = record.get_unique_hash_file_value()
+        if unique_hash in self._records:
+            self.remove(unique_hash)
+        self._records[unique_hash] = record
+        self._add_to_group(self._records_by_bank_name, record.get_bank_name(), unique_hash, record)
+        self._add_to_group(self._records_by_account_number, record.get_account_number(), unique_hash, record)
+        self._add_to_group(self._records_by_account_type, record.get_account_type_name(), unique_hash, record)
+
+        period_entry = (_as_date(record.periodo_inicio), self._sequence, unique_hash)
+        self._sequence += 1
+        self._period_entries[unique_hash] = period_entry
+        bisect.insort(self._periods, period_entry)
+        bisect.insort(self._periods_by_account.setdefault(get_account_key(record), []), period_entry)
+        period_days = self._get_period_days(record)
+        self._period_days_counts[period_days] += 1
+        self._max_period_days = max(self._max_period_days, period_days)
+
+    def remove(self, unique_hash: str) -> Union[BankAccountStateRecord, None]:
+        record = self._records.pop(unique_hash, None)
+        if record is None:
+            return None
+        self._remove_from_group(self._records_by_bank_name, record.get_bank_name(), unique_hash)
+        self._remove_from_group(self._records_by_account_number, record.get_account_number(), unique_hash)
+        self._remove_from_group(self._records_by_account_type, record.get_account_type_name(), unique_hash)
+
+        period_entry = self._period_entries.pop(unique_hash)
+        del self._periods[bisect.bisect_left(self._periods, period_entry)]
+        account_key = get_account_key(record)
+        account_periods = self._periods_by_account[account_key]
+        del account_periods[bisect.bisect_left(account_periods, period_entry)]
+        if not account_periods:
+            del self._periods_by_account[account_key]
+
+        period_days = self._get_period_days(record)
+        self._period_days_counts[period_days] -= 1
+        if not self._period_days_counts[period_days]:
+            del self._period_days_counts[period_days]
+            if period_days == self._max_period_days:
+                # only a few distinct lengths (the statements cover about a month)
+                self._max_period_days = max(self._period_days_counts, default=0)
+        return record
+
+    @staticmethod
+    def _get_period_days(record: BankAccountStateRecord) -> int:
+        return (_as_date(record.periodo_termino) - _as_date(record.periodo_inicio)).days
+
+    def _iter_period_window(
+        self,
+        periods: list[tuple[date, int, str]],
+        start_date: Union[date, None],
+        end_date: Union[date, None],
+    ) -> Iterator[BankAccountStateRecord]:
+        """
+        Records of the sorted periods that overlap [start_date, end_date] (None: no limit).
+        """
+        start_index = 0
+        if start_date is not None:
+            # a record that ends after 'start_date' starts after this one
+            first_start_date = start_date - timedelta(days=self._max_period_days)
+            start_index = bisect.bisect_left(periods, (first_start_date,))
+        end_index = len(periods)
+        if end_date is not None:
+            end_index = bisect.bisect_right(periods, (end_date, self._sequence))
+        for _, _, unique_hash in periods[start_index:end_index]:
+            record = self._records[unique_hash]
+            if start_date is None or _as_date(record.periodo_termino) >= start_date:
+                yield record
+
+    def get_records(self) -> list[BankAccountStateRecord]:
+        return list(self._records.values())
+
+    def get_records_ordered_by_date(self) -> list[BankAccountStateRecord]:
+        return [self._records[unique_hash] for _, _, unique_hash in self._periods]
+
+    def get_records_ordered_by_bank_name(self) -> list[BankAccountStateRecord]:
+        return [
+            record
+            for bank_name in sorted(self._records_by_bank_name)
+            for record in self._records_by_bank_name[bank_name].values()
+        ]
+
+    def get_records_by_bank_name(self) -> dict[str, list[BankAccountStateRecord]]:
+        return {
+            bank_name: list(records.values())
+            for bank_name, records in self._records_by_bank_name.items()
+        }
+
+    def get_records_of_bank(self, bank_name: str) -> list[BankAccountStateRecord]:
+        return list(self._records_by_bank_name.get(bank_name, {}).values())
+
+    def get_records_of_account_number(self, account_number: str) -> list[BankAccountStateRecord]:
+        return list(self._records_by_account_number.get(account_number, {}).values())
+
+    def get_records_of_account_type(self, account_type_name: str) -> list[BankAccountStateRecord]:
+        """
+        Records of an account type name: 'debito' or 'credito'.
+        """
+        return list(self._records_by_account_type.get(account_type_name, {}).values())
+
+    def get_account_keys(self) -> list[tuple]:
+        return list(self._periods_by_account)
+
+    def get_records_covering_date(self, covered_date: Union[date, datetime]) -> list[BankAccountStateRecord]:
+        """
+        Records whose period (periodo_inicio -> periodo_termino) includes the date.
+        """
+        covered_date = _as_date(covered_date)
+        return list(self._iter_period_window(self._periods, covered_date, covered_date))
+
+    def get_account_records(
+        self,
+        account_key: tuple,
+        start_date: Union[date, datetime, None] = None,
+        end_date: Union[date, datetime, None] = None,
+    ) -> list[BankAccountStateRecord]:
+        """
+        Records of an account (see 'get_account_key') ordered by date,
+        only the ones whose period overlaps [start_date, end_date] if given.
+        """
+        return list(
+            self._iter_period_window(
+                self._periods_by_account.get(account_key, []),
+                _as_date(start_date) if start_date is not None else None,
+                _as_date(end_date) if end_date is not None else None,
+            )
+        )
+
+    @staticmethod
+    def _get_period_issue(
+        previous_record: BankAccountStateRecord,
+        next_record: BankAccountStateRecord,
+    ) -> Union[PeriodIssue, None]:
+        # the next period should start the day after the previous one ends
+        days = (_as_date(next_record.periodo_inicio) - _as_date(previous_record.periodo_termino)).days - 1
+        if days > 0:
+            return PeriodIssue(PERIOD_ISSUE_GAP, previous_record, next_record, days)
+        elif days < 0:
+            return PeriodIssue(PERIOD_ISSUE_OVERLAP, previous_record, next_record, -days)
+        return None
+
+    def get_account_neighbors(
+        self,
+        record: BankAccountStateRecord,
+    ) -> tuple[Union[BankAccountStateRecord, None], Union[BankAccountStateRecord, None]]:
+        """
+        Previous and next statements of the same account (None if there is none).
+        """
+        account_periods = self._periods_by_account[get_account_key(record)]
+        index = bisect.bisect_left(account_periods, self._period_entries[record.get_unique_hash_file_value()])
+        previous_record = self._records[account_periods[index - 1][2]] if index > 0 else None
+        next_record = self._records[account_periods[index + 1][2]] if index + 1 < len(account_periods) else None
+        return previous_record, next_record
+
+    def get_period_issues_of_record(self, record: BankAccountStateRecord) -> list[PeriodIssue]:
+        """
+        Gap/overlap of a statement with its previous and next statements, O(log n).
+        """
+        previous_record, next_record = self.get_account_neighbors(record)
+        period_issues = [
+            self._get_period_issue(previous_record, record) if previous_record else None,
+            self._get_period_issue(record, next_record) if next_record else None,
+        ]
+        return [period_issue for period_issue in period_issues if period_issue]
+
+    def get_account_period_issues(self, account_key: tuple) -> list[PeriodIssue]:
+        """
+        Gaps/overlaps between the consecutive statements of an account.
+        """
+        account_records = self.get_account_records(account_key)
+        period_issues = [
+            self._get_period_issue(previous_record, next_record)
+            for previous_record, next_record in zip(account_records, account_records[1:])
+        ]
+        return [period_issue for period_issue in period_issues if period_issue]
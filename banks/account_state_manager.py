@@ -1,16 +1,35 @@
+import asyncio
 import os
-import shutil
-from datetime import datetime
-
-from banks.base_classes import BankAccountStatePDF
-from banks.bbva import BbvaDebitPDF, BbvaCreditPDF
-from banks.citibanamex import CitiBanamexDebitPDF, CitiBanamexCreditCostcoPDF
-from banks.inbursa import InbursaDebitPDF
-from banks.santander import SantanderDebitPDF, SantanderDebitImagePDF
-from pdf_utils.base import get_pdf_files
+from datetime import date, datetime
+from concurrent.futures import Future
+from typing import Iterable, Union
+
+# the bank modules register their classes on import
+import banks.bbva  # noqa: F401
+import banks.citibanamex  # noqa: F401
+import banks.inbursa  # noqa: F401
+import banks.santander  # noqa: F401
+from banks.account_state_aggregation import BankAccountAmountsAggregation
+from banks.account_state_index import BankAccountStateIndex, PeriodIssue
+from banks.records import BankAccountStateRecord
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.run_manifest import RunManifest
+from banks.statement_catalog import StatementCatalog
+from banks.transaction_store import TransactionStore, TransactionTable
+from common.duplicate_file_detector import DuplicateFileDetector
+from common.file_sync import DirectorySync, is_file_synced, sync_file
+from common.amounts import format_amount_in_cents
+from common.instrumentation import PipelineInstrumentation
+from common.logging import flush_logs, get_logger
+from common.report_manager import ReportManager
+from common.utils import get_file_stat_signature
+from pdf_utils.base import PdfFileFinder
 from pdf_utils.parsers import PdfParseManager
 from settings import get_tmp_dir, get_bank_account_after_date_config, is_debit_account_type_enabled, \
-    is_credit_account_type_enabled
+    is_credit_account_type_enabled, get_output_link_mode, get_output_io_workers, is_transactions_extraction_enabled, \
+    get_pipeline_queue_size
+
+logger = get_logger(__name__)
 
 
 class PDFBankAccountStateManager:
@@ -21,26 +40,64 @@ class PDFBankAccountStateManager:
     _SEPARATOR = "="*80
     _SEPARATOR_SMALL = "-"*80
 
-    OUTPUT_DIR = f"{get_tmp_dir()}/_PDFBankAccountStateManager"
+    OUTPUT_DIR_NAME = "_PDFBankAccountStateManager"
+    RUN_MANIFEST_FILE_PATH = "_RunManifest/run_manifest.json"
+    STATEMENT_CATALOG_FILE_PATH = "_StatementCatalog/statement_catalog.sqlite3"
+    TRANSACTION_STORE_DIR_NAME = "_Transactions"
+    REPORT_FILE_PATH = "_Reports/bank_accounts_report.json"
+    # files submitted to the process pool per worker, ahead of the merge
+    PARALLEL_TASKS_PER_JOB = 4
 
     def __init__(self):
         """
         Constructor for the PDFBankAccountStateManager class.
         """
-        self.bank_accounts_loaded = {}  # type: dict[str, BankAccountStatePDF]
-        self.bank_accounts_to_ignore = []  # type: list[BankAccountStatePDF]
+        self.bank_accounts_loaded = {}  # type: dict[str, BankAccountStateRecord]
+        # secondary indexes of 'bank_accounts_loaded' (by bank, account, type and period)
+        self.bank_accounts_index = BankAccountStateIndex()
+        self.bank_accounts_to_ignore = []  # type: list[BankAccountStateRecord]
         self.after_date_config = get_bank_account_after_date_config()  # type: datetime.date
         self.pdf_parser_manager = PdfParseManager()
+        self.instrumentation = PipelineInstrumentation()
+        self.duplicate_file_detector = DuplicateFileDetector()
+        bank_account_state_class_names = [
+            bank_account_state_class.__name__
+            for bank_account_state_class in BANK_ACCOUNT_STATE_REGISTRY.get_registered_classes()
+        ]
+        self.run_manifest = RunManifest(
+            f"{get_tmp_dir()}/{self.RUN_MANIFEST_FILE_PATH}",
+            bank_account_state_class_names,
+        )
+        # records of the PDF files parsed (by file hash), so they are not parsed again
+        self.statement_catalog = StatementCatalog(
+            f"{get_tmp_dir()}/{self.STATEMENT_CATALOG_FILE_PATH}",
+            bank_account_state_class_names,
+        )
+        self.transaction_store = TransactionStore(f"{get_tmp_dir()}/{self.TRANSACTION_STORE_DIR_NAME}")
+        # {previous PDF file path: new PDF file path} of the files auto-renamed
+        self.renamed_pdf_file_paths = {}  # type: dict[str, str]
+
+    @classmethod
+    def get_output_dir(cls) -> str:
+        return f"{get_tmp_dir()}/{cls.OUTPUT_DIR_NAME}"
 
     def _load_bank_account_state_object(
         self,
-        bank_account_state_object: BankAccountStatePDF
+        bank_account_state_object: BankAccountStateRecord
     ):
         """
-        Load the BankAccountStatePDF object into the bank_accounts_loaded dictionary.
+        Load the BankAccountStateRecord into the bank_accounts_loaded dictionary.
         """
         hash_file_value = bank_account_state_object.get_unique_hash_file_value()
         self.bank_accounts_loaded[hash_file_value] = bank_account_state_object
+        self.bank_accounts_index.add(bank_account_state_object)
+
+    def _unload_bank_account_state_object(self, hash_file_value: str):
+        """
+        Remove a BankAccountStateRecord from the bank_accounts_loaded dictionary.
+        """
+        del self.bank_accounts_loaded[hash_file_value]
+        self.bank_accounts_index.remove(hash_file_value)
 
     def get_bank_accounts_loaded_ordered(
         self,
@@ -48,31 +105,48 @@ class PDFBankAccountStateManager:
         by_date: bool = False,
     ):
         if by_bank_name:
-            return sorted(
-                self.bank_accounts_loaded.values(),
-                key=lambda x: x.get_bank_name()
-            )
+            return self.bank_accounts_index.get_records_ordered_by_bank_name()
         elif by_date:
-            return sorted(
-                self.bank_accounts_loaded.values(),
-                key=lambda x: x.get_periodo_inicio()
-            )
+            return self.bank_accounts_index.get_records_ordered_by_date()
         else:
             return self.bank_accounts_loaded.values()
 
-    def get_bank_accounts_loaded_by_bank_name(self) -> dict[str, list[BankAccountStatePDF]]:
+    def get_bank_accounts_loaded_by_bank_name(self) -> dict[str, list[BankAccountStateRecord]]:
         """
         Get the bank accounts loaded by bank name.
         """
-        bank_accounts_by_bank = {}
-        for bank_account_obj_id, bank_account_obj in self.bank_accounts_loaded.items():
-            bank_name = bank_account_obj.get_bank_name()
-            if bank_name not in bank_accounts_by_bank.keys():
-                bank_accounts_by_bank[bank_name] = []
-            bank_accounts_by_bank[bank_name].append(bank_account_obj)
-        return bank_accounts_by_bank
+        return self.bank_accounts_index.get_records_by_bank_name()
+
+    def get_bank_accounts_covering_date(self, covered_date: datetime) -> list[BankAccountStateRecord]:
+        """
+        Get the bank accounts loaded whose period includes the date.
+        """
+        return self.bank_accounts_index.get_records_covering_date(covered_date)
 
-    def bank_account_state_object_already_loaded(self, bank_account_state_object: BankAccountStatePDF):
+    def get_bank_accounts_of_account(
+        self,
+        account_key: tuple,
+        start_date: datetime = None,
+        end_date: datetime = None,
+    ) -> list[BankAccountStateRecord]:
+        """
+        Get the bank accounts loaded of an account (see 'get_account_key'),
+        ordered by date and optionally only the ones between the dates.
+        """
+        return self.bank_accounts_index.get_account_records(account_key, start_date, end_date)
+
+    def get_bank_accounts_period_issues(self) -> dict[tuple, list[PeriodIssue]]:
+        """
+        Get the gaps/overlaps between the consecutive statements of each account.
+        """
+        period_issues_by_account = {}
+        for account_key in self.bank_accounts_index.get_account_keys():
+            period_issues = self.bank_accounts_index.get_account_period_issues(account_key)
+            if period_issues:
+                period_issues_by_account[account_key] = period_issues
+        return period_issues_by_account
+
+    def bank_account_state_object_already_loaded(self, bank_account_state_object: BankAccountStateRecord):
         hash_file_value = bank_account_state_object.get_unique_hash_file_value()
         if hash_file_value in self.bank_accounts_loaded.keys():
             return True
@@ -80,58 +154,739 @@ class PDFBankAccountStateManager:
 
     def load_directories_to_search_for_pdfs(
         self,
-        directory_list: list = None
+        directory_list: list = None,
+        jobs: int = 1,
     ):
         """
         Load the PDF files found in the directories specified in the 'directory_list' parameter.
+
+        The files are processed as they are found (the directories are walked
+        while the first files are parsed). The byte-identical copies of a file
+        already found are not parsed, they get the outcome of the first one.
+
+        When 'jobs' is greater than 1, the parse/classify/extract work is spread
+        across a process pool of that size. The results are merged back in the
+        same order as the files were found, so the outcome is the same as the
+        serial run.
         """
         if not directory_list:
             directory_list = []
 
-        pdf_files_abspath_list = []
+        pdf_files_found = set()
 
-        for directory in directory_list:
-            pdf_files_found_in_dir = get_pdf_files(directory)
-            pdf_files_abspath_list.extend(pdf_files_found_in_dir)
+        def iter_pdf_files_to_load():
+            # (pdf_file_abspath, path of the byte-identical file found before, if any)
+            for pdf_file_abspath in PdfFileFinder.from_settings().iter_pdf_files(directory_list):
+                pdf_files_found.add(pdf_file_abspath)
+                original_pdf_file_path = self.duplicate_file_detector.add(pdf_file_abspath)
+                # the files that were not bank account states in the last run are skipped, if unchanged
+                if original_pdf_file_path or not self._is_unrecognized_pdf_file(pdf_file_abspath):
+                    yield pdf_file_abspath, original_pdf_file_path
 
-        for pdf_file_abspath in pdf_files_abspath_list:
-            print(f"Processing PDF file: '{pdf_file_abspath}'")
-            self.load_bank_account_pdf_file(pdf_file_abspath)
+        if jobs and jobs > 1:
+            self._load_bank_account_pdf_files_in_parallel(iter_pdf_files_to_load(), jobs)
+        else:
+            for pdf_file_abspath, original_pdf_file_path in iter_pdf_files_to_load():
+                logger.debug("Processing PDF file: '%s'", pdf_file_abspath)
+                if original_pdf_file_path:
+                    self.register_duplicate_pdf_file(pdf_file_abspath, original_pdf_file_path)
+                else:
+                    self.load_bank_account_pdf_file(pdf_file_abspath)
 
-        print(
-            "Finish Loading process. Total PDF bank accounts: "
-            f"[{len(self.bank_accounts_loaded)}]"
-        )
+        self._finish_loading(pdf_files_found)
 
-    def load_bank_account_pdf_file(self, pdf_file_path: str):
-        bank_account_state_obj = (
-            self.get_bank_account_state_object_from_pdf_file(pdf_file_path)
+    def _finish_loading(self, pdf_files_found: set[str]):
+        self.run_manifest.keep_entries(pdf_files_found)
+        self.pdf_parser_manager.save_mapping_table()
+        self.statement_catalog.save()
+        self.run_manifest.save()
+
+        logger.info(
+            "Finish Loading process. Total PDF bank accounts: [%s]", len(self.bank_accounts_loaded)
         )
+
+    def load_directories_with_pipeline(
+        self,
+        directory_list: list = None,
+        jobs: int = 1,
+        add_to_output_project: bool = True,
+    ):
+        """
+        Same as 'load_directories_to_search_for_pdfs', but the steps run as
+        the stages of an asyncio pipeline, all of them at the same time:
+
+            discovery -> duplicates -> parse -> register -> rename + output
+
+        The parse stage (text extraction, OCR, classification, fields) runs
+        on a process pool of 'jobs' workers; the discovery, the duplicates
+        check and the copies run on threads. The stages are connected by
+        bounded queues ('pipeline.queue_size'): a slow stage (e.g. OCR) holds
+        back the ones before it, so the files in flight (and the memory they
+        use) stay bounded. The files are registered in the order they were
+        found, so the outcome is the same as the serial run.
+
+        With 'add_to_output_project', each file loaded is auto-renamed and
+        copied into the output project (as in watch mode) while the next
+        ones are parsed; 'build_output_project' then only has to remove the
+        files that are not part of the project anymore.
+        """
+        pdf_files_found = set()
+        try:
+            asyncio.run(
+                self._run_pipeline(directory_list or [], max(1, jobs or 1), add_to_output_project, pdf_files_found)
+            )
+        except ExceptionGroup as exception_group:
+            # the first error of a stage (the rest of the stages were cancelled)
+            raise exception_group.exceptions[0]
+        self._finish_loading({
+            self.renamed_pdf_file_paths.get(pdf_file_path, pdf_file_path) for pdf_file_path in pdf_files_found
+        })
+
+    async def _run_pipeline(
+        self,
+        directory_list: list,
+        jobs: int,
+        add_to_output_project: bool,
+        pdf_files_found: set[str],
+    ):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        queue_size = max(jobs, get_pipeline_queue_size())
+        found_queue = asyncio.Queue(maxsize=queue_size)
+        parse_queue = asyncio.Queue(maxsize=queue_size)
+        register_queue = asyncio.Queue(maxsize=queue_size)
+        output_queue = asyncio.Queue(maxsize=queue_size) if add_to_output_project else None
+        output_workers = get_output_io_workers()
+        # the renames must not happen while the duplicates detector reads the files
+        duplicate_file_detector_lock = asyncio.Lock()
+
+        # set up the mapping table before the workers are started
+        self.pdf_parser_manager.bootstrap()
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_bank_account_pdf_file_worker,
+        ) as parse_executor, ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="pipeline_io"
+        ) as io_executor, ThreadPoolExecutor(
+            max_workers=output_workers, thread_name_prefix="pipeline_output"
+        ) as output_executor:
+            async with asyncio.TaskGroup() as task_group:
+                task_group.create_task(
+                    self._pipeline_discovery_stage(directory_list, found_queue, pdf_files_found, io_executor)
+                )
+                task_group.create_task(
+                    self._pipeline_duplicates_stage(found_queue, parse_queue, duplicate_file_detector_lock, io_executor)
+                )
+                task_group.create_task(self._pipeline_parse_stage(parse_queue, register_queue, parse_executor))
+                task_group.create_task(self._pipeline_register_stage(register_queue, output_queue, output_workers))
+                if add_to_output_project:
+                    output_files_claimed = set()
+                    for _ in range(output_workers):
+                        task_group.create_task(
+                            self._pipeline_output_stage(
+                                output_queue, output_files_claimed, duplicate_file_detector_lock, output_executor
+                            )
+                        )
+
+    async def _pipeline_discovery_stage(
+        self,
+        directory_list: list,
+        found_queue: asyncio.Queue,
+        pdf_files_found: set[str],
+        io_executor,
+    ):
+        loop = asyncio.get_running_loop()
+        pdf_files_iterator = PdfFileFinder.from_settings().iter_pdf_files(directory_list)
+        while (pdf_file_abspath := await loop.run_in_executor(io_executor, next, pdf_files_iterator, None)):
+            pdf_files_found.add(pdf_file_abspath)
+            await found_queue.put(pdf_file_abspath)
+        await found_queue.put(None)
+
+    async def _pipeline_duplicates_stage(
+        self,
+        found_queue: asyncio.Queue,
+        parse_queue: asyncio.Queue,
+        duplicate_file_detector_lock: asyncio.Lock,
+        io_executor,
+    ):
+        loop = asyncio.get_running_loop()
+        while (pdf_file_abspath := await found_queue.get()) is not None:
+            async with duplicate_file_detector_lock:
+                original_pdf_file_path = await loop.run_in_executor(
+                    io_executor, self.duplicate_file_detector.add, pdf_file_abspath
+                )
+            # the files that were not bank account states in the last run are skipped, if unchanged
+            if original_pdf_file_path or not self._is_unrecognized_pdf_file(pdf_file_abspath):
+                await parse_queue.put((pdf_file_abspath, original_pdf_file_path))
+        await parse_queue.put(None)
+
+    async def _pipeline_parse_stage(
+        self,
+        parse_queue: asyncio.Queue,
+        register_queue: asyncio.Queue,
+        parse_executor,
+    ):
+        loop = asyncio.get_running_loop()
+        while (parse_task := await parse_queue.get()) is not None:
+            pdf_file_abspath, original_pdf_file_path = parse_task
+            # the duplicates and the files in the catalog are not parsed, they are registered in order with the rest
+            await register_queue.put((
+                pdf_file_abspath,
+                original_pdf_file_path
+                or self._get_cataloged_bank_account_state_record(pdf_file_abspath)
+                or loop.run_in_executor(parse_executor, _get_bank_account_state_object_in_worker, pdf_file_abspath),
+            ))
+        await register_queue.put(None)
+
+    async def _pipeline_register_stage(
+        self,
+        register_queue: asyncio.Queue,
+        output_queue: Union[asyncio.Queue, None],
+        output_workers: int,
+    ):
+        while (register_task := await register_queue.get()) is not None:
+            pdf_file_abspath, task = register_task
+            if isinstance(task, asyncio.Future):
+                await task
+            self._merge_parallel_task_result(pdf_file_abspath, task)
+            run_manifest_entry = self.run_manifest.get_entry(pdf_file_abspath)
+            if (
+                output_queue is not None
+                and run_manifest_entry
+                and run_manifest_entry["status"] == RunManifest.STATUS_LOADED
+            ):
+                await output_queue.put(self.bank_accounts_loaded[run_manifest_entry["unique_hash"]])
+        if output_queue is not None:
+            for _ in range(output_workers):
+                await output_queue.put(None)
+
+    async def _pipeline_output_stage(
+        self,
+        output_queue: asyncio.Queue,
+        output_files_claimed: set[str],
+        duplicate_file_detector_lock: asyncio.Lock,
+        output_executor,
+    ):
+        loop = asyncio.get_running_loop()
+        link_mode = get_output_link_mode()
+        while (bank_account_obj := await output_queue.get()) is not None:
+            async with duplicate_file_detector_lock:
+                self._auto_rename_bank_account(bank_account_obj)
+            output_file_path = self._get_output_file_path(bank_account_obj)
+            # the first file keeps the name, as in 'get_output_project_files'
+            if not self.is_bank_account_type_enabled(bank_account_obj) or output_file_path in output_files_claimed:
+                continue
+            output_files_claimed.add(output_file_path)
+            pdf_file_path = bank_account_obj.get_pdf_file_path()
+            if not is_file_synced(pdf_file_path, output_file_path, link_mode):
+                await loop.run_in_executor(
+                    output_executor, self._sync_output_file, pdf_file_path, output_file_path, link_mode
+                )
+            self.run_manifest.set_output_file_path(pdf_file_path, output_file_path)
+
+    def _sync_output_file(self, pdf_file_path: str, output_file_path: str, link_mode: str):
+        with self.instrumentation.stage("output_sync", pdf_file_path):
+            sync_file(pdf_file_path, output_file_path, link_mode)
+
+    def _load_bank_account_pdf_files_in_parallel(
+        self,
+        pdf_files_to_load: Iterable[tuple[str, Union[str, None]]],
+        jobs: int,
+    ):
+        """
+        Parse the PDF files on a process pool and merge the results in order.
+
+        The files are submitted as they are found, with at most
+        'jobs * PARALLEL_TASKS_PER_JOB' files in flight. The duplicates and
+        the files in the statement catalog are not submitted, they are
+        registered in order with the rest.
+        """
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        # set up the mapping table before the workers are started
+        self.pdf_parser_manager.bootstrap()
+        max_pending_tasks = jobs * self.PARALLEL_TASKS_PER_JOB
+        # [(pdf_file_abspath, future, path of the original file or cataloged record)]
+        # in the order the files were found
+        pending_tasks = deque()
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_bank_account_pdf_file_worker,
+        ) as executor:
+            for pdf_file_abspath, original_pdf_file_path in pdf_files_to_load:
+                pending_tasks.append((
+                    pdf_file_abspath,
+                    original_pdf_file_path
+                    or self._get_cataloged_bank_account_state_record(pdf_file_abspath)
+                    or executor.submit(_get_bank_account_state_object_in_worker, pdf_file_abspath),
+                ))
+                if len(pending_tasks) >= max_pending_tasks:
+                    self._merge_parallel_task_result(*pending_tasks.popleft())
+            while pending_tasks:
+                self._merge_parallel_task_result(*pending_tasks.popleft())
+
+    def _merge_parallel_task_result(
+        self,
+        pdf_file_abspath: str,
+        task: Union[Future, str, BankAccountStateRecord],
+    ):
+        logger.debug("Processing PDF file: '%s'", pdf_file_abspath)
+        if isinstance(task, str):
+            self.register_duplicate_pdf_file(pdf_file_abspath, task)
+            return
+        if isinstance(task, BankAccountStateRecord):
+            self.register_bank_account_state_object(pdf_file_abspath, task)
+            return
+        bank_account_state_obj, mapping_table_entries, instrumentation_data = task.result()
+        self.pdf_parser_manager.merge_mapping_table_entries(mapping_table_entries)
+        self.instrumentation.merge_data(instrumentation_data)
         if bank_account_state_obj:
+            self.statement_catalog.add_record(bank_account_state_obj)
+        self.register_bank_account_state_object(pdf_file_abspath, bank_account_state_obj)
+
+    def load_bank_account_pdf_file(self, pdf_file_path: str):
+        bank_account_state_obj = self._get_cataloged_bank_account_state_record(pdf_file_path)
+        if bank_account_state_obj is None:
+            bank_account_state_obj = (
+                self.get_bank_account_state_record_from_pdf_file(pdf_file_path)
+            )
+            if bank_account_state_obj:
+                self.statement_catalog.add_record(bank_account_state_obj)
+        self.register_bank_account_state_object(pdf_file_path, bank_account_state_obj)
+
+    def register_bank_account_state_object(
+        self,
+        pdf_file_path: str,
+        bank_account_state_obj: BankAccountStateRecord,
+    ):
+        """
+        Register the record of a parsed PDF file, applying the duplicates
+        and 'after_date_config' rules.
+        """
+        if not bank_account_state_obj:
+            self.run_manifest.record(pdf_file_path, RunManifest.STATUS_UNRECOGNIZED)
+        else:
+            if self.bank_account_state_object_already_loaded(bank_account_state_obj):
+                bank_account_state_obj = self._get_bank_account_state_object_by_contents(bank_account_state_obj)
+            unique_hash = bank_account_state_obj.get_unique_hash_file_value()
             if self.bank_account_state_object_already_loaded(bank_account_state_obj):
                 bank_account_state_obj_already_loaded = self.bank_accounts_loaded.get(
                     bank_account_state_obj.get_unique_hash_file_value()
                 )
-                print(
-                    "[!] WARNING. PDF file already loaded! | "
-                    "Files seems to be the same: "
-                    f"[LOADED]: '{bank_account_state_obj_already_loaded.get_pdf_file_path()}' | "
-                    f"[IGNORED]: '{bank_account_state_obj.get_pdf_file_path()}' | "
+                logger.warning(
+                    "PDF file already loaded! | Files seems to be the same: "
+                    "[LOADED]: '%s' | [IGNORED]: '%s' | ",
+                    bank_account_state_obj_already_loaded.get_pdf_file_path(),
+                    bank_account_state_obj.get_pdf_file_path(),
                 )
                 self.bank_accounts_to_ignore.append(bank_account_state_obj)
+                self.run_manifest.record(pdf_file_path, RunManifest.STATUS_DUPLICATE, unique_hash)
             else:
-                bank_account_period_date = bank_account_state_obj.get_periodo_inicio()
-                bank_account_period_date = datetime.strptime(bank_account_period_date, "%Y-%m-%d").date()
-                if bank_account_period_date >= self.after_date_config:
+                if bank_account_state_obj.periodo_inicio.date() >= self.after_date_config:
                     self._load_bank_account_state_object(bank_account_state_obj)
+                    self.run_manifest.record(pdf_file_path, RunManifest.STATUS_LOADED, unique_hash)
                 else:
-                    print(
-                        f" > Bank Account PDF file is older than the specified date: '{pdf_file_path}'"
+                    logger.info(
+                        "Bank Account PDF file is older than the specified date: '%s'", pdf_file_path
                     )
+                    self.run_manifest.record(pdf_file_path, RunManifest.STATUS_OLDER, unique_hash)
+
+    def _get_bank_account_state_object_by_contents(
+        self,
+        bank_account_state_obj: BankAccountStateRecord,
+    ) -> BankAccountStateRecord:
+        """
+        Tell apart a record whose unique hash (its identification fields) is
+        already loaded: the full texts of both PDF files are compared (from
+        the parse cache, or parsed again). With the same text, the record is
+        returned as is (a duplicate); otherwise, a copy whose unique hash
+        includes the hash of its text (saved to the statement catalog too).
+        """
+        bank_account_state_obj_already_loaded = self.bank_accounts_loaded[
+            bank_account_state_obj.get_unique_hash_file_value()
+        ]
+        with self.instrumentation.stage("contents_hash", bank_account_state_obj.get_pdf_file_path()):
+            if bank_account_state_obj.get_contents_hash() == bank_account_state_obj_already_loaded.get_contents_hash():
+                return bank_account_state_obj
+            bank_account_state_obj = bank_account_state_obj.copy_with_contents_hash()
+        self.statement_catalog.add_record(bank_account_state_obj)
+        # (it can still be the duplicate of another PDF file with the same fields and text)
+        if not self.bank_account_state_object_already_loaded(bank_account_state_obj):
+            logger.warning(
+                "PDF files with the same fields but not the same text, both are loaded: "
+                "[LOADED]: '%s' | [LOADED]: '%s' | ",
+                bank_account_state_obj_already_loaded.get_pdf_file_path(),
+                bank_account_state_obj.get_pdf_file_path(),
+            )
+        return bank_account_state_obj
+
+    def register_duplicate_pdf_file(self, pdf_file_path: str, original_pdf_file_path: str):
+        """
+        Register a byte-identical copy of a PDF file already registered,
+        with the same outcome and without parsing it.
+        """
+        self.instrumentation.count("duplicate_files.skipped")
+        # the original file could have been auto-renamed since (pipeline)
+        original_pdf_file_path = self.renamed_pdf_file_paths.get(original_pdf_file_path, original_pdf_file_path)
+        run_manifest_entry = self.run_manifest.get_entry(original_pdf_file_path)
+        if run_manifest_entry is None or run_manifest_entry["status"] == RunManifest.STATUS_UNRECOGNIZED:
+            self.run_manifest.record(pdf_file_path, RunManifest.STATUS_UNRECOGNIZED)
+        elif run_manifest_entry["status"] == RunManifest.STATUS_OLDER:
+            logger.info("Bank Account PDF file is older than the specified date: '%s'", pdf_file_path)
+            self.run_manifest.record(pdf_file_path, RunManifest.STATUS_OLDER, run_manifest_entry["unique_hash"])
+        else:
+            bank_account_state_obj_already_loaded = self.bank_accounts_loaded[run_manifest_entry["unique_hash"]]
+            logger.warning(
+                "PDF file already loaded! | Files are byte-identical: "
+                "[LOADED]: '%s' | [IGNORED]: '%s' | ",
+                bank_account_state_obj_already_loaded.get_pdf_file_path(),
+                pdf_file_path,
+            )
+            self.bank_accounts_to_ignore.append(
+                bank_account_state_obj_already_loaded.copy_for_pdf_file(pdf_file_path)
+            )
+            self.run_manifest.record(
+                pdf_file_path, RunManifest.STATUS_DUPLICATE, run_manifest_entry["unique_hash"]
+            )
+
+    def load_bank_accounts_from_catalog(self, since: date = None, bank_name: str = None):
+        """
+        Load the bank accounts of the last scan from the statement catalog,
+        without opening any PDF file (e.g. to list, rename or build the output
+        project). Optionally only the ones of a bank (name or short name) or
+        whose period starts on/after the 'since' date.
+
+        The files changed or removed since the last scan are skipped: they
+        have to be scanned again.
+        """
+        with self.instrumentation.stage("load_from_catalog"):
+            bank_accounts_cataloged = self.statement_catalog.get_records(since=since, bank_name=bank_name)
+        bank_accounts_by_pdf_file_path = {
+            bank_account_obj.get_pdf_file_path(): bank_account_obj for bank_account_obj in bank_accounts_cataloged
+        }
+        bank_accounts_by_unique_hash = {
+            bank_account_obj.get_unique_hash_file_value(): bank_account_obj
+            for bank_account_obj in bank_accounts_cataloged
+        }
+        is_filtered = since is not None or bank_name is not None
+        pdf_files_to_scan = []
+        # in the order of the last scan (e.g. the first file keeps the output file name)
+        for pdf_file_path, run_manifest_entry in self.run_manifest.entries.items():
+            if run_manifest_entry["status"] not in (RunManifest.STATUS_LOADED, RunManifest.STATUS_DUPLICATE):
+                continue
+            bank_account_obj = bank_accounts_by_pdf_file_path.get(pdf_file_path)
+            if bank_account_obj is None and run_manifest_entry["status"] == RunManifest.STATUS_DUPLICATE:
+                # the byte-identical copies share the record of the first file
+                bank_account_obj = bank_accounts_by_unique_hash.get(run_manifest_entry["unique_hash"])
+                bank_account_obj = bank_account_obj and bank_account_obj.copy_for_pdf_file(pdf_file_path)
+            if bank_account_obj is None:
+                if not is_filtered:
+                    pdf_files_to_scan.append(pdf_file_path)
+                continue
+            if not self.run_manifest.is_unchanged(pdf_file_path):
+                pdf_files_to_scan.append(pdf_file_path)
+                continue
+            if run_manifest_entry["status"] == RunManifest.STATUS_LOADED:
+                self._load_bank_account_state_object(bank_account_obj)
+            else:
+                self.bank_accounts_to_ignore.append(bank_account_obj)
 
-    def auto_rename_bank_accounts_loaded(self):
+        for pdf_file_path in pdf_files_to_scan:
+            logger.warning("PDF file changed since the last scan, it has to be scanned again: '%s'", pdf_file_path)
+        logger.info("Bank accounts loaded from the catalog: [%s]", len(self.bank_accounts_loaded))
+
+    def _get_cataloged_bank_account_state_record(self, pdf_file_path: str) -> Union[BankAccountStateRecord, None]:
+        """
+        Get the record of a PDF file from the statement catalog: if the file
+        didn't change since it was parsed (same stat signature), or if a file
+        with the same bytes was parsed before (e.g. renamed or moved).
+        """
+        bank_account_obj = self.statement_catalog.get_record_by_pdf_file_path(
+            pdf_file_path, get_file_stat_signature(pdf_file_path)
+        )
+        if bank_account_obj is None:
+            # only the hashes already known (the mapping table seeds them), the file is not read here
+            self.pdf_parser_manager.bootstrap()
+            pdf_file_hash = self.pdf_parser_manager.file_hash_registry.get_cached_file_hash(pdf_file_path)
+            if pdf_file_hash is not None:
+                bank_account_obj = self.statement_catalog.get_record_by_pdf_file_hash(pdf_file_hash)
+            if bank_account_obj is not None and bank_account_obj.get_pdf_file_path() != pdf_file_path:
+                bank_account_obj = bank_account_obj.copy_for_pdf_file(pdf_file_path)
+                self.statement_catalog.add_record(bank_account_obj)
+        self.instrumentation.count("statement_catalog.miss" if bank_account_obj is None else "statement_catalog.hit")
+        return bank_account_obj
+
+    def _is_unrecognized_pdf_file(self, pdf_file_path: str) -> bool:
+        run_manifest_entry = self.run_manifest.get_entry(pdf_file_path)
+        return (
+            run_manifest_entry is not None
+            and run_manifest_entry["status"] == RunManifest.STATUS_UNRECOGNIZED
+            and self.run_manifest.is_unchanged(pdf_file_path)
+        )
+
+    def unload_bank_account_pdf_file(self, pdf_file_path: str):
+        """
+        Remove a PDF file (e.g. deleted or modified) from the bank accounts
+        loaded/ignored and from the output project.
+        """
+        self.duplicate_file_detector.remove(pdf_file_path)
+        run_manifest_entry = self.run_manifest.remove(pdf_file_path)
+        if run_manifest_entry is None:
+            return
+        bank_account_state_obj = self.bank_accounts_loaded.get(run_manifest_entry["unique_hash"])
+        if bank_account_state_obj and bank_account_state_obj.get_pdf_file_path() == pdf_file_path:
+            self._unload_bank_account_state_object(run_manifest_entry["unique_hash"])
+        self.bank_accounts_to_ignore = [
+            bank_account_obj for bank_account_obj in self.bank_accounts_to_ignore
+            if bank_account_obj.get_pdf_file_path() != pdf_file_path
+        ]
+        output_file_path = run_manifest_entry["output_file_path"]
+        if output_file_path and os.path.exists(output_file_path):
+            os.remove(output_file_path)
+
+    def process_pdf_file_change(self, pdf_file_path: str) -> bool:
+        """
+        Incremental update (watch mode) for a PDF file that was created,
+        modified or deleted: only this file is (un)loaded, renamed and
+        copied into the output project.
+
+        Returns False if the file was unchanged since its last run
+        (e.g. the events of the renames done by the program itself).
+        """
+        if os.path.exists(pdf_file_path):
+            stat_signature = get_file_stat_signature(pdf_file_path)
+            if self.run_manifest.is_unchanged(pdf_file_path, stat_signature):
+                return False
+            self.unload_bank_account_pdf_file(pdf_file_path)
+            logger.info("Processing PDF file: '%s'", pdf_file_path)
+            original_pdf_file_path = self.duplicate_file_detector.add(pdf_file_path)
+            if original_pdf_file_path:
+                self.register_duplicate_pdf_file(pdf_file_path, original_pdf_file_path)
+            else:
+                self.load_bank_account_pdf_file(pdf_file_path)
+            run_manifest_entry = self.run_manifest.get_entry(pdf_file_path)
+            if run_manifest_entry and run_manifest_entry["status"] == RunManifest.STATUS_LOADED:
+                bank_account_obj = self.bank_accounts_loaded[run_manifest_entry["unique_hash"]]
+                self._auto_rename_bank_account(bank_account_obj)
+                self._add_bank_account_to_output_project(bank_account_obj)
+                if is_transactions_extraction_enabled():
+                    self._extract_bank_account_transactions(bank_account_obj)
+            self.pdf_parser_manager.save_mapping_table()
+            self.statement_catalog.save()
+        elif self.run_manifest.get_entry(pdf_file_path) is not None:
+            logger.info("PDF file removed: '%s'", pdf_file_path)
+            self.unload_bank_account_pdf_file(pdf_file_path)
+        else:
+            return False
+        self.run_manifest.save()
+        return True
+
+    def auto_rename_bank_accounts_loaded(self, dry_run: bool = False):
+        """
+        Rename the PDF files of the bank accounts loaded with their human readable
+        names. With 'dry_run', the renames are only logged.
+        """
+        if dry_run:
+            for bank_account_obj in self.bank_accounts_loaded.values():
+                new_pdf_file_path = bank_account_obj.get_auto_rename_file_path()
+                if new_pdf_file_path != bank_account_obj.get_pdf_file_path() and not os.path.exists(new_pdf_file_path):
+                    logger.info(
+                        "[dry-run] [auto-rename] '%s' -> '%s'", bank_account_obj.get_pdf_file_path(), new_pdf_file_path
+                    )
+            return
         for bank_account_obj_id, bank_account_obj in self.bank_accounts_loaded.items():
+            self._auto_rename_bank_account(bank_account_obj)
+        self.pdf_parser_manager.save_mapping_table()
+        self.statement_catalog.save()
+        self.run_manifest.save()
+
+    def _auto_rename_bank_account(self, bank_account_obj: BankAccountStateRecord):
+        pdf_file_path = bank_account_obj.get_pdf_file_path()
+        with self.instrumentation.stage("auto_rename", pdf_file_path):
             new_file_name = bank_account_obj.auto_rename_file_name()
+        if new_file_name:
+            self.renamed_pdf_file_paths[pdf_file_path] = bank_account_obj.get_pdf_file_path()
+            self.run_manifest.rename(pdf_file_path, bank_account_obj.get_pdf_file_path())
+            self.duplicate_file_detector.rename(pdf_file_path, bank_account_obj.get_pdf_file_path())
+            self.pdf_parser_manager.rename_pdf_file(pdf_file_path, bank_account_obj.get_pdf_file_path())
+            self.statement_catalog.add_record(bank_account_obj)
+
+    def get_bank_accounts_amounts_aggregation(
+        self,
+        bank_accounts: Iterable[BankAccountStateRecord] = None,
+    ) -> BankAccountAmountsAggregation:
+        """
+        Get the summary amounts of the bank accounts (all the bank accounts loaded
+        by default) packed for the aggregations: monthly totals, running balances
+        and balance checks.
+        """
+        if bank_accounts is None:
+            bank_accounts = self.bank_accounts_loaded.values()
+        return BankAccountAmountsAggregation(bank_accounts)
+
+    @staticmethod
+    def get_transactions_statement_key(bank_account_obj: BankAccountStateRecord) -> str:
+        """
+        Key of the transactions of a bank account in the transaction store
+        (a new key when its transaction extraction plan changes).
+        """
+        return (
+            f"{bank_account_obj.get_unique_hash_file_value()}_"
+            f"{bank_account_obj.get_transaction_extraction_plan().fingerprint}"
+        )
+
+    def extract_bank_accounts_transactions(self):
+        """
+        Extract the transactions of the bank accounts loaded into the
+        transaction store (only the ones that are not in the store yet).
+        """
+        for bank_account_obj in self.bank_accounts_loaded.values():
+            self._extract_bank_account_transactions(bank_account_obj)
+
+    def _extract_bank_account_transactions(self, bank_account_obj: BankAccountStateRecord):
+        statement_key = self.get_transactions_statement_key(bank_account_obj)
+        if self.transaction_store.has_statement(statement_key):
+            self.instrumentation.count("transactions.statements_cached")
+            return
+        pdf_file_path = bank_account_obj.get_pdf_file_path()
+        with self.instrumentation.stage("transaction_extraction", pdf_file_path):
+            total_transactions = self.transaction_store.save_statement_transactions(
+                statement_key, bank_account_obj.iter_transactions()
+            )
+        self.instrumentation.count("transactions.statements_extracted")
+        self.instrumentation.count("transactions.extracted", total_transactions)
+        logger.debug("Transactions extracted: [%s] from '%s'", total_transactions, pdf_file_path)
+
+    def get_bank_accounts_transactions(
+        self,
+        bank_accounts: Iterable[BankAccountStateRecord] = None,
+    ) -> TransactionTable:
+        """
+        Get the transactions of the bank accounts (all the bank accounts loaded by default)
+        from the transaction store, as a single columnar table.
+        """
+        if bank_accounts is None:
+            bank_accounts = self.bank_accounts_loaded.values()
+        return self.transaction_store.load(
+            self.get_transactions_statement_key(bank_account_obj) for bank_account_obj in bank_accounts
+        )
+
+    def get_report_data(self) -> dict:
+        """
+        Get the report of the bank accounts loaded: the statements, the monthly
+        totals of each account, the period and balance issues, and the monthly
+        totals of the transactions already in the transaction store.
+        """
+        amounts_aggregation = self.get_bank_accounts_amounts_aggregation()
+        transactions = self.get_bank_accounts_transactions()
+        return {
+            "bank_accounts": [
+                {
+                    "pdf_file_path": bank_account_obj.get_pdf_file_path(),
+                    "bank_name": bank_account_obj.get_bank_name(),
+                    "account_type": bank_account_obj.get_account_type_name(),
+                    "account_number": bank_account_obj.get_account_number(),
+                    "periodo_inicio": str(bank_account_obj.get_periodo_inicio()),
+                    "periodo_termino": str(bank_account_obj.get_periodo_termino()),
+                    "fecha_de_corte": str(bank_account_obj.get_fecha_de_corte()),
+                    **{
+                        amount_field_name: None if amount_in_cents is None else format_amount_in_cents(amount_in_cents)
+                        for amount_field_name, amount_in_cents in bank_account_obj.get_summary_amounts().items()
+                    },
+                }
+                for bank_account_obj in self.get_bank_accounts_loaded_ordered(by_date=True)
+            ],
+            "monthly_totals": {
+                " | ".join(str(value) for value in account_key): {
+                    month: {
+                        amount_field_name: format_amount_in_cents(amount_total)
+                        for amount_field_name, amount_total in month_totals.items()
+                    }
+                    for month, month_totals in account_monthly_totals.items()
+                }
+                for account_key, account_monthly_totals in amounts_aggregation.get_monthly_totals().items()
+            } if len(amounts_aggregation) else {},
+            "period_issues": [
+                {
+                    "kind": period_issue.kind,
+                    "days": period_issue.days,
+                    "previous_pdf_file_path": period_issue.previous_record.get_pdf_file_path(),
+                    "next_pdf_file_path": period_issue.next_record.get_pdf_file_path(),
+                }
+                for period_issues in self.get_bank_accounts_period_issues().values()
+                for period_issue in period_issues
+            ],
+            "balance_issues": [
+                {
+                    "pdf_file_path": balance_issue.record.get_pdf_file_path(),
+                    "previous_pdf_file_path": (
+                        balance_issue.previous_record and balance_issue.previous_record.get_pdf_file_path()
+                    ),
+                    "difference": format_amount_in_cents(balance_issue.difference),
+                }
+                for balance_issue in amounts_aggregation.get_balance_issues()
+            ] if len(amounts_aggregation) else [],
+            "transactions_by_month": transactions.get_totals_by_month() if len(transactions) else {},
+        }
+
+    def generate_report(self) -> str:
+        """
+        Write the report of the bank accounts loaded (see 'get_report_data') as JSON, and get its path.
+        """
+        report_file_path = f"{get_tmp_dir()}/{self.REPORT_FILE_PATH}"
+        os.makedirs(os.path.dirname(report_file_path), exist_ok=True)
+        ReportManager().generate_json_report(self.get_report_data(), report_file_path)
+        return report_file_path
+
+    def get_cache_stats(self) -> dict[str, dict[str, int]]:
+        """
+        Get the stats of the persisted state: the run manifest, the statement
+        catalog, the parse cache (mapping table) and the transaction store.
+        """
+        return {
+            "run_manifest": {
+                "entries": len(self.run_manifest.entries),
+                **self.run_manifest.get_status_counts(),
+            },
+            "statement_catalog": self.statement_catalog.get_stats(),
+            "parse_cache": self.pdf_parser_manager.get_cache_stats(),
+            "transaction_store": self.transaction_store.get_stats(),
+        }
+
+    def prune_cache(self, dry_run: bool = False) -> dict[str, dict[str, int]]:
+        """
+        Remove the persisted state that is not used anymore and get how much
+        was (or would be) removed:
+
+            - the run manifest entries of the PDF files that don't exist
+            - the statement catalog records of the PDF files that don't exist
+            - the parse cache entries of the PDF files that don't exist
+            - the transactions of the statements not loaded in the last scan
+        """
+        pdf_files_to_keep = {
+            pdf_file_path for pdf_file_path in self.run_manifest.entries if os.path.exists(pdf_file_path)
+        }
+        run_manifest_entries_to_remove = len(self.run_manifest.entries) - len(pdf_files_to_keep)
+        statement_keys_to_keep = {
+            self.get_transactions_statement_key(bank_account_obj)
+            for bank_account_obj in self.statement_catalog.get_records()
+            if bank_account_obj.get_pdf_file_path() in pdf_files_to_keep
+            and self.run_manifest.get_entry(bank_account_obj.get_pdf_file_path())["status"]
+            == RunManifest.STATUS_LOADED
+        }
+        prune_counts = {
+            "run_manifest": {"entries": run_manifest_entries_to_remove},
+            "statement_catalog": {"records": self.statement_catalog.prune(dry_run=dry_run)},
+            "parse_cache": self.pdf_parser_manager.prune_mapping_table(dry_run=dry_run),
+            "transaction_store": {
+                "statements": self.transaction_store.prune(statement_keys_to_keep, dry_run=dry_run),
+            },
+        }
+        if not dry_run:
+            self.run_manifest.keep_entries(pdf_files_to_keep)
+            self.run_manifest.save()
+        return prune_counts
 
     def list_bank_accounts_loaded(self, add_details: bool = False, order_by: str = None):
         print(self._SEPARATOR)
@@ -161,6 +916,8 @@ class PDFBankAccountStateManager:
                 print(f"    - Bank: '{bank_account_obj.get_bank_name()}'")
                 print(f"    - Periodo: [{bank_account_obj.get_periodo_inicio()}] - [{bank_account_obj.get_periodo_termino()}]")
                 print(f"    - Fecha de Corte: [{bank_account_obj.get_fecha_de_corte()}]")
+                if bank_account_obj.saldo_final is not None:
+                    print(f"    - Saldo Final: [{format_amount_in_cents(bank_account_obj.saldo_final)}]")
                 print(self._SEPARATOR_SMALL)
 
         print(self._SEPARATOR)
@@ -168,77 +925,204 @@ class PDFBankAccountStateManager:
         for bank_account_obj in self.bank_accounts_to_ignore:
             print(f" > File: \"{bank_account_obj.get_pdf_file_path()}\" was ignored.")
 
+        for account_key, period_issues in self.get_bank_accounts_period_issues().items():
+            for period_issue in period_issues:
+                print(
+                    f" > Account {account_key}: {period_issue.kind} of {period_issue.days} day(s) "
+                    f"between [{period_issue.previous_record.get_periodo_termino()}] "
+                    f"and [{period_issue.next_record.get_periodo_inicio()}]."
+                )
+
+        for balance_issue in self.get_bank_accounts_amounts_aggregation().get_balance_issues():
+            if balance_issue.previous_record is None:
+                print(
+                    f" > File: \"{balance_issue.record.get_pdf_file_path()}\": the summary amounts don't "
+                    f"add up to the final balance (difference: {format_amount_in_cents(balance_issue.difference)})."
+                )
+            else:
+                print(
+                    f" > File: \"{balance_issue.record.get_pdf_file_path()}\": the previous balance doesn't match "
+                    f"the final balance of \"{balance_issue.previous_record.get_pdf_file_path()}\" "
+                    f"(difference: {format_amount_in_cents(balance_issue.difference)})."
+                )
+
     @staticmethod
-    def is_bank_account_type_enabled(bank_account_obj: BankAccountStatePDF):
+    def is_bank_account_type_enabled(bank_account_obj: BankAccountStateRecord):
         if bank_account_obj.is_debit_account() and is_debit_account_type_enabled():
             return True
         elif bank_account_obj.is_credit_account() and is_credit_account_type_enabled():
             return True
         return False
 
-    def build_output_project(self, start_clean: bool = True):
+    def build_output_project(self, start_clean: bool = True, dry_run: bool = False):
         """
         Build the project with the bank accounts loaded.
+
+        The output directory is synced with the bank accounts loaded: only the
+        missing or outdated files are copied/linked ('output.link_mode'). With
+        'start_clean', the files that are not part of the project anymore are
+        removed too (the result is the same as building it from scratch).
+        With 'dry_run', the changes are only logged.
         """
-        if start_clean:
-            if os.path.exists(self.OUTPUT_DIR):
-                shutil.rmtree(self.OUTPUT_DIR)
-
-        bank_accounts_by_bank = self.get_bank_accounts_loaded_by_bank_name()
-        for bank_name, bank_accounts_list in bank_accounts_by_bank.items():
-
-            output_bank_dir = f"{self.OUTPUT_DIR}/{bank_name}"
-            os.makedirs(output_bank_dir, exist_ok=True)
-
-            for bank_account_obj in bank_accounts_list:
-                if self.is_bank_account_type_enabled(bank_account_obj):
-                    bank_account_type = bank_account_obj.get_account_type_name()
-                    if not os.path.exists(f"{output_bank_dir}/{bank_account_type}"):
-                        os.makedirs(f"{output_bank_dir}/{bank_account_type}")
-                    output_file_path = (
-                        f"{output_bank_dir}/"
-                        f"{bank_account_type}/"
-                        f"{bank_account_obj.pdf_file_basename}"
-                    )
-                    if not os.path.exists(output_file_path):
-                        shutil.copyfile(
-                            bank_account_obj.get_pdf_file_path(),
-                            output_file_path
-                        )
+        if dry_run:
+            self._log_output_project_changes(start_clean)
+            return
+        with self.instrumentation.stage("build_output_project"):
+            self._build_output_project(start_clean)
+
+    def _get_output_file_path(self, bank_account_obj: BankAccountStateRecord) -> str:
+        return (
+            f"{self.get_output_dir()}/"
+            f"{bank_account_obj.get_bank_name()}/"
+            f"{bank_account_obj.get_account_type_name()}/"
+            f"{bank_account_obj.pdf_file_basename}"
+        )
+
+    def get_output_project_files(self) -> dict[str, str]:
+        """
+        Get the layout of the output project: {output file path: PDF file path}.
+        """
+        output_project_files = {}
+        for bank_account_obj in self.bank_accounts_loaded.values():
+            if self.is_bank_account_type_enabled(bank_account_obj):
+                # the first file keeps the name, as when the files were only copied if missing
+                output_project_files.setdefault(
+                    self._get_output_file_path(bank_account_obj), bank_account_obj.get_pdf_file_path()
+                )
+        return output_project_files
+
+    def _get_output_directory_sync(self) -> DirectorySync:
+        return DirectorySync(
+            self.get_output_dir(),
+            link_mode=get_output_link_mode(),
+            workers=get_output_io_workers(),
+        )
+
+    def _log_output_project_changes(self, start_clean: bool):
+        files_to_sync, files_to_remove, existing_files = self._get_output_directory_sync().get_sync_plan(
+            self.get_output_project_files(), remove_extra_files=start_clean
+        )
+        for output_file_path, pdf_file_path in files_to_sync.items():
+            action = "update" if output_file_path in existing_files else "add"
+            logger.info("[dry-run] [output] %s '%s' -> '%s'", action, pdf_file_path, output_file_path)
+        for output_file_path in sorted(files_to_remove):
+            logger.info("[dry-run] [output] remove '%s'", output_file_path)
+
+    def _build_output_project(self, start_clean: bool):
+        output_project_files = self.get_output_project_files()
+        directory_sync = self._get_output_directory_sync()
+        sync_counts = directory_sync.sync(output_project_files, remove_extra_files=start_clean)
+        for sync_count_name, sync_count in sync_counts.items():
+            self.instrumentation.count(f"output_sync.{sync_count_name}", sync_count)
+        logger.debug("Output project synced: %s", sync_counts)
+
+        for output_file_path, pdf_file_path in output_project_files.items():
+            self.run_manifest.set_output_file_path(pdf_file_path, output_file_path)
+        self.run_manifest.save()
 
+    def _add_bank_account_to_output_project(self, bank_account_obj: BankAccountStateRecord):
+        if not self.is_bank_account_type_enabled(bank_account_obj):
+            return
+        output_file_path = self._get_output_file_path(bank_account_obj)
+        if not os.path.exists(output_file_path):
+            with self.instrumentation.stage("output_sync", bank_account_obj.get_pdf_file_path()):
+                sync_file(bank_account_obj.get_pdf_file_path(), output_file_path, get_output_link_mode())
+        self.run_manifest.set_output_file_path(bank_account_obj.get_pdf_file_path(), output_file_path)
 
     @classmethod
     def get_bank_account_state_object_from_pdf_file(cls, pdf_file_path: str):
         """
         Get the BankAccountStatePDF object from the PDF file.
         """
-        instance = None
-        pdf_parse_manager = PdfParseManager()
-        pdf_file_contents, is_pdf_image_type = (
-            pdf_parse_manager.parse_pdf_file(pdf_file_path)
-        )
+        instrumentation = PipelineInstrumentation()
+        with instrumentation.stage("load_pdf_file", pdf_file_path):
+            instance = cls._get_bank_account_state_object_from_pdf_file(pdf_file_path)
 
-        if CitiBanamexCreditCostcoPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = CitiBanamexCreditCostcoPDF(pdf_file_path, pdf_file_contents)
+        if instance:
+            logger.debug("Bank State account successfully loaded: '%s'", pdf_file_path)
+            return instance
 
-        elif CitiBanamexDebitPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = CitiBanamexDebitPDF(pdf_file_path, pdf_file_contents)
+    @classmethod
+    def get_bank_account_state_record_from_pdf_file(cls, pdf_file_path: str):
+        """
+        Get the BankAccountStateRecord of the PDF file (None if it is not a bank account state).
+        The parsed object, and the text of the PDF file with it, are released.
+        """
+        bank_account_state_obj = cls.get_bank_account_state_object_from_pdf_file(pdf_file_path)
+        if bank_account_state_obj:
+            if is_transactions_extraction_enabled():
+                # the transactions are extracted from the full text (parse cache): the rest
+                # of the pages are loaded here, e.g. in the worker processes of a parallel scan
+                with PipelineInstrumentation().stage("full_text", pdf_file_path):
+                    bank_account_state_obj.pdf_text_source.get_full_text()
+            return BankAccountStateRecord.from_bank_account_state(bank_account_state_obj)
 
-        elif is_pdf_image_type and SantanderDebitImagePDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = SantanderDebitImagePDF(pdf_file_path, pdf_file_contents)
+    @classmethod
+    def _get_bank_account_state_object_from_pdf_file(cls, pdf_file_path: str):
+        instrumentation = PipelineInstrumentation()
+        pdf_parse_manager = PdfParseManager()
+        # the text is loaded lazily, one page at a time, as the
+        # classifier and the field extraction need it
+        with instrumentation.stage("pdf_text_source", pdf_file_path):
+            pdf_file_contents, is_pdf_image_type = (
+                pdf_parse_manager.get_pdf_text_source(
+                    pdf_file_path,
+                    header_text_validator=cls.is_ocr_header_text_enough,
+                )
+            )
 
-        elif SantanderDebitPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = SantanderDebitPDF(pdf_file_path, pdf_file_contents)
+        # single scan of the text for the keywords of all the registered banks
+        with instrumentation.stage("classification", pdf_file_path):
+            bank_account_state_class = BANK_ACCOUNT_STATE_REGISTRY.get_bank_account_state_class(
+                pdf_file_contents,
+                is_image_pdf=is_pdf_image_type,
+            )
+        if bank_account_state_class:
+            with instrumentation.stage("field_extraction", pdf_file_path):
+                return bank_account_state_class(pdf_file_path, pdf_file_contents)
+        return None
+
+    @staticmethod
+    def is_ocr_header_text_enough(bank_name: str, header_text: str) -> bool:
+        """
+        Check if the OCR text of the header region of a bank identifies the
+        bank account state, so the rest of the pages are not OCR'd.
+        """
+        bank_account_state_class = BANK_ACCOUNT_STATE_REGISTRY.get_bank_account_state_class(
+            header_text,
+            is_image_pdf=True,
+        )
+        return (
+            bank_account_state_class is not None
+            and bank_account_state_class.BANK_NAME == bank_name
+            and bank_account_state_class.identification_fields_found_in_pdf_contents(header_text)
+        )
 
-        elif BbvaDebitPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = BbvaDebitPDF(pdf_file_path, pdf_file_contents)
 
-        elif BbvaCreditPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = BbvaCreditPDF(pdf_file_path, pdf_file_contents)
+def _init_bank_account_pdf_file_worker():
+    """
+    Process-pool initializer. The workers must not write the mapping table
+    file, the parent process merges their new entries and saves it once.
+    """
+    PdfParseManager().auto_save_mapping_table = False
+    # a forked worker starts with a copy of the data recorded by the parent process so far
+    PipelineInstrumentation().pop_data()
 
-        elif InbursaDebitPDF.keywords_found_in_pdf_contents(pdf_file_contents):
-            instance = InbursaDebitPDF(pdf_file_path, pdf_file_contents)
 
-        if instance:
-            print(f" > Bank State account successfully loaded: '{pdf_file_path}'")
-            return instance
+def _get_bank_account_state_object_in_worker(pdf_file_path: str):
+    """
+    Process-pool task: parse, classify and extract a single PDF file.
+    """
+    pdf_parse_manager = PdfParseManager()
+    # the record is created here, so the mapping table entry (if the
+    # full text was loaded) is sent back together with the small record
+    bank_account_state_obj = (
+        PDFBankAccountStateManager.get_bank_account_state_record_from_pdf_file(pdf_file_path)
+    )
+    # the background log sinks are not flushed when a worker process exits
+    flush_logs()
+    return (
+        bank_account_state_obj,
+        pdf_parse_manager.pop_new_mapping_table_entries(),
+        PipelineInstrumentation().pop_data(),
+    )
@@ -1,19 +1,155 @@
-import re
 import os
 from abc import ABC
 from datetime import datetime
-from typing import Union
+from decimal import Decimal
+from typing import Iterator, Union
 
-import settings
-from common.logging import CustomLogger
-from common.utils import convert_bytes_to_human_readable, get_file_hash, get_hash_from_string
-from pdf_utils.parsers import parse_pdf_with_pymupdf, get_pdf_file_size
+from common import amounts, dates
+from common.logging import CustomLogger, get_logger
+from common.utils import convert_bytes_to_human_readable, get_hash_from_string
+from pdf_utils.parsers import iter_pdf_pages_with_pymupdf, get_pdf_file_size
+from pdf_utils.text_source import PdfTextSource, as_pdf_text_source
+from banks.field_extraction import FieldExtractionPlan
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.transaction_extraction import Transaction, TransactionExtractionPlan
 
 
-class BankAccountStatePDF(ABC):
+class BankAccountStateMixin:
+    """
+    Accessors shared by the BankAccountStatePDF classes (the parsers) and the
+    BankAccountStateRecord (the compact record kept for each PDF file loaded).
+    """
+
+    __slots__ = ()
 
     _SEPARATOR = f"-"*70
 
+    @property
+    def logger(self) -> CustomLogger:
+        return get_logger(self.get_bank_account_state_class_name())
+
+    def get_bank_account_state_class_name(self) -> str:
+        return self.__class__.__name__
+
+    def get_pdf_file_path(self):
+        return self.pdf_file_path
+
+    def get_fecha_de_corte(self, month_as_name: bool = False):
+        if month_as_name:
+            self.fecha_de_corte.strftime('%Y-%M-%d')
+        return self.fecha_de_corte.strftime('%Y-%m-%d')
+
+    def get_periodo_inicio(self):
+        return self.periodo_inicio.strftime('%Y-%m-%d')
+
+    def get_periodo_termino(self):
+        return self.periodo_termino.strftime('%Y-%m-%d')
+
+    def is_debit_account(self):
+        return self.is_debit
+
+    def is_credit_account(self):
+        return self.is_credit
+
+    def get_account_number(self):
+        """
+        Number of the account of the statement: account, card or client number (the first one found).
+        """
+        return self.numero_de_cuenta or self.numero_de_tarjeta or self.numero_de_cliente
+
+    def get_account_type_name(self):
+        if self.is_credit_account():
+            return "credito"
+        elif self.is_debit_account():
+            return "debito"
+
+    def get_human_readable_name(self) -> str:
+        return (
+            f"{self.get_bank_short_name()}_"
+            f"{self.get_account_type_name()}__"
+            f"{self.get_periodo_inicio()}__"
+            f"{self.month_short_name}"
+        )
+
+    def get_unique_name(self) -> str:
+        return (
+            f"{self.get_bank_name()}__"
+            f"{self.numero_de_cuenta}__"
+            f"{self.get_periodo_inicio()}__"
+            f"{self.get_periodo_termino()}"
+        )
+
+    def get_unique_file_id(self) -> str:
+        return (
+            f"{self.get_bank_name()}__"
+            f"{self.get_periodo_inicio()}__"
+            f"{self.get_periodo_termino()}__"
+            f"corte__{self.get_fecha_de_corte()}__"
+            f"size__{self.file_size_in_bytes}"
+        )
+
+    def get_amount(self, amount_field_name: str) -> Union[Decimal, None]:
+        """
+        Get a summary amount (e.g. 'saldo_final') as a Decimal (None if it was not found).
+        """
+        return amounts.get_amount_from_cents(getattr(self, amount_field_name))
+
+    def get_summary_amounts(self) -> dict[str, Union[int, None]]:
+        """
+        Get the summary amounts of the statement, in cents.
+        """
+        return {
+            amount_field_name: getattr(self, amount_field_name)
+            for amount_field_name in FieldExtractionPlan.AMOUNT_FIELDS
+        }
+
+    def get_transaction_extraction_plan(self) -> TransactionExtractionPlan:
+        raise NotImplementedError
+
+    def iter_transactions(self) -> Iterator[Transaction]:
+        """
+        Yield the transactions (line items) of the statement, page by page
+        (from the parse cache when the PDF file was already parsed).
+        """
+        from pdf_utils.parsers import PdfParseManager
+
+        pdf_text_source, _ = PdfParseManager().get_pdf_text_source(self.get_pdf_file_path())
+        return self.get_transaction_extraction_plan().iter_transactions(
+            pdf_text_source.iter_new_text(),
+            self.periodo_termino,
+            is_credit_account=self.is_credit_account(),
+        )
+
+    def get_detail_report(self):
+        return (
+            f"{self._SEPARATOR}\n"
+            f"[PDF]: '{self.pdf_file_basename}'\n"
+            f" > [Banco]: '{self.get_bank_name()}'\n"
+            f" > [Fecha-Corte]: '{self.get_fecha_de_corte()}'\n"
+            f" > [Periodo-Reporte]: '{self.get_periodo_inicio()}' -> '{self.get_periodo_termino()}'\n"
+            f" > [Fecha-Reporte]: '{self.month_name}'\n"
+            f"{self._SEPARATOR}\n"
+        )
+
+    def get_auto_rename_file_path(self) -> str:
+        return f"{self.pdf_file_dir_name}/{self.get_human_readable_name()}.pdf"
+
+    def auto_rename_file_name(self):
+        new_file_name = self.get_auto_rename_file_path()
+        if not os.path.exists(new_file_name):
+            if self.pdf_file_basename != new_file_name:
+                self.logger.info("[auto-rename] '%s' -> '%s'", self.pdf_file_path, new_file_name)
+                os.rename(self.pdf_file_path, new_file_name)
+                self.pdf_file_path = new_file_name
+                return new_file_name
+        elif self.pdf_file_path != new_file_name:
+            self.logger.warning(
+                "Not possible to rename the file '%s' -> '%s'", self.pdf_file_path, new_file_name
+            )
+
+
+class BankAccountStatePDF(BankAccountStateMixin, ABC):
+
     BANK_NAME = None
     BANK_SHORT_NAME = None
     PDF_KEYWORDS = []
@@ -27,98 +163,64 @@ class BankAccountStatePDF(ABC):
     PATTERN_NUMERO_DE_CLIENTE = None
     PATTERN_NUMERO_DE_TARJETA = None
 
+    # summary amounts: per bank, limited to its summary block (see 'get_summary_amount_pattern'
+    # of 'banks.field_extraction'), None: not extracted
+    PATTERN_SUMMARY_SECTION = None
+    PATTERN_SALDO_ANTERIOR = None
+    PATTERN_DEPOSITOS = None
+    PATTERN_RETIROS = None
+    PATTERN_SALDO_FINAL = None
+    PATTERN_PAGO_MINIMO = None
+    PATTERN_PAGO_PARA_NO_GENERAR_INTERESES = None
+
     # limit
     MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS = None
-
-    _SHORT_MONTH_MAPPING_ESP_TO_ENG = {
-        'ene': 'enero',
-        'feb': 'febrero',
-        'mar': 'marzo',
-        'abr': 'abril',
-        'may': 'mayo',
-        'jun': 'junio',
-        'jul': 'julio',
-        'ago': 'agosto',
-        'sep': 'septiembre',
-        'oct': 'octubre',
-        'nov': 'noviembre',
-        'dic': 'diciembre'
-    }
-
-    # Map Spanish month names to English month names
-    _MONTH_MAPPING_ESP_TO_ENG = {
-        'enero': 'January',
-        'febrero': 'February',
-        'marzo': 'March',
-        'abril': 'April',
-        'mayo': 'May',
-        'junio': 'June',
-        'julio': 'July',
-        'agosto': 'August',
-        'septiembre': 'September',
-        'octubre': 'October',
-        'noviembre': 'November',
-        'diciembre': 'December'
-    }
-
-    _MONTH_MAPPING_SPANISH_BY_NUMBER = {
-        1: 'Enero',
-        2: 'Febrero',
-        3: 'Marzo',
-        4: 'Abril',
-        5: 'Mayo',
-        6: 'Junio',
-        7: 'Julio',
-        8: 'Agosto',
-        9: 'Septiembre',
-        10: 'Octubre',
-        11: 'Noviembre',
-        12: 'Diciembre',
-    }
-
-    # Regex Patterns for dates
-    #   > '15 al 15 marzo de 2024'
-    RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY = r'^(\d{2})\s*al\s*(\d{2})\s*de\s*(\w+)+\s*de\s*(\d{4})$'
-    #   > '15 de marzo de 2024'
-    RE_PATTERN__DD_DE_MONTH_DE_YYYY = r'^(\d{1,2})\s*de\s*(\w+)+\s*de\s*(\d{4})$'
-    #   > '15 de marzo al 15 de abril de 2024'
-    RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY = (
-        r'^(\d{1,2})\s*de\s*(\w+)\s*al\s*(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})$'
-    )
-    #   > '15 de marzo del 2024 al 15 de abril del 2024'
+    MAX_LIMIT_TO_SEARCH_FOR_FIELDS = None
+
+    # transactions (line items): the layout of the movement lines of the bank, see the
+    # 'PATTERN_TRANSACTION__*' layouts of 'banks.transaction_extraction' and
+    # TransactionExtractionPlan for the named groups (None: not extracted)
+    PATTERN_TRANSACTION = None
+    # descriptions of the deposits, when the balance can't tell
+    TRANSACTION_CREDIT_KEYWORDS = [
+        "ABONO",
+        "DEPOSITO",
+        "DEPÓSITO",
+        "RECIBIDO",
+    ]
+
+    # compiled from the 'PATTERN_*' attributes when the class is defined
+    _FIELD_EXTRACTION_PLAN = None  # type: Union[FieldExtractionPlan, None]
+    _TRANSACTION_EXTRACTION_PLAN = None  # type: Union[TransactionExtractionPlan, None]
+
+    # the date strings are parsed by 'common.dates'
+    _SHORT_MONTH_MAPPING_ESP_TO_ENG = dates.SHORT_MONTH_MAPPING
+    _MONTH_MAPPING_ESP_TO_ENG = dates.MONTH_MAPPING_ESP_TO_ENG
+    _MONTH_MAPPING_SPANISH_BY_NUMBER = dates.MONTH_MAPPING_SPANISH_BY_NUMBER
+
+    RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY = dates.RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY
+    RE_PATTERN__DD_DE_MONTH_DE_YYYY = dates.RE_PATTERN__DD_DE_MONTH_DE_YYYY
+    RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY = dates.RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY
     RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY = (
-        r'^(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})\s*al\s*(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})$'
+        dates.RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY
     )
-    #   > '15-Mar-2024 al 15-Ago-2024'
     RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY = (
-        r'^(\d{1,2})\-(\w+)\-(\d{4})\s*al\s*(\d{1,2})\-(\w+)\-(\d{4})$'
-    )
-    #   > '15-Mar-2024'
-    RE_PATTERN__DD_dash_MONTH_dash_YYYY = (
-        r'^(\d{1,2})\-(\w+)\-(\d{4})$'
-    )
-    #   > '15 Ago 2024'
-    RE_PATTERN__DD_MMM_YYYY = (
-        r'^(\d{1,2})\s*(\w{3})\s*(\d{4})$'
-    )
-    #   > '01 Ago 2024 al 31 Ago 2024'
-    RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY = (
-        r'^(\d{1,2})\s*(\w{3})\s*(\d{4})\s*al\s*(\d{1,2})\s*(\w{3})\s*(\d{4})$'
-    )
-    #   > '10/01/2024'
-    RE_PATTERN__DD_slash_MM_slash_YYYY = (
-        r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})$'
+        dates.RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY
     )
-    #   > '11/12/2023 al 10/01/2024'
+    RE_PATTERN__DD_dash_MONTH_dash_YYYY = dates.RE_PATTERN__DD_dash_MONTH_dash_YYYY
+    RE_PATTERN__DD_MMM_YYYY = dates.RE_PATTERN__DD_MMM_YYYY
+    RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY = dates.RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY
+    RE_PATTERN__DD_slash_MM_slash_YYYY = dates.RE_PATTERN__DD_slash_MM_slash_YYYY
     RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY = (
-        r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})\s*al\s*(\d{1,2})\/(\d{1,2})\/(\d{4})$'
+        dates.RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY
     )
 
-    def __init__(self, pdf_file_path: str, raw_file_contents: str = None, is_image_pdf: bool = False):
-        self.logger = CustomLogger(
-            name=self.__class__.__name__,
-            level=settings.get_log_level(),
-        )
+    def __init__(
+        self,
+        pdf_file_path: str,
+        raw_file_contents: Union[str, PdfTextSource] = None,
+        is_image_pdf: bool = False,
+    ):
         self._bank_name = self.BANK_NAME
         self._bank_short_name = self.BANK_SHORT_NAME
         self.pdf_file_path = pdf_file_path
@@ -126,10 +228,8 @@ class BankAccountStatePDF(ABC):
         self.pdf_file_dir_name = str(os.path.dirname(pdf_file_path))
         self.is_image_pdf = is_image_pdf
 
-        # Load the raw file contents if not provided
-        if raw_file_contents is None:
-            self.raw_pdf_file_contents = self._load_raw_pdf_file_contents()
-        self.raw_pdf_file_contents = raw_file_contents
+        # The raw file contents are loaded lazily (page by page) when not provided
+        self.pdf_text_source = self._get_pdf_text_source(raw_file_contents)
 
         self.raw_data = {}
 
@@ -140,6 +240,14 @@ class BankAccountStatePDF(ABC):
         self.numero_de_tarjeta = None  # type: Union[str, None]
         self.numero_de_cliente = None  # type: Union[str, None]
 
+        # summary amounts, in cents
+        self.saldo_anterior = None  # type: Union[int, None]
+        self.depositos = None  # type: Union[int, None]
+        self.retiros = None  # type: Union[int, None]
+        self.saldo_final = None  # type: Union[int, None]
+        self.pago_minimo = None  # type: Union[int, None]
+        self.pago_para_no_generar_intereses = None  # type: Union[int, None]
+
         self.is_debit = False
         self.is_credit = False
         self.month_name = None  # type: Union[str, None]
@@ -150,17 +258,26 @@ class BankAccountStatePDF(ABC):
             self.file_size_in_bytes
         )
 
-        self.unique_hash_file_value = get_hash_from_string(
-            self.raw_pdf_file_contents
-        )
+        # computed on demand, from the identification fields
+        self.unique_hash_file_value = None  # type: Union[str, None]
 
         # parse the pdf file and load the data into the instance
         self.load_bank_data_from_pdf()
         self._validate_fields()
 
-    def _load_raw_pdf_file_contents(self):
-        file_contents = parse_pdf_with_pymupdf(self.pdf_file_path)
-        return file_contents
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_EXTRACTION_PLAN = FieldExtractionPlan.from_bank_account_state_class(cls)
+        cls._TRANSACTION_EXTRACTION_PLAN = TransactionExtractionPlan.from_bank_account_state_class(cls)
+
+    def _get_pdf_text_source(self, raw_file_contents: Union[str, PdfTextSource, None]) -> PdfTextSource:
+        if raw_file_contents is None:
+            return PdfTextSource(iter_pdf_pages_with_pymupdf(self.pdf_file_path))
+        return as_pdf_text_source(raw_file_contents)
+
+    @property
+    def raw_pdf_file_contents(self) -> str:
+        return self.pdf_text_source.get_full_text()
 
     def _validate_fields(self):
         main_empty_fields = []
@@ -184,19 +301,13 @@ class BankAccountStatePDF(ABC):
 
         # raise error if main fields are empty
         if main_empty_fields:
-            error_msg = (
-                "ERROR: some important fields were empty after the parsing process... | "
-                f"Bank: '{self.get_bank_name()}' | PDF File: '{self.get_pdf_file_path()}' | "
-                f"Fields: [{', '.join(main_empty_fields)}]"
-            )
-            raise RuntimeError(error_msg)
+            self._raise_main_empty_fields_error(main_empty_fields)
         elif minor_empty_fields:
-            warning_msg = (
-                "[!] WARNING: minor fields were empty after the parsing process... | "
-                f"Bank: '{self.get_bank_name()}' | PDF File: '{self.get_pdf_file_path()}' | "
-                f"Fields: [{', '.join(minor_empty_fields)}]"
+            self.logger.warning(
+                "minor fields were empty after the parsing process... | "
+                "Bank: '%s' | PDF File: '%s' | Fields: [%s]",
+                self.get_bank_name(), self.get_pdf_file_path(), ", ".join(minor_empty_fields),
             )
-            print(warning_msg)
 
         # post-process
         self.month_name = self._MONTH_MAPPING_SPANISH_BY_NUMBER.get(
@@ -204,31 +315,13 @@ class BankAccountStatePDF(ABC):
         )
         self.month_short_name = self.month_name[:3].upper()
 
-    def get_pdf_file_path(self):
-        return self.pdf_file_path
-
-    def get_fecha_de_corte(self, month_as_name: bool = False):
-        if month_as_name:
-            self.fecha_de_corte.strftime('%Y-%M-%d')
-        return self.fecha_de_corte.strftime('%Y-%m-%d')
-
-    def get_periodo_inicio(self):
-        return self.periodo_inicio.strftime('%Y-%m-%d')
-
-    def get_periodo_termino(self):
-        return self.periodo_termino.strftime('%Y-%m-%d')
-
-    def is_debit_account(self):
-        return self.is_debit
-
-    def is_credit_account(self):
-        return self.is_credit
-
-    def get_account_type_name(self):
-        if self.is_credit_account():
-            return "credito"
-        elif self.is_debit_account():
-            return "debito"
+    def _raise_main_empty_fields_error(self, main_empty_fields: list[str]):
+        error_msg = (
+            "ERROR: some important fields were empty after the parsing process... | "
+            f"Bank: '{self.get_bank_name()}' | PDF File: '{self.get_pdf_file_path()}' | "
+            f"Fields: [{', '.join(main_empty_fields)}]"
+        )
+        raise RuntimeError(error_msg)
 
     def get_bank_name(self) -> str:
         return self._bank_name
@@ -236,77 +329,55 @@ class BankAccountStatePDF(ABC):
     def get_bank_short_name(self) -> str:
         return self._bank_short_name
 
+    def get_transaction_extraction_plan(self) -> TransactionExtractionPlan:
+        return self._TRANSACTION_EXTRACTION_PLAN
+
     def get_unique_hash_file_value(self) -> str:
+        """
+        Hash of the fields that identify the bank account state (bank class,
+        account/card/client numbers, cut date and period): it doesn't need the
+        full text of the PDF file. Two PDF files with the same fields are only
+        told apart by their text when both are registered, see
+        PDFBankAccountStateManager.register_bank_account_state_object.
+        """
+        if self.unique_hash_file_value is None:
+            self.unique_hash_file_value = get_hash_from_string("|".join(
+                str(field_value) for field_value in (
+                    self.get_bank_account_state_class_name(),
+                    self.numero_de_cuenta,
+                    self.numero_de_tarjeta,
+                    self.numero_de_cliente,
+                    self.fecha_de_corte,
+                    self.periodo_inicio,
+                    self.periodo_termino,
+                )
+            ))
         return self.unique_hash_file_value
 
-    def get_human_readable_name(self) -> str:
-        return (
-            f"{self.get_bank_short_name()}_"
-            f"{self.get_account_type_name()}__"
-            f"{self.get_periodo_inicio()}__"
-            f"{self.month_short_name}"
-        )
-
-    def get_unique_name(self) -> str:
-        return (
-            f"{self.get_bank_name()}__"
-            f"{self.numero_de_cuenta}__"
-            f"{self.get_periodo_inicio()}__"
-            f"{self.get_periodo_termino()}"
-        )
-
-    def get_unique_file_id(self) -> str:
-        return (
-            f"{self.get_bank_name()}__"
-            f"{self.get_periodo_inicio()}__"
-            f"{self.get_periodo_termino()}__"
-            f"corte__{self.get_fecha_de_corte()}__"
-            f"size__{self.file_size_in_bytes}"
-        )
-
-    def get_detail_report(self):
-        return (
-            f"{self._SEPARATOR}\n"
-            f"[PDF]: '{self.pdf_file_basename}'\n"
-            f" > [Banco]: '{self.get_bank_name()}'\n"
-            f" > [Fecha-Corte]: '{self.get_fecha_de_corte()}'\n"
-            f" > [Periodo-Reporte]: '{self.get_periodo_inicio()}' -> '{self.get_periodo_termino()}'\n"
-            f" > [Fecha-Reporte]: '{self.month_name}'\n"
-            f"{self._SEPARATOR}\n"
-        )
-
-    def auto_rename_file_name(self):
-        new_file_name = f"{self.pdf_file_dir_name}/{self.get_human_readable_name()}.pdf"
-        if not os.path.exists(new_file_name):
-            if self.pdf_file_basename != new_file_name:
-                print(f"[auto-rename] '{self.pdf_file_path}' -> '{new_file_name}'")
-                os.rename(self.pdf_file_path, new_file_name)
-                self.pdf_file_path = new_file_name
-                return new_file_name
-        elif self.pdf_file_path != new_file_name:
-            print(
-                f"[!] Not possible to rename the file '{self.pdf_file_path}' -> '{new_file_name}'"
-            )
-
     @classmethod
-    def keywords_found_in_pdf_contents(cls, pdf_contents: str):
-        pdf_contents_as_lines = pdf_contents.split("\n")
-        if cls.MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS is not None:
-            pdf_contents_as_lines = pdf_contents_as_lines[:cls.MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS]
-
-        pdf_contents_as_text = "\n".join(pdf_contents_as_lines)
-
-        total_keywords_found = 0
+    def identification_fields_found_in_pdf_contents(cls, pdf_contents: Union[str, PdfTextSource]) -> bool:
+        """
+        Check if the mandatory fields and the account (or card) number, when
+        the class has a pattern for it, are found in the contents (e.g. only
+        the header of the first page).
+        """
+        field_matches = cls._FIELD_EXTRACTION_PLAN.extract(pdf_contents)
+        if cls._FIELD_EXTRACTION_PLAN.get_missing_mandatory_fields(field_matches):
+            return False
+        account_number_matches = [
+            field_matches[field_name]
+            for field_name in ("numero_de_cuenta", "numero_de_tarjeta")
+            if field_name in field_matches
+        ]
+        return not account_number_matches or any(account_number_matches)
 
-        for keyword in cls.PDF_KEYWORDS:
-            if keyword in pdf_contents_as_text:
-                if cls.ALL_KEYWORDS_SHOULD_BE_IN_PDF:
-                    total_keywords_found += 1
-                    if total_keywords_found == len(cls.PDF_KEYWORDS):
-                        return True
-                else:
-                    return True
-        return False
+    @classmethod
+    def keywords_found_in_pdf_contents(cls, pdf_contents: Union[str, PdfTextSource]) -> bool:
+        """
+        Check if the 'PDF_KEYWORDS' of the class are found in the contents
+        (with the single keyword scan of the registry, see BankAccountStateRegistry).
+        """
+        return BANK_ACCOUNT_STATE_REGISTRY.keywords_found_in_pdf_contents(cls, pdf_contents)
 
     @classmethod
     def format_date_period_string_into_datetime_tuple(cls, date_period_string):
@@ -314,163 +385,19 @@ class BankAccountStatePDF(ABC):
         Formats:
             '4 de febrero al 3 de marzo del 2024'
         """
-        date_period_string = date_period_string.lower()
-        date_data = cls.get_datetime_data_from_date_string(date_period_string)
-
-        start_day = date_data.get('start_day')
-        start_month = date_data.get('start_month')
-        end_day = date_data.get('end_day')
-        end_month = date_data.get('end_month')
-        year = date_data.get('year')
-
-        # Handle year offset in case of December being the start month
-        # and January being the end month.
-        # e.g. '4 de diciembre al 3 de enero del 2024'
-        year_offset = 0
-        if start_month.lower() == 'diciembre' and end_month.lower() == 'enero':
-            year_offset = 1
-
-        start_date_str = f"{start_day} de {start_month} de {int(year)-year_offset}"
-        end_date_str = f"{end_day} de {end_month} de {year}"
-
-        # Create datetime objects
-        start_date = cls.format_date_string_into_datetime(start_date_str)
-        end_date = cls.format_date_string_into_datetime(end_date_str)
-
-        return start_date, end_date
+        return dates.format_date_period_string_into_datetime_tuple(date_period_string)
 
     @classmethod
     def get_regex_pattern_from_date_string(cls, date_string):
-        date_string = date_string.lower()
-        pattern = None
-        if re.match(cls.RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY
-        elif re.match(cls.RE_PATTERN__DD_DE_MONTH_DE_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_DE_MONTH_DE_YYYY
-        elif re.match(cls.RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY
-        elif re.match(cls.RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY
-        elif re.match(cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY
-        elif re.match(cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY
-        elif re.match(cls.RE_PATTERN__DD_MMM_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_MMM_YYYY
-        elif re.match(cls.RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY
-        elif re.match(cls.RE_PATTERN__DD_slash_MM_slash_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_slash_MM_slash_YYYY
-        elif re.match(cls.RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY, date_string):
-            pattern = cls.RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY
-        if not pattern:
-            raise RuntimeError(
-                f"RE Pattern not supported for date string value: '{date_string}'"
-            )
-        return pattern
+        return dates.get_regex_pattern_from_date_string(date_string)
 
     @classmethod
     def get_datetime_data_from_date_string(cls, date_string) -> dict:
-
-        start_day = None
-        start_month = None
-        end_day = None
-        end_month = None
-        year = None
-
-        regex_pattern = cls.get_regex_pattern_from_date_string(date_string)
-        match_pattern = re.match(regex_pattern, date_string.lower())
-
-        if regex_pattern == cls.RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(3)
-            end_day = match_pattern.group(2)
-            end_month = start_month
-            year = match_pattern.group(4)
-
-        elif (
-            regex_pattern == cls.RE_PATTERN__DD_DE_MONTH_DE_YYYY
-            or regex_pattern == cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY
-        ):
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            year = match_pattern.group(3)
-
-        elif regex_pattern == cls.RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            end_day = match_pattern.group(3)
-            end_month = match_pattern.group(4)
-            year = match_pattern.group(5)
-
-        elif (
-            regex_pattern == cls.RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY
-            or regex_pattern == cls.RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY
-        ):
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            end_day = match_pattern.group(4)
-            end_month = match_pattern.group(5)
-            year = match_pattern.group(6)
-
-        elif regex_pattern == cls.RE_PATTERN__DD_MMM_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            year = match_pattern.group(3)
-
-        elif regex_pattern == cls.RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            end_day = match_pattern.group(4)
-            end_month = match_pattern.group(5)
-            year = match_pattern.group(6)
-
-        elif regex_pattern == cls.RE_PATTERN__DD_slash_MM_slash_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            year = match_pattern.group(3)
-
-        elif regex_pattern == cls.RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY:
-            start_day = match_pattern.group(1)
-            start_month = match_pattern.group(2)
-            end_day = match_pattern.group(4)
-            end_month = match_pattern.group(5)
-            year = match_pattern.group(6)
-
-        if start_month in cls._SHORT_MONTH_MAPPING_ESP_TO_ENG:
-            start_month = cls._SHORT_MONTH_MAPPING_ESP_TO_ENG[start_month]
-        if end_month in cls._SHORT_MONTH_MAPPING_ESP_TO_ENG:
-            end_month = cls._SHORT_MONTH_MAPPING_ESP_TO_ENG[end_month]
-
-        return {
-            "start_day": start_day,
-            "start_month": start_month,
-            "end_day": end_day,
-            "end_month": end_month,
-            "year": year,
-        }
+        return dates.get_datetime_data_from_date_string(date_string)
 
     @classmethod
     def format_date_string_into_datetime(cls, date_string):
-
-        date_data = cls.get_datetime_data_from_date_string(date_string)
-        day = date_data.get("start_day")
-        month = date_data.get("start_month")
-        year = date_data.get("year")
-
-        # Convert month number to month name in Spanish
-        # (to later one, convert the month name to English)
-        if month.isdigit():
-            month = cls._MONTH_MAPPING_SPANISH_BY_NUMBER.get(int(month)).lower()
-
-        # Convert month name to English
-        month = cls._MONTH_MAPPING_ESP_TO_ENG[month]
-
-        # Create datetime object
-        date_string = f"{day} {month} {year}"
-        datetime_object = datetime.strptime(date_string, "%d %B %Y")
-
-        return datetime_object
+        return dates.format_date_string_into_datetime(date_string)
 
     @classmethod
     def format_datetime_into_standard(cls, datetime_date: datetime):
@@ -478,53 +405,51 @@ class BankAccountStatePDF(ABC):
 
     def load_bank_data_from_pdf(self):
 
-        # Use re.search to find the pattern in the text
-        match_fecha_corte = re.search(
-            self.PATTERN_FECHA_DE_CORTE,
-            self.raw_pdf_file_contents
-        )
+        # Search all the patterns in a single pass over the text
+        # (the pages are loaded only until every pattern is found)
+        field_matches = self._FIELD_EXTRACTION_PLAN.extract(self.pdf_text_source)
 
-        match_periodo = re.search(
-            self.PATTERN_PERIODO,
-            self.raw_pdf_file_contents
+        # fail fast: don't parse the rest of the fields if a main one is missing
+        missing_mandatory_fields = self._FIELD_EXTRACTION_PLAN.get_missing_mandatory_fields(
+            field_matches
         )
-
-        match_numero_de_cuenta = re.search(
-            self.PATTERN_NUMERO_DE_CUENTA,
-            self.raw_pdf_file_contents
+        if missing_mandatory_fields:
+            main_empty_fields = []
+            if "fecha_de_corte" in missing_mandatory_fields:
+                main_empty_fields.append("fecha_de_corte")
+            if "periodo" in missing_mandatory_fields:
+                main_empty_fields.extend(["periodo_inicio", "periodo_termino"])
+            self._raise_main_empty_fields_error(main_empty_fields)
+
+        fecha_de_corte = field_matches["fecha_de_corte"].group(1)
+        self.raw_data["fecha_de_corte"] = fecha_de_corte
+        self.fecha_de_corte = self.format_date_string_into_datetime(fecha_de_corte)
+
+        periodo = field_matches["periodo"].group(1)
+        self.raw_data["periodo"] = periodo
+        self.periodo_inicio, self.periodo_termino = (
+            self.format_date_period_string_into_datetime_tuple(periodo)
         )
 
-        match_numero_cliente = re.search(
-            self.PATTERN_NUMERO_DE_CLIENTE,
-            self.raw_pdf_file_contents
-        )
-
-        if match_fecha_corte:
-            fecha_de_corte = match_fecha_corte.group(1)
-            self.raw_data["fecha_de_corte"] = fecha_de_corte
-            self.fecha_de_corte = self.format_date_string_into_datetime(fecha_de_corte)
-
-        if match_periodo:
-            periodo = match_periodo.group(1)
-            self.raw_data["periodo"] = periodo
-            self.periodo_inicio, self.periodo_termino = (
-                self.format_date_period_string_into_datetime_tuple(periodo)
-            )
-
+        match_numero_de_cuenta = field_matches.get("numero_de_cuenta")
         if match_numero_de_cuenta:
             self.numero_de_cuenta = match_numero_de_cuenta.group(1)
 
+        match_numero_cliente = field_matches.get("numero_de_cliente")
         if match_numero_cliente:
             self.numero_de_cliente = match_numero_cliente.group(1)
 
-        if self.PATTERN_NUMERO_DE_TARJETA is not None:
-            match_numero_de_tarjeta = re.search(
-                self.PATTERN_NUMERO_DE_TARJETA,
-                self.raw_pdf_file_contents
-            )
-
-            if match_numero_de_tarjeta:
-                self.numero_de_tarjeta = match_numero_de_tarjeta.group(1)
+        match_numero_de_tarjeta = field_matches.get("numero_de_tarjeta")
+        if match_numero_de_tarjeta:
+            self.numero_de_tarjeta = match_numero_de_tarjeta.group(1)
+
+        # the summary amounts are optional: a partial text (e.g. the OCR of the header only)
+        # may not have the summary block, the rest of the document is not loaded for them
+        for amount_field_name in FieldExtractionPlan.AMOUNT_FIELDS:
+            match_amount = field_matches.get(amount_field_name)
+            if match_amount:
+                self.raw_data[amount_field_name] = match_amount.group(1)
+                setattr(self, amount_field_name, amounts.parse_amount_in_cents(match_amount.group(1)))
 
     def __repr__(self):
         return (
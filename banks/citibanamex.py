@@ -1,6 +1,10 @@
 from banks.base_classes import BankAccountStatePDF
+from banks.field_extraction import get_summary_amount_pattern
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.transaction_extraction import PATTERN_TRANSACTION__AMOUNT_AND_BALANCE, PATTERN_TRANSACTION__SIGNED_AMOUNT
 
 
+@BANK_ACCOUNT_STATE_REGISTRY.register(priority=20)
 class CitiBanamexDebitPDF(BankAccountStatePDF):
 
     BANK_NAME = "citibanamex"
@@ -16,11 +20,25 @@ class CitiBanamexDebitPDF(BankAccountStatePDF):
     PATTERN_NUMERO_DE_CLIENTE = r"Número de cliente\n+(.*)"
     PATTERN_NUMERO_DE_TARJETA = None
 
+    # summary amounts: the title of the summary block, then the label of each amount
+    PATTERN_SUMMARY_SECTION = r"Resumen del periodo"
+    PATTERN_SALDO_ANTERIOR = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo anterior")
+    PATTERN_DEPOSITOS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"dep[óo]sitos")
+    PATTERN_RETIROS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"retiros")
+    PATTERN_SALDO_FINAL = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo al corte")
+
+    # the header fields are on the first page(s): the rest of the document is only
+    # searched for a mandatory field that is not there (with a warning)
+    MAX_LIMIT_TO_SEARCH_FOR_FIELDS = 300
+
+    PATTERN_TRANSACTION = PATTERN_TRANSACTION__AMOUNT_AND_BALANCE
+
     def __init__(self, pdf_file_path: str, raw_file_contents: str = None):
         super().__init__(pdf_file_path, raw_file_contents)
         self.is_debit = True
 
 
+@BANK_ACCOUNT_STATE_REGISTRY.register(priority=10)
 class CitiBanamexCreditCostcoPDF(BankAccountStatePDF):
 
     BANK_NAME = "citibanamex"
@@ -37,6 +55,21 @@ class CitiBanamexCreditCostcoPDF(BankAccountStatePDF):
     PATTERN_NUMERO_DE_CLIENTE = r"Número de cliente\n+(.*)"
     PATTERN_NUMERO_DE_TARJETA = r"NÚMERO DE TARJETA\n+(.*)"
 
+    # summary amounts: the title of the summary block, then the label of each amount
+    PATTERN_SUMMARY_SECTION = r"Resumen de cargos y abonos"
+    PATTERN_SALDO_ANTERIOR = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"adeudo del periodo anterior")
+    PATTERN_DEPOSITOS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"pagos y abonos")
+    PATTERN_RETIROS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"cargos")
+    PATTERN_SALDO_FINAL = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo al corte")
+    PATTERN_PAGO_MINIMO = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"pago m[íi]nimo")
+    PATTERN_PAGO_PARA_NO_GENERAR_INTERESES = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"pago para no generar intereses")
+
+    # the header fields are on the first page(s): the rest of the document is only
+    # searched for a mandatory field that is not there (with a warning)
+    MAX_LIMIT_TO_SEARCH_FOR_FIELDS = 300
+
+    PATTERN_TRANSACTION = PATTERN_TRANSACTION__SIGNED_AMOUNT
+
     def __init__(self, pdf_file_path: str, raw_file_contents: str = None):
         super().__init__(pdf_file_path, raw_file_contents)
         self.is_credit = True
@@ -0,0 +1,198 @@
+import re
+from typing import Union
+
+from common import amounts
+from common.logging import get_logger
+from pdf_utils.text_source import PdfTextSource, as_pdf_text_source
+
+logger = get_logger(__name__)
+
+# lines of the summary block searched after its title
+SUMMARY_SECTION_MAX_LINES = 12
+
+
+def get_summary_amount_pattern(summary_section_pattern: str, label_pattern: str) -> str:
+    """
+    Get the pattern of a summary amount (e.g. 'saldo_final') of a bank: the title
+    of its summary block, then the label at the start of one of the next
+    'SUMMARY_SECTION_MAX_LINES' lines, then the amount (same or next line).
+    The same label in the movements (or anywhere else) is not matched.
+
+    Both patterns are case-insensitive, and must not have capturing groups
+    (the first group of the pattern is the amount).
+    """
+    return (
+        rf"(?i){summary_section_pattern}[^\n]*\n(?:[^\n]*\n){{0,{SUMMARY_SECTION_MAX_LINES}}}?"
+        rf"[ \t]*{label_pattern}[^\d\n$]*?\s*{amounts.RE_PATTERN__AMOUNT}"
+    )
+
+
+class FieldExtractionPlan:
+    """
+    Compiled plan to extract the fields of a BankAccountStatePDF class.
+
+    The 'PATTERN_*' strings of the class are compiled once (when the class is
+    defined). All the fields are searched in the same pass over the pages:
+    every time a page is loaded, only the fields not found yet are searched,
+    and the pages stop loading as soon as all the fields were found.
+
+    The search can be limited to the first 'max_lines' lines of the text
+    ('MAX_LIMIT_TO_SEARCH_FOR_FIELDS'), and the optional fields are not
+    searched anymore once a mandatory field can't be found in the searched
+    region. A mandatory field that is not in the first 'max_lines' lines of
+    a longer document is searched in the full text (with a warning: the
+    limit of the class is too short for that layout).
+    """
+
+    # {field_name: class attribute with the pattern}
+    FIELD_PATTERN_ATTRIBUTES = {
+        "fecha_de_corte": "PATTERN_FECHA_DE_CORTE",
+        "periodo": "PATTERN_PERIODO",
+        "numero_de_cuenta": "PATTERN_NUMERO_DE_CUENTA",
+        "numero_de_cliente": "PATTERN_NUMERO_DE_CLIENTE",
+        "numero_de_tarjeta": "PATTERN_NUMERO_DE_TARJETA",
+        "saldo_anterior": "PATTERN_SALDO_ANTERIOR",
+        "depositos": "PATTERN_DEPOSITOS",
+        "retiros": "PATTERN_RETIROS",
+        "saldo_final": "PATTERN_SALDO_FINAL",
+        "pago_minimo": "PATTERN_PAGO_MINIMO",
+        "pago_para_no_generar_intereses": "PATTERN_PAGO_PARA_NO_GENERAR_INTERESES",
+    }
+    # summary amounts of the statement (the first group of the pattern is the amount)
+    AMOUNT_FIELDS = (
+        "saldo_anterior",
+        "depositos",
+        "retiros",
+        "saldo_final",
+        "pago_minimo",
+        "pago_para_no_generar_intereses",
+    )
+    MANDATORY_FIELDS = (
+        "fecha_de_corte",
+        "periodo",
+    )
+    # characters searched again when the next page is loaded
+    MATCH_OVERLAP = 1000
+
+    def __init__(self, field_patterns: dict[str, str], max_lines: int = None, name: str = None):
+        # fields with the same pattern share a single search
+        compiled_patterns = {}  # type: dict[str, re.Pattern]
+        self.field_patterns = {
+            field_name: compiled_patterns.setdefault(pattern, re.compile(pattern))
+            for field_name, pattern in field_patterns.items()
+            if pattern is not None
+        }  # type: dict[str, re.Pattern]
+        self.mandatory_patterns = {
+            self.field_patterns[field_name]
+            for field_name in self.MANDATORY_FIELDS
+            if field_name in self.field_patterns
+        }
+        # the mandatory fields are searched first, to fail fast
+        self.patterns = sorted(
+            set(self.field_patterns.values()),
+            key=lambda pattern: pattern not in self.mandatory_patterns,
+        )
+        self.max_lines = max_lines
+        # name of the plan in the logs (e.g. the BankAccountStatePDF class)
+        self.name = name
+
+    @classmethod
+    def from_bank_account_state_class(cls, bank_account_state_class) -> "FieldExtractionPlan":
+        return cls(
+            field_patterns={
+                field_name: getattr(bank_account_state_class, pattern_attribute, None)
+                for field_name, pattern_attribute in cls.FIELD_PATTERN_ATTRIBUTES.items()
+            },
+            max_lines=bank_account_state_class.MAX_LIMIT_TO_SEARCH_FOR_FIELDS,
+            name=bank_account_state_class.__name__,
+        )
+
+    def get_missing_mandatory_fields(self, field_matches: dict[str, re.Match]) -> list[str]:
+        return [
+            field_name for field_name in self.MANDATORY_FIELDS
+            if field_matches.get(field_name) is None
+        ]
+
+    def extract(self, pdf_contents: Union[str, PdfTextSource]) -> dict[str, Union[re.Match, None]]:
+        """
+        Get the {field_name: match} of the fields with a pattern (None if not found).
+
+        Each pattern resumes its search where the previous page left it: only
+        the new text is searched, plus the last 'MATCH_OVERLAP' characters
+        (a match may start at the end of a page and continue in the next one).
+        A match that reaches the end of the text loaded so far could continue
+        in the next page, so it is only accepted once more text is loaded.
+        When a mandatory field is missing, the optional fields that were not
+        found yet are not searched in the last chunk of text.
+        """
+        pdf_text_source = as_pdf_text_source(pdf_contents)
+        pattern_matches = {}  # type: dict[re.Pattern, re.Match]
+        pending_patterns = list(self.patterns)
+        # {pattern: position of the text where its search resumes}
+        resume_positions = {pattern: 0 for pattern in pending_patterns}
+        self._search_patterns(pdf_text_source, self.max_lines, pattern_matches, pending_patterns, resume_positions)
+
+        missing_mandatory_patterns = [
+            pattern for pattern in self.mandatory_patterns if pattern not in pattern_matches
+        ]
+        if missing_mandatory_patterns and self.max_lines is not None and (
+            not pdf_text_source.is_fully_loaded() or pdf_text_source.get_loaded_line_count() >= self.max_lines
+        ):
+            # the search window was too short for this document
+            logger.warning(
+                "[%s] mandatory fields not found in the first [%s] lines ('MAX_LIMIT_TO_SEARCH_FOR_FIELDS'): "
+                "[%s], searching the full text",
+                self.name,
+                self.max_lines,
+                ", ".join(
+                    field_name for field_name, pattern in self.field_patterns.items()
+                    if pattern in missing_mandatory_patterns
+                ),
+            )
+            self._search_patterns(pdf_text_source, None, pattern_matches, pending_patterns, resume_positions)
+
+        return {
+            field_name: pattern_matches.get(pattern)
+            for field_name, pattern in self.field_patterns.items()
+        }
+
+    def _search_patterns(
+        self,
+        pdf_text_source: PdfTextSource,
+        max_lines: Union[int, None],
+        pattern_matches: dict[re.Pattern, re.Match],
+        pending_patterns: list[re.Pattern],
+        resume_positions: dict[re.Pattern, int],
+    ):
+        """
+        Search the pending patterns in the first 'max_lines' lines of the text (None: the full text).
+        """
+        for end_position in pdf_text_source.iter_loaded_positions(max_lines=max_lines):
+            is_last_text = pdf_text_source.is_loaded(max_lines)
+            # {start position: text from it}, the patterns usually resume at the same position
+            texts = {}
+            for pattern in list(pending_patterns):
+                is_mandatory_field_missing = is_last_text and any(
+                    mandatory_pattern not in pattern_matches
+                    for mandatory_pattern in self.mandatory_patterns
+                )
+                if is_mandatory_field_missing and pattern not in self.mandatory_patterns:
+                    break
+                start_position = resume_positions[pattern]
+                if start_position not in texts:
+                    texts[start_position] = pdf_text_source.get_loaded_text(
+                        max_lines=max_lines,
+                        start_position=start_position,
+                    )
+                text = texts[start_position]
+                match = pattern.search(text)
+                if match and (match.end() < len(text) or is_last_text):
+                    pattern_matches[pattern] = match
+                    pending_patterns.remove(pattern)
+                elif match:
+                    resume_positions[pattern] = start_position + match.start()
+                else:
+                    resume_positions[pattern] = max(start_position, end_position - self.MATCH_OVERLAP)
+            if not pending_patterns:
+                break
+
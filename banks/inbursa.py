@@ -1,6 +1,10 @@
 from banks.base_classes import BankAccountStatePDF
+from banks.field_extraction import get_summary_amount_pattern
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.transaction_extraction import PATTERN_TRANSACTION__AMOUNT_AND_BALANCE
 
 
+@BANK_ACCOUNT_STATE_REGISTRY.register(priority=70)
 class InbursaDebitPDF(BankAccountStatePDF):
 
     BANK_NAME = "inbursa"
@@ -17,6 +21,19 @@ class InbursaDebitPDF(BankAccountStatePDF):
     PATTERN_NUMERO_DE_CLIENTE = r"Cliente Inbursa: (.*)"
     PATTERN_NUMERO_DE_TARJETA = None
 
+    # summary amounts: the title of the summary block, then the label of each amount
+    PATTERN_SUMMARY_SECTION = r"Resumen de saldos"
+    PATTERN_SALDO_ANTERIOR = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo anterior")
+    PATTERN_DEPOSITOS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"abonos")
+    PATTERN_RETIROS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"cargos")
+    PATTERN_SALDO_FINAL = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo actual")
+
+    # the header fields are on the first page(s): the rest of the document is only
+    # searched for a mandatory field that is not there (with a warning)
+    MAX_LIMIT_TO_SEARCH_FOR_FIELDS = 300
+
+    PATTERN_TRANSACTION = PATTERN_TRANSACTION__AMOUNT_AND_BALANCE
+
     def __init__(self, pdf_file_path: str, raw_file_contents: str = None):
         super().__init__(pdf_file_path, raw_file_contents)
         self.is_debit = True
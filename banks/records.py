@@ -0,0 +1,130 @@
+import dataclasses
+import os
+from datetime import datetime
+from typing import Union
+
+from banks.base_classes import BankAccountStateMixin, BankAccountStatePDF
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.transaction_extraction import TransactionExtractionPlan
+from common.file_hash_registry import FileHashRegistry
+from common.utils import get_hash_from_string
+
+
+@dataclasses.dataclass(slots=True, eq=False)
+class BankAccountStateRecord(BankAccountStateMixin):
+    """
+    Compact record of a bank account state loaded from a PDF file: only the
+    fields of the catalogue, without the text of the PDF file (reloaded on
+    demand from the parse cache, see 'raw_pdf_file_contents').
+
+    The BankAccountStatePDF objects are only used to parse the PDF files;
+    the PDFBankAccountStateManager keeps these records instead.
+    """
+
+    bank_account_state_class_name: str
+    bank_name: str
+    bank_short_name: str
+    is_debit: bool
+    is_credit: bool
+    is_image_pdf: bool
+    numero_de_cuenta: Union[str, None]
+    numero_de_cliente: Union[str, None]
+    numero_de_tarjeta: Union[str, None]
+    fecha_de_corte: datetime
+    periodo_inicio: datetime
+    periodo_termino: datetime
+    month_name: str
+    month_short_name: str
+    pdf_file_path: str
+    file_size_in_bytes: int
+    unique_hash_file_value: str
+    pdf_file_hash: Union[str, None] = None
+    # summary amounts, in cents
+    saldo_anterior: Union[int, None] = None
+    depositos: Union[int, None] = None
+    retiros: Union[int, None] = None
+    saldo_final: Union[int, None] = None
+    pago_minimo: Union[int, None] = None
+    pago_para_no_generar_intereses: Union[int, None] = None
+
+    @classmethod
+    def from_bank_account_state(cls, bank_account_state_obj: BankAccountStatePDF) -> "BankAccountStateRecord":
+        """
+        Get the record of a parsed BankAccountStatePDF object
+        (only from the fields already extracted, the rest of the PDF file is not loaded).
+        """
+        return cls(
+            bank_account_state_class_name=bank_account_state_obj.get_bank_account_state_class_name(),
+            bank_name=bank_account_state_obj.get_bank_name(),
+            bank_short_name=bank_account_state_obj.get_bank_short_name(),
+            is_debit=bank_account_state_obj.is_debit,
+            is_credit=bank_account_state_obj.is_credit,
+            is_image_pdf=bank_account_state_obj.is_image_pdf,
+            numero_de_cuenta=bank_account_state_obj.numero_de_cuenta,
+            numero_de_cliente=bank_account_state_obj.numero_de_cliente,
+            numero_de_tarjeta=bank_account_state_obj.numero_de_tarjeta,
+            fecha_de_corte=bank_account_state_obj.fecha_de_corte,
+            periodo_inicio=bank_account_state_obj.periodo_inicio,
+            periodo_termino=bank_account_state_obj.periodo_termino,
+            month_name=bank_account_state_obj.month_name,
+            month_short_name=bank_account_state_obj.month_short_name,
+            pdf_file_path=bank_account_state_obj.get_pdf_file_path(),
+            file_size_in_bytes=bank_account_state_obj.file_size_in_bytes,
+            unique_hash_file_value=bank_account_state_obj.get_unique_hash_file_value(),
+            # only if it was already computed (e.g. for the mapping table)
+            pdf_file_hash=FileHashRegistry().get_cached_file_hash(bank_account_state_obj.get_pdf_file_path()),
+            **bank_account_state_obj.get_summary_amounts(),
+        )
+
+    def get_bank_account_state_class_name(self) -> str:
+        return self.bank_account_state_class_name
+
+    def get_bank_name(self) -> str:
+        return self.bank_name
+
+    def get_bank_short_name(self) -> str:
+        return self.bank_short_name
+
+    def get_unique_hash_file_value(self) -> str:
+        return self.unique_hash_file_value
+
+    def get_transaction_extraction_plan(self) -> TransactionExtractionPlan:
+        return BANK_ACCOUNT_STATE_REGISTRY.get_registered_class_by_name(
+            self.bank_account_state_class_name
+        )._TRANSACTION_EXTRACTION_PLAN
+
+    @property
+    def pdf_file_basename(self) -> str:
+        return os.path.basename(self.pdf_file_path)
+
+    @property
+    def pdf_file_dir_name(self) -> str:
+        return os.path.dirname(self.pdf_file_path)
+
+    @property
+    def raw_pdf_file_contents(self) -> str:
+        from pdf_utils.parsers import PdfParseManager
+
+        return PdfParseManager().parse_pdf_file(self.pdf_file_path)[0]
+
+    def get_contents_hash(self) -> str:
+        """
+        Hash of the full text of the PDF file (from the parse cache, or parsed again).
+        """
+        return get_hash_from_string(self.raw_pdf_file_contents)
+
+    def copy_with_contents_hash(self) -> "BankAccountStateRecord":
+        """
+        Get a copy of the record whose unique hash includes the hash of the
+        full text of its PDF file (a statement with the same identification
+        fields as another one, but not the same text).
+        """
+        return dataclasses.replace(
+            self, unique_hash_file_value=f"{self.unique_hash_file_value}_{self.get_contents_hash()}"
+        )
+
+    def copy_for_pdf_file(self, pdf_file_path: str) -> "BankAccountStateRecord":
+        """
+        Get a copy of the record for a byte-identical PDF file (not parsed again).
+        """
+        return dataclasses.replace(self, pdf_file_path=pdf_file_path)
@@ -0,0 +1,203 @@
+import re
+from typing import Union
+
+from pdf_utils.text_source import PdfTextSource, as_pdf_text_source
+
+
+class BankAccountStateRegistry:
+    """
+    Registry of the BankAccountStatePDF classes, used to find the class of a PDF file.
+
+    The keywords of all the registered classes are compiled into a single
+    regex, so the text is scanned only once no matter how many banks are
+    registered. The first line where each keyword appears is recorded,
+    and the classes are then checked in priority order (lowest first) with
+    their own 'PDF_KEYWORDS', 'ALL_KEYWORDS_SHOULD_BE_IN_PDF' and
+    'MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS' rules.
+    """
+
+    def __init__(self):
+        # [(priority, bank_account_state_class, requires_image_pdf)]
+        self._registered_classes = []
+        self._keywords_regex = None  # type: Union[re.Pattern, None]
+        # {keyword: [keywords found inside of it]}
+        self._keywords_contained = {}
+        # keywords that may overlap the end of another keyword,
+        # so the single scan could miss them
+        self._keywords_to_verify = []
+        self._max_keyword_length = 0
+
+    def register(self, priority: int, requires_image_pdf: bool = False):
+        """
+        Class decorator to register a BankAccountStatePDF class.
+        """
+        def decorator(bank_account_state_class):
+            self._registered_classes.append(
+                (priority, bank_account_state_class, requires_image_pdf)
+            )
+            # stable sort: same priority keeps the registration order
+            self._registered_classes.sort(key=lambda registered_class: registered_class[0])
+            self._keywords_regex = None
+            return bank_account_state_class
+        return decorator
+
+    def get_registered_classes(self) -> list:
+        return [
+            bank_account_state_class
+            for _, bank_account_state_class, _ in self._registered_classes
+        ]
+
+    def get_registered_class_by_name(self, class_name: str):
+        for _, bank_account_state_class, _ in self._registered_classes:
+            if bank_account_state_class.__name__ == class_name:
+                return bank_account_state_class
+        raise KeyError(f"BankAccountStatePDF class not registered: '{class_name}'")
+
+    def _compile(self):
+        keywords = sorted(
+            {
+                keyword
+                for _, bank_account_state_class, _ in self._registered_classes
+                for keyword in bank_account_state_class.PDF_KEYWORDS
+            },
+            # longest first, so the alternation prefers the longest keyword
+            key=lambda keyword: (-len(keyword), keyword),
+        )
+        self._keywords_contained = {
+            keyword: [
+                other_keyword for other_keyword in keywords
+                if other_keyword != keyword and other_keyword in keyword
+            ]
+            for keyword in keywords
+        }
+        self._keywords_to_verify = [
+            keyword for keyword in keywords
+            if any(
+                other_keyword != keyword and _keywords_partially_overlap(other_keyword, keyword)
+                for other_keyword in keywords
+            )
+        ]
+        self._max_keyword_length = max((len(keyword) for keyword in keywords), default=0)
+        self._keywords_regex = re.compile(
+            "|".join(re.escape(keyword) for keyword in keywords) or r"(?!)"
+        )
+
+    def get_bank_account_state_class(
+        self,
+        pdf_contents: Union[str, PdfTextSource],
+        is_image_pdf: bool = False,
+    ):
+        """
+        Get the registered class that matches the PDF contents (None if no class matches).
+        The pages of a lazy PdfTextSource are loaded only until the class is decided.
+        """
+        candidate_classes = [
+            bank_account_state_class
+            for _, bank_account_state_class, requires_image_pdf in self._registered_classes
+            if is_image_pdf or not requires_image_pdf
+        ]
+        return self._find_matching_class(as_pdf_text_source(pdf_contents), candidate_classes)
+
+    def keywords_found_in_pdf_contents(self, bank_account_state_class, pdf_contents: Union[str, PdfTextSource]) -> bool:
+        """
+        Check if the keywords of a registered class are found in the PDF contents (same single scan).
+        """
+        if bank_account_state_class not in self.get_registered_classes():
+            raise KeyError(f"BankAccountStatePDF class not registered: '{bank_account_state_class.__name__}'")
+        return self._find_matching_class(as_pdf_text_source(pdf_contents), [bank_account_state_class]) is not None
+
+    def _find_matching_class(self, pdf_text_source: PdfTextSource, candidate_classes: list):
+        if self._keywords_regex is None:
+            self._compile()
+
+        # {keyword: first line number where it was found}
+        keywords_first_line = {}
+        # end position (and newlines before it) of the text already scanned
+        scanned_position = 0
+        scanned_line_count = 0
+        while True:
+            # only the text added since the last page is scanned, plus a small
+            # overlap: a keyword may start at the end of a page and continue in the next one
+            chunk_position = max(0, scanned_position - self._max_keyword_length + 1)
+            chunk = pdf_text_source.get_loaded_text(start_position=chunk_position)
+            chunk_line_count = scanned_line_count - chunk.count("\n", 0, scanned_position - chunk_position)
+            self._scan_keywords(chunk, chunk_line_count, keywords_first_line)
+            self._verify_keywords(chunk, chunk_line_count, keywords_first_line)
+            scanned_position = chunk_position + len(chunk)
+            scanned_line_count = pdf_text_source.get_loaded_line_count()
+
+            bank_account_state_class, is_decided = self._get_matching_class(
+                candidate_classes,
+                keywords_first_line,
+                scanned_line_count,
+                pdf_text_source.is_fully_loaded(),
+            )
+            if is_decided:
+                return bank_account_state_class
+            pdf_text_source.load_next_page()
+
+    def _scan_keywords(self, chunk: str, chunk_line_count: int, keywords_first_line: dict):
+        # the lines are counted incrementally, the matches only go forward
+        line_position = 0
+        line_number = chunk_line_count
+        for match in self._keywords_regex.finditer(chunk):
+            keyword = match.group()
+            if keyword in keywords_first_line and not self._keywords_contained[keyword]:
+                continue
+            line_number += chunk.count("\n", line_position, match.start())
+            line_position = match.start()
+            for found_keyword in (keyword, *self._keywords_contained[keyword]):
+                keywords_first_line.setdefault(found_keyword, line_number)
+
+    def _verify_keywords(self, chunk: str, chunk_line_count: int, keywords_first_line: dict):
+        for keyword in self._keywords_to_verify:
+            if keyword not in keywords_first_line:
+                keyword_position = chunk.find(keyword)
+                if keyword_position != -1:
+                    keywords_first_line[keyword] = chunk_line_count + chunk.count("\n", 0, keyword_position)
+
+    @staticmethod
+    def _get_matching_class(
+        candidate_classes: list,
+        keywords_first_line: dict,
+        total_lines_scanned: int,
+        is_fully_loaded: bool,
+    ) -> tuple[type, bool]:
+        """
+        Get the (bank_account_state_class, is_decided) for the keywords found so far.
+        The result is not decided while a class with higher priority could
+        still match with the rest of the text.
+        """
+        for bank_account_state_class in candidate_classes:
+            max_lines = bank_account_state_class.MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS
+            keywords_found = [
+                keyword in keywords_first_line
+                and (max_lines is None or keywords_first_line[keyword] < max_lines)
+                for keyword in bank_account_state_class.PDF_KEYWORDS
+            ]
+            if bank_account_state_class.ALL_KEYWORDS_SHOULD_BE_IN_PDF:
+                is_matching = bool(keywords_found) and all(keywords_found)
+            else:
+                is_matching = any(keywords_found)
+
+            if is_matching:
+                return bank_account_state_class, True
+            can_still_match = not is_fully_loaded and (
+                max_lines is None or total_lines_scanned < max_lines
+            )
+            if can_still_match:
+                return None, False
+        return None, True
+
+
+def _keywords_partially_overlap(keyword: str, other_keyword: str) -> bool:
+    """
+    Check if the end of 'keyword' is the start of 'other_keyword'.
+    """
+    return any(
+        keyword.endswith(other_keyword[:size])
+        for size in range(1, min(len(keyword), len(other_keyword)))
+    )
+
+
+BANK_ACCOUNT_STATE_REGISTRY = BankAccountStateRegistry()
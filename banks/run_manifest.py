@@ -0,0 +1,123 @@
+import json
+import os
+from typing import Union
+
+from common.utils import get_file_stat_signature
+
+
+class RunManifest:
+    """
+    Persisted outcome of the last runs, one entry per PDF file:
+
+        {pdf_file_path: {
+            "stat_signature": [size, mtime_ns, inode],
+            "status": "loaded" | "duplicate" | "older" | "unrecognized",
+            "unique_hash": str | None,
+            "output_file_path": str | None,
+        }}
+
+    A file whose stat signature did not change since its entry was recorded
+    doesn't have to be processed again (e.g. the files renamed or copied by
+    the program itself, or the PDF files that are not bank account states).
+    The records of the bank account states are kept by the StatementCatalog.
+
+    The entries are only valid for the same set of bank account state
+    classes, the manifest starts empty when they change.
+    """
+
+    STATUS_LOADED = "loaded"
+    STATUS_DUPLICATE = "duplicate"
+    STATUS_OLDER = "older"
+    STATUS_UNRECOGNIZED = "unrecognized"
+
+    def __init__(self, manifest_file_path: str, bank_account_state_class_names: list[str]):
+        self.manifest_file_path = manifest_file_path
+        self.bank_account_state_class_names = sorted(bank_account_state_class_names)
+        self.entries = {}  # type: dict[str, dict]
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.manifest_file_path):
+            return
+        with open(self.manifest_file_path, "r") as f_obj:
+            manifest_data = json.load(f_obj)
+        if manifest_data.get("bank_account_state_classes") == self.bank_account_state_class_names:
+            self.entries = manifest_data.get("entries", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_file_path), exist_ok=True)
+        manifest_data = {
+            "bank_account_state_classes": self.bank_account_state_class_names,
+            "entries": self.entries,
+        }
+        # written aside and replaced, so a crash never leaves a half-written manifest
+        tmp_file_path = f"{self.manifest_file_path}.tmp"
+        with open(tmp_file_path, "w") as f_obj:
+            json.dump(manifest_data, f_obj)
+        os.replace(tmp_file_path, self.manifest_file_path)
+
+    def get_entry(self, pdf_file_path: str) -> Union[dict, None]:
+        return self.entries.get(pdf_file_path)
+
+    def record(
+        self,
+        pdf_file_path: str,
+        status: str,
+        unique_hash: str = None,
+        output_file_path: str = None,
+    ):
+        try:
+            stat_signature = list(get_file_stat_signature(pdf_file_path))
+        except FileNotFoundError:
+            self.remove(pdf_file_path)
+            return
+        self.entries[pdf_file_path] = {
+            "stat_signature": stat_signature,
+            "status": status,
+            "unique_hash": unique_hash,
+            "output_file_path": output_file_path,
+        }
+
+    def set_output_file_path(self, pdf_file_path: str, output_file_path: str):
+        if pdf_file_path in self.entries:
+            self.entries[pdf_file_path]["output_file_path"] = output_file_path
+
+    def rename(self, pdf_file_path: str, new_pdf_file_path: str):
+        entry = self.entries.pop(pdf_file_path, None)
+        if entry is not None:
+            self.entries[new_pdf_file_path] = entry
+            # the rename keeps size and inode, but the mtime may differ on some file systems
+            entry["stat_signature"] = list(get_file_stat_signature(new_pdf_file_path))
+
+    def remove(self, pdf_file_path: str) -> Union[dict, None]:
+        return self.entries.pop(pdf_file_path, None)
+
+    def get_status_counts(self) -> dict[str, int]:
+        status_counts = {}
+        for entry in self.entries.values():
+            status_counts[entry["status"]] = status_counts.get(entry["status"], 0) + 1
+        return status_counts
+
+    def keep_entries(self, pdf_file_paths: set[str]):
+        """
+        Remove the entries of the files that are not in the list (e.g. not found anymore).
+        """
+        self.entries = {
+            pdf_file_path: entry
+            for pdf_file_path, entry in self.entries.items()
+            if pdf_file_path in pdf_file_paths
+        }
+
+    def is_unchanged(self, pdf_file_path: str, stat_signature: tuple = None) -> bool:
+        """
+        Check if the file has the same stat signature as in its entry.
+        """
+        entry = self.entries.get(pdf_file_path)
+        if entry is None:
+            return False
+        if stat_signature is None:
+            try:
+                stat_signature = get_file_stat_signature(pdf_file_path)
+            except FileNotFoundError:
+                return False
+        return entry["stat_signature"] == list(stat_signature)
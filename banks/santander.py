@@ -1,4 +1,7 @@
 from banks.base_classes import BankAccountStatePDF
+from banks.field_extraction import get_summary_amount_pattern
+from banks.registry import BANK_ACCOUNT_STATE_REGISTRY
+from banks.transaction_extraction import PATTERN_TRANSACTION__AMOUNT_AND_BALANCE
 
 
 class SantanderBasePDF(BankAccountStatePDF):
@@ -13,6 +16,7 @@ class SantanderBasePDF(BankAccountStatePDF):
 
     ALL_KEYWORDS_SHOULD_BE_IN_PDF = True
     MAX_LIMIT_TO_SEARCH_FOR_KEYWORDS = 200
+    MAX_LIMIT_TO_SEARCH_FOR_FIELDS = 200
 
     PATTERN_FECHA_DE_CORTE = r"PERIODO\s+\:\s+\d{2}\s+AL\s+(.*)"
     PATTERN_PERIODO = r"PERIODO\s+\:\s+(.*)"
@@ -21,15 +25,26 @@ class SantanderBasePDF(BankAccountStatePDF):
     PATTERN_NUMERO_DE_CLIENTE = r"CODIGO\s*\nDE\s*\nCLIENTE\s*\nNO\.\s*\n(.*)"
     PATTERN_NUMERO_DE_TARJETA = None
 
+    # summary amounts: the title of the summary block, then the label of each amount
+    PATTERN_SUMMARY_SECTION = r"Resumen del periodo"
+    PATTERN_SALDO_ANTERIOR = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo anterior")
+    PATTERN_DEPOSITOS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"dep[óo]sitos")
+    PATTERN_RETIROS = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"retiros")
+    PATTERN_SALDO_FINAL = get_summary_amount_pattern(PATTERN_SUMMARY_SECTION, r"saldo final")
+
+    PATTERN_TRANSACTION = PATTERN_TRANSACTION__AMOUNT_AND_BALANCE
+
     def __init__(self, pdf_file_path: str, raw_file_contents: str = None):
         super().__init__(pdf_file_path, raw_file_contents)
         self.is_debit = True
 
 
+@BANK_ACCOUNT_STATE_REGISTRY.register(priority=40)
 class SantanderDebitPDF(SantanderBasePDF):
     pass
 
 
+@BANK_ACCOUNT_STATE_REGISTRY.register(priority=30, requires_image_pdf=True)
 class SantanderDebitImagePDF(SantanderBasePDF):
 
     PATTERN_FECHA_DE_CORTE = r"CORTE\s{1}AL\s{1}(.*)"
@@ -0,0 +1,261 @@
+import dataclasses
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+from typing import Union
+
+from banks.records import BankAccountStateRecord
+from common.file_hash_registry import FileHashRegistry
+from common.logging import get_logger
+from common.utils import get_file_stat_signature
+
+logger = get_logger(__name__)
+
+
+class StatementCatalog:
+    """
+    On-disk catalog (SQLite) of the records of the bank account states
+    parsed, keyed by file hash: a PDF file already parsed (the same path and
+    stat signature, or the same bytes under another path) gets its record
+    back without classifying it or extracting its fields again.
+
+    One column per field of the BankAccountStateRecord (no serialization),
+    indexed by bank, account and period, so the catalogue (or a part of it)
+    is loaded without opening any PDF file.
+
+    The rows are only valid for the same set of bank account state classes
+    (and the same catalog version), the catalog starts empty when they change.
+
+    A single connection is kept open: the catalog is only used by the main
+    process (the worker processes only parse).
+    """
+
+    # change it when the fields of the records (or how they are computed) change
+    # 2: the unique hash is computed from the identification fields, not from the text
+    CATALOG_VERSION = 2
+
+    _RECORD_FIELDS = dataclasses.fields(BankAccountStateRecord)
+    _RECORD_COLUMNS = tuple(record_field.name for record_field in _RECORD_FIELDS)
+    # columns stored as text/integers, converted back when the records are loaded
+    _DATETIME_COLUMN_INDEXES = tuple(
+        column_index for column_index, record_field in enumerate(_RECORD_FIELDS) if record_field.type is datetime
+    )
+    _BOOL_COLUMN_INDEXES = tuple(
+        column_index for column_index, record_field in enumerate(_RECORD_FIELDS) if record_field.type is bool
+    )
+    _COLUMNS = (
+        "file_hash_algorithm",
+        "file_hash",
+        "file_stat_signature",
+        "account_type",
+        "account_number",
+        *_RECORD_COLUMNS,
+    )
+
+    def __init__(self, db_file_path: str, bank_account_state_class_names: list[str]):
+        self.db_file_path = db_file_path
+        self.catalog_key = json.dumps({
+            "catalog_version": self.CATALOG_VERSION,
+            "record_columns": self._RECORD_COLUMNS,
+            "bank_account_state_classes": sorted(bank_account_state_class_names),
+        })
+        self.file_hash_registry = FileHashRegistry()
+        # rows pending to be written: {(file_hash_algorithm, file_hash): row}
+        self.unsaved_rows = {}
+        self._connection = None  # type: Union[sqlite3.Connection, None]
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_file_path), exist_ok=True)
+            self._connection = sqlite3.connect(self.db_file_path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+        return self._connection
+
+    def _create_tables(self):
+        with self._connection as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)")
+            row = connection.execute("SELECT value FROM catalog_info WHERE key = 'catalog_key'").fetchone()
+            if row is None or row[0] != self.catalog_key:
+                if row is not None:
+                    logger.info("Statement catalog outdated, it starts empty: '%s'", self.db_file_path)
+                connection.execute("DROP TABLE IF EXISTS statements")
+                connection.execute(
+                    "INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('catalog_key', ?)",
+                    (self.catalog_key,),
+                )
+            record_columns_definition = "".join(
+                # the bank filter ignores the case
+                f" {column_name}{' COLLATE NOCASE' if column_name.startswith('bank_') else ''},"
+                for column_name in self._RECORD_COLUMNS
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS statements ("
+                " file_hash_algorithm TEXT,"
+                " file_hash TEXT,"
+                " file_stat_signature TEXT,"
+                " account_type TEXT,"
+                " account_number TEXT,"
+                f"{record_columns_definition}"
+                " PRIMARY KEY (file_hash_algorithm, file_hash)"
+                ")"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_statements_pdf_file_path ON statements (pdf_file_path)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_statements_account "
+                "ON statements (bank_name, account_type, account_number, periodo_inicio)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_statements_bank_short_name ON statements (bank_short_name)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_statements_periodo_inicio ON statements (periodo_inicio)"
+            )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _record_to_row(
+        self,
+        bank_account_state_record: BankAccountStateRecord,
+        pdf_file_hash: str = None,
+        stat_signature: tuple = None,
+    ) -> tuple:
+        pdf_file_path = bank_account_state_record.get_pdf_file_path()
+        record_values = [
+            getattr(bank_account_state_record, column_name) for column_name in self._RECORD_COLUMNS
+        ]
+        for column_index in self._DATETIME_COLUMN_INDEXES:
+            record_values[column_index] = record_values[column_index].isoformat()
+        return (
+            self.file_hash_registry.algorithm,
+            pdf_file_hash or self.file_hash_registry.get_file_hash(pdf_file_path),
+            json.dumps(list(stat_signature or get_file_stat_signature(pdf_file_path))),
+            bank_account_state_record.get_account_type_name(),
+            bank_account_state_record.get_account_number(),
+            *record_values,
+        )
+
+    @classmethod
+    def _row_to_record(cls, row: tuple) -> BankAccountStateRecord:
+        record_values = list(row)
+        for column_index in cls._DATETIME_COLUMN_INDEXES:
+            record_values[column_index] = datetime.fromisoformat(record_values[column_index])
+        for column_index in cls._BOOL_COLUMN_INDEXES:
+            record_values[column_index] = bool(record_values[column_index])
+        return BankAccountStateRecord(*record_values)
+
+    def add_record(
+        self,
+        bank_account_state_record: BankAccountStateRecord,
+        pdf_file_hash: str = None,
+        stat_signature: tuple = None,
+    ):
+        """
+        Add (or update, e.g. after a rename) the record of a PDF file.
+        The rows are written by 'save'.
+
+        The hash and the stat signature of the file are computed, if not given.
+        """
+        row = self._record_to_row(bank_account_state_record, pdf_file_hash, stat_signature)
+        self.unsaved_rows[row[:2]] = row
+
+    def save(self):
+        if not self.unsaved_rows:
+            return
+        with self._get_connection() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO statements ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                list(self.unsaved_rows.values()),
+            )
+        self.unsaved_rows = {}
+
+    def _select_records(self, where_clause: str = "", parameters: tuple = ()) -> list[BankAccountStateRecord]:
+        cursor = self._get_connection().execute(
+            f"SELECT {', '.join(self._RECORD_COLUMNS)} FROM statements {where_clause}",
+            parameters,
+        )
+        return [self._row_to_record(row) for row in cursor]
+
+    def get_record_by_pdf_file_path(
+        self,
+        pdf_file_path: str,
+        stat_signature: tuple,
+    ) -> Union[BankAccountStateRecord, None]:
+        """
+        Get the record of a PDF file, only if the file didn't change since it was added.
+        """
+        bank_account_state_records = self._select_records(
+            "WHERE pdf_file_path = ? AND file_stat_signature = ?",
+            (pdf_file_path, json.dumps(list(stat_signature))),
+        )
+        return bank_account_state_records[0] if bank_account_state_records else None
+
+    def get_record_by_pdf_file_hash(self, pdf_file_hash: str) -> Union[BankAccountStateRecord, None]:
+        """
+        Get the record of a PDF file with the same bytes (its path could be another one).
+        """
+        bank_account_state_records = self._select_records(
+            "WHERE file_hash_algorithm = ? AND file_hash = ?",
+            (self.file_hash_registry.algorithm, pdf_file_hash),
+        )
+        return bank_account_state_records[0] if bank_account_state_records else None
+
+    def get_records(
+        self,
+        since: date = None,
+        bank_name: str = None,
+    ) -> list[BankAccountStateRecord]:
+        """
+        Get the records of the catalog, optionally only the ones of a bank
+        (name or short name) or whose period starts on/after the 'since' date.
+        """
+        self.save()
+        where_clauses = []
+        parameters = []
+        if since is not None:
+            where_clauses.append("periodo_inicio >= ?")
+            parameters.append(since.isoformat())
+        if bank_name is not None:
+            where_clauses.append("(bank_name = ? OR bank_short_name = ?)")
+            parameters.extend([bank_name, bank_name])
+        return self._select_records(
+            f"WHERE {' AND '.join(where_clauses)}" if where_clauses else "",
+            tuple(parameters),
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        self.save()
+        total_records, = self._get_connection().execute("SELECT COUNT(*) FROM statements").fetchone()
+        return {
+            "records": total_records,
+            "size_in_bytes": os.path.getsize(self.db_file_path),
+        }
+
+    def prune(self, dry_run: bool = False) -> int:
+        """
+        Remove the records of the PDF files that don't exist anymore and get
+        how many were (or would be) removed.
+        """
+        self.save()
+        keys_to_remove = [
+            (file_hash_algorithm, file_hash)
+            for file_hash_algorithm, file_hash, pdf_file_path in self._get_connection().execute(
+                "SELECT file_hash_algorithm, file_hash, pdf_file_path FROM statements"
+            )
+            if not os.path.exists(pdf_file_path)
+        ]
+        if not dry_run:
+            with self._get_connection() as connection:
+                connection.executemany(
+                    "DELETE FROM statements WHERE file_hash_algorithm = ? AND file_hash = ?",
+                    keys_to_remove,
+                )
+        return len(keys_to_remove)
@@ -0,0 +1,168 @@
+import hashlib
+import re
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Iterable, Iterator, Union
+
+from common import amounts, dates
+
+# a line item of a bank account state ('cargo'/'abono' are positive amounts,
+# 'saldo' is None when the line has no balance)
+Transaction = namedtuple("Transaction", ["fecha", "descripcion", "cargo", "abono", "saldo"])
+
+# ignore the differences of rounding when the balance is checked
+_BALANCE_TOLERANCE = 0.005
+
+# Layouts of the movement lines (a movement per line of text), the bank classes
+# declare theirs in 'PATTERN_TRANSACTION'. They were written against the layouts
+# of the synthetic corpus ('benchmarks.corpus'): a bank whose PDF files put the
+# columns of a movement on separate lines needs its own pattern.
+
+# 'DD/MM DESCRIPTION AMOUNT BALANCE' (also 'DD/MMM', 'DD-MMM', with an optional year):
+# a single amount column and the running balance (debit accounts)
+PATTERN_TRANSACTION__AMOUNT_AND_BALANCE = (
+    r"(?P<fecha>\d{2}[/-](?:\d{2}|[A-Za-z]{3})(?:[/-]\d{2,4})?)\s+"
+    r"(?P<descripcion>.+?)\s+"
+    r"(?P<monto>-?\$?\s?[\d,]+\.\d{2})\s+"
+    r"(?P<saldo>-?\$?\s?[\d,]+\.\d{2})$"
+)
+# 'DD-MMM-YYYY [DD-MMM-YYYY] DESCRIPTION +/- $AMOUNT': the operation (and posting)
+# date, the payments negative and no balance column (credit cards)
+PATTERN_TRANSACTION__SIGNED_AMOUNT = (
+    r"(?P<fecha>\d{2}-[A-Za-z]{3}-\d{4})\s+(?:\d{2}-[A-Za-z]{3}-\d{4}\s+)?"
+    r"(?P<descripcion>.+?)\s+"
+    r"(?P<monto>[+-]?\s?\$?\s?[\d,]+\.\d{2})$"
+)
+
+
+def parse_amount(amount_string: Union[str, None]) -> Union[float, None]:
+    """
+    Same as 'common.amounts.parse_amount', as a float (the columns of the TransactionStore).
+    """
+    amount = amounts.parse_amount(amount_string)
+    return None if amount is None else float(amount)
+
+
+def get_transaction_date(date_string: str, periodo_termino: datetime) -> date:
+    """
+    Formats (the year, when missing, is the one of the statement period):
+        '31/01', '31/ENE', '31-ENE', '31/01/2024', '31-ENE-2024', '31/01/24'
+    """
+    day, month, *year = re.split(r"[/\-\s]", date_string.strip())
+    month = (
+        int(month) if month.isdigit()
+        else dates.MONTH_NUMBER_BY_SPANISH_NAME[dates.SHORT_MONTH_MAPPING[month[:3].lower()]]
+    )
+    if year:
+        year = int(year[0])
+        year = year + 2000 if year < 100 else year
+    else:
+        # a statement that ends in January can have movements of December
+        year = periodo_termino.year
+        if (month, int(day)) > (periodo_termino.month, periodo_termino.day):
+            year -= 1
+    return date(year, month, int(day))
+
+
+class TransactionExtractionPlan:
+    """
+    Compiled plan to extract the transactions (line items) of a
+    BankAccountStatePDF class, from its 'PATTERN_TRANSACTION': a regex
+    matched against each line of the text, with the named groups:
+
+        fecha (mandatory), descripcion, cargo, abono, saldo
+        monto: single amount column, when the layout has no cargo/abono columns
+
+    The text is consumed page by page: only the last (incomplete) line of a
+    page is kept until the next page is loaded.
+
+    With a single 'monto' column, the amount is a 'cargo' or an 'abono'
+    depending on how the balance changed (a credit card balance grows with
+    the charges). When there is no previous balance to compare with, the
+    'TRANSACTION_CREDIT_KEYWORDS' of the description decide.
+    """
+
+    def __init__(self, pattern: Union[str, None], credit_keywords: list[str] = None):
+        self.pattern = re.compile(pattern) if pattern else None  # type: Union[re.Pattern, None]
+        self.credit_keywords = [keyword.upper() for keyword in credit_keywords or []]
+        # identifies the transactions extracted with this plan (e.g. in the TransactionStore)
+        self.fingerprint = hashlib.blake2b(
+            "\n".join([pattern or "", *self.credit_keywords]).encode("utf-8"), digest_size=6
+        ).hexdigest()
+
+    @classmethod
+    def from_bank_account_state_class(cls, bank_account_state_class) -> "TransactionExtractionPlan":
+        return cls(
+            pattern=bank_account_state_class.PATTERN_TRANSACTION,
+            credit_keywords=bank_account_state_class.TRANSACTION_CREDIT_KEYWORDS,
+        )
+
+    def _is_credit_description(self, descripcion: str) -> bool:
+        descripcion = descripcion.upper()
+        return any(keyword in descripcion for keyword in self.credit_keywords)
+
+    def _get_transaction(
+        self,
+        match: re.Match,
+        periodo_termino: datetime,
+        is_credit_account: bool,
+        previous_saldo: Union[float, None],
+    ) -> Transaction:
+        group_values = match.groupdict()
+        descripcion = " ".join((group_values.get("descripcion") or "").split())
+        saldo = parse_amount(group_values.get("saldo"))
+        cargo = parse_amount(group_values.get("cargo")) or 0.0
+        abono = parse_amount(group_values.get("abono")) or 0.0
+        monto = parse_amount(group_values.get("monto"))
+        if monto is not None:
+            if previous_saldo is not None and saldo is not None:
+                # the balance of a credit card is what is owed
+                balance_change = (saldo - previous_saldo) * (-1 if is_credit_account else 1)
+                is_abono = abs(balance_change - monto) <= _BALANCE_TOLERANCE
+            else:
+                is_abono = monto < 0 if is_credit_account else self._is_credit_description(descripcion)
+            if is_abono:
+                abono = abs(monto)
+            else:
+                cargo = abs(monto)
+        return Transaction(
+            fecha=get_transaction_date(group_values["fecha"], periodo_termino),
+            descripcion=descripcion,
+            cargo=cargo,
+            abono=abono,
+            saldo=saldo,
+        )
+
+    def _iter_lines(self, pages: Iterable[str]) -> Iterator[str]:
+        incomplete_line = ""
+        for page_text in pages:
+            lines = (incomplete_line + page_text).split("\n")
+            incomplete_line = lines.pop()
+            yield from lines
+        if incomplete_line:
+            yield incomplete_line
+
+    def iter_transactions(
+        self,
+        pages: Iterable[str],
+        periodo_termino: datetime,
+        is_credit_account: bool = False,
+    ) -> Iterator[Transaction]:
+        """
+        Yield the transactions of the text, as each page is consumed.
+        """
+        if self.pattern is None:
+            return
+        previous_saldo = None
+        for line in self._iter_lines(pages):
+            match = self.pattern.match(line.strip())
+            if match is None:
+                continue
+            try:
+                transaction = self._get_transaction(match, periodo_termino, is_credit_account, previous_saldo)
+            except (KeyError, ValueError):
+                # e.g. a line that looks like a transaction but has an invalid date
+                continue
+            if transaction.saldo is not None:
+                previous_saldo = transaction.saldo
+            yield transaction
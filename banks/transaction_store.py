@@ -0,0 +1,266 @@
+import io
+import os
+from datetime import date
+from typing import Iterable, Union
+
+from banks.transaction_extraction import Transaction
+
+
+class TransactionTable:
+    """
+    Transactions of one or more statements as NumPy columns:
+
+        statement_codes:   int32 (index in 'statement_keys')
+        fecha:             datetime64[D]
+        descripcion_codes: int32 (index in 'descripcion_values', dictionary encoded)
+        cargo, abono:      float64
+        saldo:             float64 (NaN when the line has no balance)
+
+    The queries are vectorised scans over the columns; the descriptions are
+    only searched in the dictionary (each distinct description once).
+    """
+
+    COLUMN_NAMES = ("statement_codes", "fecha", "descripcion_codes", "cargo", "abono", "saldo")
+
+    def __init__(self, columns: dict, descripcion_values, statement_keys: list[str]):
+        self.columns = columns
+        self.descripcion_values = descripcion_values
+        self.statement_keys = statement_keys
+
+    def __len__(self) -> int:
+        return len(self.columns["fecha"])
+
+    def __getitem__(self, column_name: str):
+        return self.columns[column_name]
+
+    @classmethod
+    def from_transactions(
+        cls,
+        transactions: Iterable[Transaction],
+        statement_key: Union[str, None],
+    ) -> "TransactionTable":
+        import numpy as np
+
+        transactions = list(transactions)
+        descripcion_values, descripcion_codes = np.unique(
+            np.array([transaction.descripcion for transaction in transactions], dtype=str),
+            return_inverse=True,
+        )
+        columns = {
+            "statement_codes": np.zeros(len(transactions), dtype=np.int32),
+            "fecha": np.array([transaction.fecha for transaction in transactions], dtype="datetime64[D]"),
+            "descripcion_codes": descripcion_codes.astype(np.int32),
+            "cargo": np.array([transaction.cargo for transaction in transactions], dtype=np.float64),
+            "abono": np.array([transaction.abono for transaction in transactions], dtype=np.float64),
+            "saldo": np.array(
+                [np.nan if transaction.saldo is None else transaction.saldo for transaction in transactions],
+                dtype=np.float64,
+            ),
+        }
+        return cls(columns, descripcion_values, [] if statement_key is None else [statement_key])
+
+    @classmethod
+    def concatenate(cls, tables: list["TransactionTable"]) -> "TransactionTable":
+        """
+        Single table with the rows of all the tables (the dictionaries are merged).
+        """
+        import numpy as np
+
+        if not tables:
+            return cls.from_transactions([], statement_key=None)
+        descripcion_values, descripcion_inverse = np.unique(
+            np.concatenate([table.descripcion_values for table in tables]), return_inverse=True
+        )
+        columns = {column_name: [] for column_name in cls.COLUMN_NAMES}
+        statement_keys = []
+        descripcion_offset = 0
+        for table in tables:
+            for column_name in ("fecha", "cargo", "abono", "saldo"):
+                columns[column_name].append(table[column_name])
+            columns["statement_codes"].append(table["statement_codes"] + len(statement_keys))
+            columns["descripcion_codes"].append(
+                descripcion_inverse[descripcion_offset + table["descripcion_codes"]].astype(np.int32)
+            )
+            statement_keys.extend(table.statement_keys)
+            descripcion_offset += len(table.descripcion_values)
+        return cls(
+            {column_name: np.concatenate(column) for column_name, column in columns.items()},
+            descripcion_values,
+            statement_keys,
+        )
+
+    def filter(self, mask) -> "TransactionTable":
+        """
+        Table with only the rows of the boolean mask (e.g. the 'get_mask_*' methods combined).
+        """
+        return TransactionTable(
+            {column_name: column[mask] for column_name, column in self.columns.items()},
+            self.descripcion_values,
+            self.statement_keys,
+        )
+
+    def get_mask_between(self, start_date: Union[date, None] = None, end_date: Union[date, None] = None):
+        import numpy as np
+
+        mask = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            mask &= self["fecha"] >= np.datetime64(start_date, "D")
+        if end_date is not None:
+            mask &= self["fecha"] <= np.datetime64(end_date, "D")
+        return mask
+
+    def get_mask_descripcion_contains(self, text: str):
+        import numpy as np
+
+        matching_codes = np.flatnonzero(
+            np.char.find(np.char.upper(self.descripcion_values), text.upper()) >= 0
+        )
+        return np.isin(self["descripcion_codes"], matching_codes)
+
+    def get_mask_of_statements(self, statement_keys: Iterable[str]):
+        import numpy as np
+
+        statement_keys = set(statement_keys)
+        matching_codes = [
+            statement_code for statement_code, statement_key in enumerate(self.statement_keys)
+            if statement_key in statement_keys
+        ]
+        return np.isin(self["statement_codes"], matching_codes)
+
+    def get_descripciones(self):
+        return self.descripcion_values[self["descripcion_codes"]]
+
+    def get_totals(self) -> dict[str, float]:
+        return {
+            "cargo": float(self["cargo"].sum()),
+            "abono": float(self["abono"].sum()),
+            "transactions": len(self),
+        }
+
+    def get_totals_by_month(self) -> dict[str, dict[str, float]]:
+        """
+        Get the totals by month: {'YYYY-MM': {'cargo': .., 'abono': .., 'transactions': ..}}
+        """
+        import numpy as np
+
+        months, month_codes = np.unique(self["fecha"].astype("datetime64[M]"), return_inverse=True)
+        cargo_totals = np.bincount(month_codes, weights=self["cargo"], minlength=len(months))
+        abono_totals = np.bincount(month_codes, weights=self["abono"], minlength=len(months))
+        transaction_counts = np.bincount(month_codes, minlength=len(months))
+        return {
+            str(month): {
+                "cargo": float(cargo_total),
+                "abono": float(abono_total),
+                "transactions": int(transaction_count),
+            }
+            for month, cargo_total, abono_total, transaction_count in zip(
+                months, cargo_totals, abono_totals, transaction_counts
+            )
+        }
+
+
+class TransactionStore:
+    """
+    On-disk columnar store of the transactions: one compressed '.npz' file
+    (the NumPy columns of a TransactionTable) per statement key.
+
+    The statement key identifies the statement and how its transactions were
+    extracted (e.g. '<unique hash>_<plan fingerprint>'), so the files are
+    never updated: a new key is written instead, and the keys not used
+    anymore can be pruned.
+    """
+
+    FILE_EXTENSION = ".npz"
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+    def _get_statement_file_path(self, statement_key: str) -> str:
+        return os.path.join(self.store_dir, f"{statement_key}{self.FILE_EXTENSION}")
+
+    def has_statement(self, statement_key: str) -> bool:
+        return os.path.exists(self._get_statement_file_path(statement_key))
+
+    def get_statement_keys(self) -> list[str]:
+        if not os.path.isdir(self.store_dir):
+            return []
+        return [
+            file_name[:-len(self.FILE_EXTENSION)]
+            for file_name in sorted(os.listdir(self.store_dir))
+            if file_name.endswith(self.FILE_EXTENSION)
+        ]
+
+    def save_statement_transactions(self, statement_key: str, transactions: Iterable[Transaction]) -> int:
+        """
+        Save the transactions of a statement and get how many were saved.
+        """
+        import numpy as np
+
+        transaction_table = TransactionTable.from_transactions(transactions, statement_key)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            descripcion_values=transaction_table.descripcion_values,
+            **{
+                column_name: transaction_table[column_name]
+                for column_name in TransactionTable.COLUMN_NAMES
+                if column_name != "statement_codes"
+            },
+        )
+        os.makedirs(self.store_dir, exist_ok=True)
+        # written aside and replaced, so a file in the store is always complete
+        statement_file_path = self._get_statement_file_path(statement_key)
+        tmp_file_path = f"{statement_file_path}.tmp"
+        with open(tmp_file_path, "wb") as f_obj:
+            f_obj.write(buffer.getvalue())
+        os.replace(tmp_file_path, statement_file_path)
+        return len(transaction_table)
+
+    def _load_statement(self, statement_key: str) -> TransactionTable:
+        import numpy as np
+
+        with np.load(self._get_statement_file_path(statement_key), allow_pickle=False) as npz_data:
+            columns = {
+                column_name: npz_data[column_name]
+                for column_name in TransactionTable.COLUMN_NAMES
+                if column_name != "statement_codes"
+            }
+            descripcion_values = npz_data["descripcion_values"]
+        columns["statement_codes"] = np.zeros(len(columns["fecha"]), dtype=np.int32)
+        return TransactionTable(columns, descripcion_values, [statement_key])
+
+    def load(self, statement_keys: Iterable[str] = None) -> TransactionTable:
+        """
+        Load the transactions of the statements (all the statements of the store by default).
+        """
+        if statement_keys is None:
+            statement_keys = self.get_statement_keys()
+        return TransactionTable.concatenate(
+            [
+                self._load_statement(statement_key)
+                for statement_key in statement_keys
+                if self.has_statement(statement_key)
+            ]
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        statement_keys = self.get_statement_keys()
+        return {
+            "statements": len(statement_keys),
+            "size_in_bytes": sum(
+                os.path.getsize(self._get_statement_file_path(statement_key)) for statement_key in statement_keys
+            ),
+        }
+
+    def prune(self, statement_keys_to_keep: set[str], dry_run: bool = False) -> int:
+        """
+        Remove the statements that are not in the set and get how many were (or would be) removed.
+        """
+        statement_keys_to_remove = [
+            statement_key for statement_key in self.get_statement_keys()
+            if statement_key not in statement_keys_to_keep
+        ]
+        if not dry_run:
+            for statement_key in statement_keys_to_remove:
+                os.remove(self._get_statement_file_path(statement_key))
+        return len(statement_keys_to_remove)
@@ -0,0 +1,113 @@
+"""
+Startup of the commands that work from the last scan ('list', 'report'...):
+the records of the statements loaded from the StatementCatalog, against
+parsing the PDF files again.
+
+The catalog is filled with '--records' records (copies of the records of a
+small synthetic corpus, under other paths and hashes), so no PDF file is
+needed at that scale. The parse time is measured over the corpus (empty
+parse cache) and extrapolated to the same number of records.
+
+Usage:
+    python -m benchmarks.catalog_load [--records 50000] [--files 20] [--seed 0] [--output results.json]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import settings
+from benchmarks.corpus import generate_corpus
+from common.report_manager import ReportManager
+
+
+def _get_parse_seconds_per_file(pdf_files: list[str]) -> tuple[float, list]:
+    from banks.account_state_manager import PDFBankAccountStateManager
+
+    start_time = time.perf_counter()
+    bank_account_state_records = [
+        PDFBankAccountStateManager.get_bank_account_state_record_from_pdf_file(pdf_file) for pdf_file in pdf_files
+    ]
+    return (time.perf_counter() - start_time) / len(pdf_files), bank_account_state_records
+
+
+def _fill_statement_catalog(statement_catalog, bank_account_state_records: list, total_records: int):
+    for record_index in range(total_records):
+        bank_account_state_record = bank_account_state_records[record_index % len(bank_account_state_records)]
+        statement_catalog.add_record(
+            bank_account_state_record.copy_for_pdf_file(f"/benchmark/{record_index}.pdf"),
+            pdf_file_hash=f"benchmark_{record_index}",
+            stat_signature=(record_index, record_index, record_index),
+        )
+    statement_catalog.save()
+
+
+def _get_load_seconds(function) -> tuple[float, int]:
+    start_time = time.perf_counter()
+    total_records = len(function())
+    return time.perf_counter() - start_time, total_records
+
+
+def get_catalog_load_results(pdf_files: list[str], total_records: int) -> dict:
+    from banks.account_state_manager import PDFBankAccountStateManager
+    from banks.statement_catalog import StatementCatalog
+
+    parse_seconds_per_file, bank_account_state_records = _get_parse_seconds_per_file(pdf_files)
+    bank_account_state_records = [record for record in bank_account_state_records if record]
+    db_file_path = f"{settings.get_tmp_dir()}/{PDFBankAccountStateManager.STATEMENT_CATALOG_FILE_PATH}"
+    _fill_statement_catalog(StatementCatalog(db_file_path, []), bank_account_state_records, total_records)
+
+    # a new catalog, as in the startup of a command
+    statement_catalog = StatementCatalog(db_file_path, [])
+    bank_name = bank_account_state_records[0].get_bank_name()
+    since = max(record.periodo_inicio for record in bank_account_state_records).date()
+    load_results = {}
+    for load_name, load_function in (
+        ("all", lambda: statement_catalog.get_records()),
+        ("bank", lambda: statement_catalog.get_records(bank_name=bank_name)),
+        ("since", lambda: statement_catalog.get_records(since=since)),
+    ):
+        load_seconds, total_records_loaded = _get_load_seconds(load_function)
+        load_results[load_name] = {"seconds": load_seconds, "records": total_records_loaded}
+    return {
+        "total_records": total_records,
+        "catalog_size_in_bytes": os.path.getsize(db_file_path),
+        "load": load_results,
+        "parse_seconds_per_file": parse_seconds_per_file,
+        "parse_seconds_estimated": parse_seconds_per_file * total_records,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--files", type=int, default=20, help="PDF files of the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to save the results")
+    args = parser.parse_args()
+
+    corpus_dir = f"{settings.get_tmp_dir()}/benchmarks/corpus_{args.files}_3_0.0_{args.seed}"
+    pdf_files = generate_corpus(corpus_dir, total_files=args.files, pages=3, seed=args.seed)
+
+    # own (empty) tmp dir, so the caches of the project are not used
+    tmp_dir = tempfile.mkdtemp(prefix="bank_account_manager_benchmark_")
+    os.environ[settings.TMP_DIR_ENV_VARIABLE] = tmp_dir
+    try:
+        results = get_catalog_load_results(pdf_files, args.records)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"Statement catalog: [{results['total_records']}] records ({results['catalog_size_in_bytes']} bytes)")
+    for load_name, load_result in results["load"].items():
+        print(f" > load {load_name:6} {load_result['records']:8} records: {load_result['seconds']:8.3f} s")
+    print(
+        f" > parse (estimated, {results['parse_seconds_per_file'] * 1000:.1f} ms per file): "
+        f"{results['parse_seconds_estimated']:8.1f} s"
+    )
+    if args.output:
+        ReportManager().generate_json_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Synthetic corpus of bank account states, generated with PyMuPDF.
+
+Each layout reproduces the text of a bank account state class (the keywords
+and the fields its patterns look for), followed by pages of random
+movements. A share of the files can be rasterised into image-only PDFs
+(the OCR path).
+
+Every file gets its own period and account numbers, so the files are not
+duplicates of each other. The corpus is reproducible: same arguments, same files.
+
+Usage:
+    python -m benchmarks.corpus OUTPUT_DIR [--files 10] [--pages 3] [--image-ratio 0] [--seed 0]
+"""
+import argparse
+import calendar
+import json
+import os
+import random
+from datetime import date
+
+from common import dates
+
+CORPUS_MANIFEST_FILE_NAME = "corpus.json"
+# changes when the generated files change (the corpora of other versions are generated again)
+CORPUS_VERSION = 4
+IMAGE_VARIANT_DPI = 150
+
+
+def _get_month_name(month: int) -> str:
+    return dates.MONTH_MAPPING_SPANISH_BY_NUMBER[month].lower()
+
+
+def _get_short_month_name(month: int) -> str:
+    return dates.MONTH_MAPPING_SPANISH_BY_NUMBER[month][:3]
+
+
+def _get_bbva_debit_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    return [
+        "BBVA",
+        "Cuenta NOMINA",
+        "Fecha de Corte",
+        end.strftime("%d/%m/%Y"),
+        "Periodo",
+        f"DEL {start.strftime('%d/%m/%Y')} AL {end.strftime('%d/%m/%Y')}",
+        "No. de Cuenta",
+        f"{rng.randrange(10 ** 10):010d}",
+        "No. de Cliente",
+        f"C{rng.randrange(10 ** 8):08d}",
+    ]
+
+
+def _get_bbva_credit_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    start_string = f"{start.day:02d}-{_get_short_month_name(start.month)}-{start.year}"
+    end_string = f"{end.day:02d}-{_get_short_month_name(end.month)}-{end.year}"
+    return [
+        "BBVA",
+        "Pago para no generar intereses",
+        "Fecha de corte:",
+        end_string,
+        "Periodo:",
+        f"{start_string} al {end_string}",
+        f"Número de cliente: {rng.randrange(10 ** 8):08d}",
+        f"Número de tarjeta: 4152 **** {rng.randrange(10 ** 4):04d}",
+    ]
+
+
+def _get_citibanamex_debit_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    return [
+        "Citibanamex",
+        "Fecha de Corte",
+        f"{end.day} de {_get_month_name(end.month)} de {end.year}",
+        (
+            f"Período del {start.day} de {_get_month_name(start.month)} "
+            f"al {end.day} de {_get_month_name(end.month)} del {end.year}"
+        ),
+        "Número de cuenta de cheques",
+        f"{rng.randrange(10 ** 7):07d}",
+        "Número de cliente",
+        f"{rng.randrange(10 ** 6):06d}",
+    ]
+
+
+def _get_citibanamex_costco_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    return [
+        "COSTCO Citibanamex",
+        f"Estado de cuenta con fecha de corte al {end.day} de {_get_month_name(end.month)} de {end.year}.",
+        (
+            f"Del {start.day} de {_get_month_name(start.month)} "
+            f"al {end.day} de {_get_month_name(end.month)} de {end.year}, "
+        ),
+        "NÚMERO DE TARJETA",
+        f"5256 7800 {rng.randrange(10 ** 4):04d} {rng.randrange(10 ** 4):04d}",
+        "Número de cliente",
+        f"{rng.randrange(10 ** 6):06d}",
+    ]
+
+
+def _get_santander_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    return [
+        "SANTANDER",
+        "CUENTA CHEQUES",
+        f"PERIODO : {start.day:02d} AL {end.day:02d} de {_get_month_name(end.month)} de {end.year}",
+        "SUPERCUENTA CHEQUES-SALDO PROM",
+        f"65-{rng.randrange(10 ** 8):08d}-{rng.randrange(10)}",
+        "CODIGO",
+        "DE",
+        "CLIENTE",
+        "NO.",
+        f"{rng.randrange(10 ** 8):08d}",
+    ]
+
+
+def _get_santander_image_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    return [
+        "SANTANDER",
+        "CUENTA CHEQUES",
+        f"PERIODO DEL {start.day:02d} AL {end.day:02d} de {_get_month_name(end.month)} de {end.year}",
+        f"CORTE AL {end.day:02d} de {_get_month_name(end.month)} de {end.year}",
+        f"SUPERCUENTA CHEQUES-SALDO PROM 65-{rng.randrange(10 ** 8):08d}-{rng.randrange(10)}",
+        "CODIGO",
+        "DE",
+        f"CLIENTE NO.{rng.randrange(10 ** 8):08d}",
+    ]
+
+
+def _get_inbursa_lines(start: date, end: date, rng: random.Random) -> list[str]:
+    start_string = f"{start.day:02d} {_get_short_month_name(start.month)} {start.year}"
+    end_string = f"{end.day:02d} {_get_short_month_name(end.month)} {end.year}"
+    return [
+        "INBURSA",
+        "FECHA DE CORTE",
+        end_string,
+        "PERIODO",
+        f"Del {start_string} al {end_string}",
+        "CUENTA",
+        f"{rng.randrange(10 ** 11):011d}",
+        f"Cliente Inbursa: {rng.randrange(10 ** 6):06d}",
+    ]
+
+
+# {layout name: (title of the summary block, labels of: saldo anterior, depósitos, retiros, saldo final)}
+SUMMARY_LABELS = {
+    "bbva_debit": ("Comportamiento", "Saldo Anterior", "Depósitos / Abonos (+)", "Retiros / Cargos (-)", "Saldo Final"),
+    "bbva_credit": (
+        "Resumen de cargos y abonos del periodo",
+        "Adeudo del periodo anterior",
+        "Pagos y abonos (-)",
+        "Cargos regulares (+)",
+        "Saldo deudor total",
+    ),
+    "citibanamex_debit": ("RESUMEN DEL PERIODO", "Saldo anterior", "Depósitos", "Retiros", "Saldo al corte"),
+    "citibanamex_costco": (
+        "RESUMEN DE CARGOS Y ABONOS",
+        "Adeudo del periodo anterior",
+        "Pagos y abonos",
+        "Cargos",
+        "Saldo al corte",
+    ),
+    "santander": ("RESUMEN DEL PERIODO", "SALDO ANTERIOR", "DEPOSITOS", "RETIROS", "SALDO FINAL"),
+    "santander_image": ("RESUMEN DEL PERIODO", "SALDO ANTERIOR", "DEPOSITOS", "RETIROS", "SALDO FINAL"),
+    "inbursa": ("RESUMEN DE SALDOS", "SALDO ANTERIOR", "ABONOS", "CARGOS", "SALDO ACTUAL"),
+}
+
+
+def _get_summary_lines(layout: str, rng: random.Random) -> list[str]:
+    title, *labels = SUMMARY_LABELS[layout]
+    is_credit = layout in CREDIT_LAYOUTS
+    saldo_anterior = rng.randrange(10 ** 7)
+    depositos = rng.randrange(10 ** 6)
+    retiros = rng.randrange(10 ** 6)
+    # the balance of a credit card is what is owed: the charges ('retiros') add to it
+    saldo_final = saldo_anterior - depositos + retiros if is_credit else saldo_anterior + depositos - retiros
+    lines = [title] + [
+        f"{label} {amount / 100:,.2f}"
+        for label, amount in zip(labels, (saldo_anterior, depositos, retiros, saldo_final))
+    ]
+    if is_credit:
+        lines += [
+            f"Pago mínimo: ${rng.randrange(10 ** 5) / 100:,.2f}",
+            f"Pago para no generar intereses: ${max(saldo_final, 0) / 100:,.2f}",
+        ]
+    return lines
+
+
+# layouts of credit cards (with the payment amounts in the summary, and signed movements)
+CREDIT_LAYOUTS = ("bbva_credit", "citibanamex_costco")
+
+# {layout name: (function to get the lines of the first page, is image-only PDF)}
+STATEMENT_LAYOUTS = {
+    "bbva_debit": (_get_bbva_debit_lines, False),
+    "bbva_credit": (_get_bbva_credit_lines, False),
+    "citibanamex_debit": (_get_citibanamex_debit_lines, False),
+    "citibanamex_costco": (_get_citibanamex_costco_lines, False),
+    "santander": (_get_santander_lines, False),
+    "santander_image": (_get_santander_image_lines, True),
+    "inbursa": (_get_inbursa_lines, False),
+}
+
+
+def get_statement_period(index: int) -> tuple[date, date]:
+    """
+    Get the (start, end) dates of the statement 'index': one month
+    per statement, starting on January 2024.
+    """
+    year = 2024 + (index // 12) % 10
+    month = index % 12 + 1
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _get_movements_lines(
+    page_number: int,
+    rng: random.Random,
+    total_lines: int = 40,
+    is_credit: bool = False,
+    year: int = 2024,
+) -> list[str]:
+    """
+    Debit accounts: 'DD/MM DESCRIPTION AMOUNT BALANCE' lines.
+    Credit cards: 'DD-MMM-YYYY DD-MMM-YYYY DESCRIPTION +/- $AMOUNT' lines (the payments negative).
+    """
+    lines = [f"Detalle de movimientos - pagina {page_number}"]
+    balance = rng.randrange(10 ** 7) / 100
+    for _ in range(total_lines):
+        amount = rng.randrange(1, 10 ** 6) / 100
+        if is_credit:
+            is_payment = rng.random() < 0.2
+            operation_date = f"{rng.randrange(1, 29):02d}-{_get_short_month_name(rng.randrange(1, 13))}-{year}"
+            lines.append(
+                f"{operation_date} {operation_date} "
+                f"{'PAGO RECIBIDO' if is_payment else rng.choice(['COMPRA', 'INTERESES', 'COMISION'])} "
+                f"REF{rng.randrange(10 ** 8):08d} {'-' if is_payment else '+'} ${amount:,.2f}"
+            )
+            continue
+        balance += amount if rng.random() < 0.4 else -amount
+        lines.append(
+            f"{rng.randrange(1, 29):02d}/{rng.randrange(1, 13):02d} "
+            f"{rng.choice(['SPEI RECIBIDO', 'PAGO TARJETA', 'COMPRA', 'RETIRO CAJERO', 'DEPOSITO'])} "
+            f"REF{rng.randrange(10 ** 8):08d} {amount:,.2f} {balance:,.2f}"
+        )
+    return lines
+
+
+def _rasterise_pdf_document(pdf_document, dpi: int = IMAGE_VARIANT_DPI):
+    """
+    Get a new PDF document with each page of the document as an image (no text layer).
+    """
+    import fitz
+
+    image_pdf_document = fitz.open()
+    for page in pdf_document:
+        pixmap = page.get_pixmap(dpi=dpi)
+        image_page = image_pdf_document.new_page(width=page.rect.width, height=page.rect.height)
+        image_page.insert_image(image_page.rect, pixmap=pixmap)
+    return image_pdf_document
+
+
+def generate_statement_pdf(
+    pdf_file_path: str,
+    layout: str,
+    index: int,
+    rng: random.Random,
+    pages: int = 3,
+    as_image: bool = False,
+):
+    """
+    Write the synthetic statement 'index' of the given layout.
+    Returns the text of the header (and summary) of its first page.
+    """
+    import fitz
+
+    get_lines, is_image_layout = STATEMENT_LAYOUTS[layout]
+    start, end = get_statement_period(index)
+    is_credit = layout in CREDIT_LAYOUTS
+    header_lines = get_lines(start, end, rng) + _get_summary_lines(layout, rng)
+    pdf_document = fitz.open()
+    for page_number in range(1, pages + 1):
+        lines = list(header_lines) if page_number == 1 else []
+        lines += _get_movements_lines(
+            page_number, rng, total_lines=40 if page_number > 1 else 20, is_credit=is_credit, year=end.year
+        )
+        page = pdf_document.new_page()
+        page.insert_text((40, 50), "\n".join(lines), fontsize=9, lineheight=1.3)
+    if as_image or is_image_layout:
+        pdf_document = _rasterise_pdf_document(pdf_document)
+    pdf_document.save(pdf_file_path, garbage=1, deflate=True)
+    pdf_document.close()
+    return "\n".join(header_lines)
+
+
+def generate_corpus(
+    output_dir: str,
+    total_files: int = 10,
+    pages: int = 3,
+    image_ratio: float = 0.0,
+    layouts: list[str] = None,
+    seed: int = 0,
+) -> list[str]:
+    """
+    Generate the corpus (or reuse it, if it was already generated with the
+    same arguments) and return the paths of its PDF files.
+
+    The layouts are used round-robin. 'image_ratio' is the share of the
+    (text) files rasterised into image-only PDFs. The image-only layouts
+    ('santander_image') are only included when 'image_ratio' is set, since
+    they need tesseract/poppler to be parsed.
+    """
+    if layouts is None:
+        layouts = [
+            layout for layout, (_, is_image_layout) in STATEMENT_LAYOUTS.items()
+            if image_ratio > 0 or not is_image_layout
+        ]
+    manifest = {
+        "version": CORPUS_VERSION,
+        "total_files": total_files,
+        "pages": pages,
+        "image_ratio": image_ratio,
+        "layouts": layouts,
+        "seed": seed,
+    }
+    manifest_file_path = os.path.join(output_dir, CORPUS_MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_file_path):
+        with open(manifest_file_path, "r") as f_obj:
+            existing_manifest = json.load(f_obj)
+        if {key: existing_manifest.get(key) for key in manifest} == manifest:
+            return existing_manifest["pdf_files"]
+
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    pdf_files = []
+    for index in range(total_files):
+        layout = layouts[index % len(layouts)]
+        as_image = rng.random() < image_ratio
+        pdf_file_path = os.path.join(
+            output_dir, f"{index:06d}_{layout}{'_image' if as_image else ''}.pdf"
+        )
+        generate_statement_pdf(pdf_file_path, layout, index, rng, pages=pages, as_image=as_image)
+        pdf_files.append(pdf_file_path)
+
+    manifest["pdf_files"] = pdf_files
+    with open(manifest_file_path, "w") as f_obj:
+        json.dump(manifest, f_obj, indent=4)
+    return pdf_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="share of image-only PDF files")
+    parser.add_argument("--layouts", nargs="+", choices=list(STATEMENT_LAYOUTS), help="layouts to use (all by default)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pdf_files = generate_corpus(
+        args.output_dir,
+        total_files=args.files,
+        pages=args.pages,
+        image_ratio=args.image_ratio,
+        layouts=args.layouts,
+        seed=args.seed,
+    )
+    print(f"Corpus: [{len(pdf_files)}] PDF files at '{args.output_dir}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Micro-benchmark of the date parser ('common.dates').
+
+The parser is timed against the previous implementation (the sequential
+'re.match' dispatch + 'datetime.strptime', kept below as 'LegacyDateParser')
+over random date strings: valid dates of every supported format, plus
+mutated and invalid ones. The equivalence of both parsers is checked by
+'tests/test_dates.py', over the same random date strings.
+
+The random strings always keep their spaces: the legacy '(\\w+)+' month
+groups take exponential time on long strings without spaces.
+
+Usage:
+    python -m benchmarks.date_parsing [--cases 20000] [--seed 0] [--unique 300] [--output report.json]
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+from common import dates
+from common.report_manager import ReportManager
+
+
+class LegacyDateParser:
+    """
+    The date parsing of BankAccountStatePDF before 'common.dates' (reference behavior).
+    """
+
+    RE_PATTERNS = [
+        r'^(\d{2})\s*al\s*(\d{2})\s*de\s*(\w+)+\s*de\s*(\d{4})$',
+        r'^(\d{1,2})\s*de\s*(\w+)+\s*de\s*(\d{4})$',
+        r'^(\d{1,2})\s*de\s*(\w+)\s*al\s*(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})$',
+        r'^(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})\s*al\s*(\d{1,2})\s*de\s*(\w+)+\s*de[l]?\s*(\d{4})$',
+        r'^(\d{1,2})\-(\w+)\-(\d{4})\s*al\s*(\d{1,2})\-(\w+)\-(\d{4})$',
+        r'^(\d{1,2})\-(\w+)\-(\d{4})$',
+        r'^(\d{1,2})\s*(\w{3})\s*(\d{4})$',
+        r'^(\d{1,2})\s*(\w{3})\s*(\d{4})\s*al\s*(\d{1,2})\s*(\w{3})\s*(\d{4})$',
+        r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})$',
+        r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})\s*al\s*(\d{1,2})\/(\d{1,2})\/(\d{4})$',
+    ]
+
+    @classmethod
+    def format_date_period_string_into_datetime_tuple(cls, date_period_string):
+        date_period_string = date_period_string.lower()
+        date_data = cls.get_datetime_data_from_date_string(date_period_string)
+
+        start_day = date_data.get('start_day')
+        start_month = date_data.get('start_month')
+        end_day = date_data.get('end_day')
+        end_month = date_data.get('end_month')
+        year = date_data.get('year')
+
+        year_offset = 0
+        if start_month.lower() == 'diciembre' and end_month.lower() == 'enero':
+            year_offset = 1
+
+        start_date_str = f"{start_day} de {start_month} de {int(year)-year_offset}"
+        end_date_str = f"{end_day} de {end_month} de {year}"
+
+        start_date = cls.format_date_string_into_datetime(start_date_str)
+        end_date = cls.format_date_string_into_datetime(end_date_str)
+
+        return start_date, end_date
+
+    @classmethod
+    def get_regex_pattern_from_date_string(cls, date_string):
+        date_string = date_string.lower()
+        for pattern in cls.RE_PATTERNS:
+            if re.match(pattern, date_string):
+                return pattern
+        raise RuntimeError(
+            f"RE Pattern not supported for date string value: '{date_string}'"
+        )
+
+    @classmethod
+    def get_datetime_data_from_date_string(cls, date_string) -> dict:
+        start_day = None
+        start_month = None
+        end_day = None
+        end_month = None
+        year = None
+
+        regex_pattern = cls.get_regex_pattern_from_date_string(date_string)
+        match_pattern = re.match(regex_pattern, date_string.lower())
+
+        pattern_index = cls.RE_PATTERNS.index(regex_pattern)
+
+        if pattern_index == 0:
+            start_day = match_pattern.group(1)
+            start_month = match_pattern.group(3)
+            end_day = match_pattern.group(2)
+            end_month = start_month
+            year = match_pattern.group(4)
+
+        elif pattern_index in (1, 5, 6, 8):
+            start_day = match_pattern.group(1)
+            start_month = match_pattern.group(2)
+            year = match_pattern.group(3)
+
+        elif pattern_index == 2:
+            start_day = match_pattern.group(1)
+            start_month = match_pattern.group(2)
+            end_day = match_pattern.group(3)
+            end_month = match_pattern.group(4)
+            year = match_pattern.group(5)
+
+        else:
+            start_day = match_pattern.group(1)
+            start_month = match_pattern.group(2)
+            end_day = match_pattern.group(4)
+            end_month = match_pattern.group(5)
+            year = match_pattern.group(6)
+
+        if start_month in dates.SHORT_MONTH_MAPPING:
+            start_month = dates.SHORT_MONTH_MAPPING[start_month]
+        if end_month in dates.SHORT_MONTH_MAPPING:
+            end_month = dates.SHORT_MONTH_MAPPING[end_month]
+
+        return {
+            "start_day": start_day,
+            "start_month": start_month,
+            "end_day": end_day,
+            "end_month": end_month,
+            "year": year,
+        }
+
+    @classmethod
+    def format_date_string_into_datetime(cls, date_string):
+        date_data = cls.get_datetime_data_from_date_string(date_string)
+        day = date_data.get("start_day")
+        month = date_data.get("start_month")
+        year = date_data.get("year")
+
+        if month.isdigit():
+            month = dates.MONTH_MAPPING_SPANISH_BY_NUMBER.get(int(month)).lower()
+
+        month = dates.MONTH_MAPPING_ESP_TO_ENG[month]
+
+        date_string = f"{day} {month} {year}"
+        return datetime.strptime(date_string, "%d %B %Y")
+
+
+_MONTH_VALUES = (
+    list(dates.MONTH_MAPPING_ESP_TO_ENG)
+    + list(dates.SHORT_MONTH_MAPPING)
+    + ["Enero", "DIC", "Ago", "sept", "set", "foo", "de", "al", "0", "00", "12", "13", "١٢"]
+)
+_YEAR_VALUES = ["2023", "2024", "2025", "1999", "1000", "0999", "0000", "٢٠٢٤"]
+
+
+def _get_random_day(rng: random.Random) -> str:
+    day = rng.choice([rng.randint(1, 31), rng.randint(0, 39)])
+    return rng.choice([str(day), f"{day:02d}", "٣١", "1٥"])
+
+
+def _get_random_month_number(rng: random.Random) -> str:
+    month = rng.randint(0, 13)
+    return rng.choice([str(month), f"{month:02d}"])
+
+
+def generate_date_string(rng: random.Random) -> str:
+    """
+    Get a random date string: one of the supported formats (valid or not),
+    sometimes mutated (a character removed/duplicated, spaces, upper case).
+    """
+    day, other_day = _get_random_day(rng), _get_random_day(rng)
+    month, other_month = rng.choice(_MONTH_VALUES), rng.choice(_MONTH_VALUES)
+    year, other_year = rng.choice(_YEAR_VALUES), rng.choice(_YEAR_VALUES)
+    month_number, other_month_number = _get_random_month_number(rng), _get_random_month_number(rng)
+    short_month, other_short_month = month[:3], other_month[:3]
+    de = rng.choice(["de", "del"])
+    date_string = rng.choice([
+        f"{day} al {other_day} de {month} de {year}",
+        f"{day} de {month} de {year}",
+        f"{day} de {month} al {other_day} de {other_month} {de} {year}",
+        f"{day} de {month} {de} {other_year} al {other_day} de {other_month} {de} {year}",
+        f"{day}-{short_month}-{other_year} al {other_day}-{other_short_month}-{year}",
+        f"{day}-{short_month}-{year}",
+        f"{day} {short_month} {year}",
+        f"{day} {short_month} {other_year} al {other_day} {other_short_month} {year}",
+        f"{day}/{month_number}/{year}",
+        f" {day}/{month_number}/{other_year} al {other_day}/{other_month_number}/{year}",
+    ])
+    mutation = rng.random()
+    if mutation < 0.05 and date_string:
+        position = rng.randrange(len(date_string))
+        date_string = date_string[:position] + date_string[position + 1:]
+    elif mutation < 0.10 and date_string:
+        position = rng.randrange(len(date_string))
+        date_string = date_string[:position] + date_string[position] + date_string[position:]
+    elif mutation < 0.15:
+        # not removed: the legacy patterns backtrack exponentially without spaces
+        date_string = date_string.replace(" ", rng.choice(["  ", "\t", " \t"]))
+    elif mutation < 0.25:
+        date_string = date_string.upper()
+    elif mutation < 0.28:
+        date_string += "\n"
+    return date_string
+
+
+def _time_function(function, date_strings: list[str]) -> float:
+    start_time = time.perf_counter()
+    for date_string in date_strings:
+        try:
+            function(date_string)
+        except Exception:
+            pass
+    return time.perf_counter() - start_time
+
+
+def _clear_caches():
+    dates._get_date_data.cache_clear()
+    dates.format_date_string_into_datetime.cache_clear()
+    dates.format_date_period_string_into_datetime_tuple.cache_clear()
+
+
+def get_benchmark_report(date_strings: list[str], unique_period_strings: list[str], total: int) -> dict:
+    """
+    Time the parsing of 'total' period strings, drawn from 'unique_period_strings'
+    (the usual case: many statements sharing a few hundred periods).
+    """
+    rng = random.Random(total)
+    period_strings = [rng.choice(unique_period_strings) for _ in range(total)]
+
+    _clear_caches()
+    legacy_seconds = _time_function(
+        LegacyDateParser.format_date_period_string_into_datetime_tuple, period_strings
+    )
+    _clear_caches()
+    seconds = _time_function(dates.format_date_period_string_into_datetime_tuple, period_strings)
+    _clear_caches()
+    # without the memoization (every string parsed once)
+    legacy_seconds_unique = _time_function(
+        LegacyDateParser.format_date_period_string_into_datetime_tuple, date_strings
+    )
+    seconds_unique = _time_function(dates.format_date_period_string_into_datetime_tuple, date_strings)
+    return {
+        "total_period_strings": total,
+        "unique_period_strings": len(unique_period_strings),
+        "legacy_seconds": legacy_seconds,
+        "seconds": seconds,
+        "speedup": legacy_seconds / seconds if seconds else None,
+        "total_random_strings": len(date_strings),
+        "legacy_seconds_random_strings": legacy_seconds_unique,
+        "seconds_random_strings": seconds_unique,
+        "speedup_random_strings": (
+            legacy_seconds_unique / seconds_unique if seconds_unique else None
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000, help="random date strings to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--unique", type=int, default=300, help="unique periods in the timing run")
+    parser.add_argument("--output", help="JSON file to save the report")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    date_strings = [generate_date_string(rng) for _ in range(args.cases)]
+
+    valid_period_strings = []
+    for date_string in date_strings:
+        try:
+            LegacyDateParser.format_date_period_string_into_datetime_tuple(date_string)
+        except Exception:
+            continue
+        valid_period_strings.append(date_string)
+    unique_period_strings = valid_period_strings[:args.unique] or date_strings[:args.unique]
+    report = get_benchmark_report(date_strings, unique_period_strings, total=args.cases)
+    report["total_valid_period_strings"] = len(valid_period_strings)
+
+    print(f"Date parsing ({args.cases} random date strings, seed {args.seed}):")
+    print(
+        f" > {report['total_period_strings']} periods ({report['unique_period_strings']} unique): "
+        f"legacy {report['legacy_seconds'] * 1000:.1f} ms | new {report['seconds'] * 1000:.1f} ms | "
+        f"x{report['speedup']:.1f}"
+    )
+    print(
+        f" > {report['total_random_strings']} random strings (cold cache): "
+        f"legacy {report['legacy_seconds_random_strings'] * 1000:.1f} ms | "
+        f"new {report['seconds_random_strings'] * 1000:.1f} ms | "
+        f"x{report['speedup_random_strings']:.1f}"
+    )
+    print(f" > valid periods: {report['total_valid_period_strings']}")
+    if args.output:
+        ReportManager().generate_json_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
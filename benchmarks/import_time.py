@@ -0,0 +1,123 @@
+"""
+Import-time benchmark of the CLI startup, based on 'python -X importtime'.
+
+It fails (exit code 1) when importing the entry point takes longer than
+'--max-ms', or when it imports any of the heavy PDF/OCR backends, which
+must only be loaded by the code paths that use them.
+
+Usage:
+    python -m benchmarks.import_time [--module main] [--runs 5] [--max-ms 300] [--output report.json]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+import settings
+from common.report_manager import ReportManager
+
+HEAVY_MODULES = (
+    "fitz",
+    "pymupdf",
+    "pdf2image",
+    "pdfminer",
+    "pytesseract",
+    "PIL",
+    "numpy",
+)
+
+
+def run_import_time(module: str) -> list[dict]:
+    """
+    Import the module in a new interpreter and parse its '-X importtime' output.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=settings.get_project_root_dir(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports_data = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, imported_package = line[len("import time:"):].split("|")
+        imports_data.append({
+            "module": imported_package.strip(),
+            "depth": (len(imported_package) - len(imported_package.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return imports_data
+
+
+def get_import_time_report(module: str, runs: int = 5, top: int = 15) -> dict:
+    runs_data = [run_import_time(module) for _ in range(runs)]
+    runs_total_us = [
+        sum(
+            import_data["cumulative_us"]
+            for import_data in imports_data
+            if import_data["module"] == module and import_data["depth"] == 0
+        )
+        for imports_data in runs_data
+    ]
+    # the slowest imports of the last run (warm bytecode cache)
+    last_run_data = sorted(runs_data[-1], key=lambda import_data: -import_data["self_us"])
+    imported_modules = {import_data["module"] for import_data in runs_data[-1]}
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": statistics.median(runs_total_us) / 1000,
+        "min_ms": min(runs_total_us) / 1000,
+        "max_ms": max(runs_total_us) / 1000,
+        "total_modules_imported": len(imported_modules),
+        "heavy_modules_imported": sorted(
+            imported_module for imported_module in imported_modules
+            if imported_module.split(".")[0] in HEAVY_MODULES
+        ),
+        "slowest_imports": last_run_data[:top],
+    }
+
+
+def print_import_time_report(report: dict):
+    print(f"Import time of '{report['module']}' ({report['runs']} runs):")
+    print(
+        f" > median: {report['median_ms']:.1f} ms | "
+        f"min: {report['min_ms']:.1f} ms | max: {report['max_ms']:.1f} ms | "
+        f"modules: {report['total_modules_imported']}"
+    )
+    print(" > slowest imports (self time):")
+    for import_data in report["slowest_imports"]:
+        print(
+            f"    {import_data['self_us'] / 1000:8.2f} ms"
+            f" | {import_data['cumulative_us'] / 1000:8.2f} ms"
+            f" | {import_data['module']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module imported by the benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=300.0, help="max median import time allowed")
+    parser.add_argument("--output", help="JSON file to save the report")
+    args = parser.parse_args()
+
+    report = get_import_time_report(args.module, runs=args.runs)
+    print_import_time_report(report)
+    if args.output:
+        ReportManager().generate_json_report(report, args.output)
+
+    errors = []
+    if report["heavy_modules_imported"]:
+        errors.append(f"heavy modules imported at startup: {report['heavy_modules_imported']}")
+    if report["median_ms"] > args.max_ms:
+        errors.append(f"median import time {report['median_ms']:.1f} ms > {args.max_ms:.1f} ms")
+    for error in errors:
+        print(f"[!] REGRESSION: {error}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+OCR of the image PDF files: full pages (pdf2image's default 200 DPI colour
+pages, tesseract defaults) against header first (only the header region of
+the first page, with the preprocessing settings measured, see
+'HEADER_FIRST_OCR_CONFIGURATION'). The full pages of a statement whose
+header is accepted are not OCR'd: the record doesn't need them, only the
+transactions do ('extract_transactions'), and the summary amounts are only
+read when they are in the header.
+
+The corpus is made of image-only statements ('santander_image' layout),
+and the fields loaded with each mode are compared against the fields of
+the text the statements were generated from. The OCR work is measured as
+the megapixels OCR'd per statement.
+
+Needs tesseract and poppler (and the spanish language data, 'spa').
+
+Usage:
+    python -m benchmarks.ocr_header [--files 10] [--pages 3] [--seed 0] [--output results.json]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Union
+
+import settings
+from benchmarks.corpus import generate_statement_pdf
+from common.report_manager import ReportManager
+from pdf_utils.text_source import PdfTextSource
+
+LAYOUT = "santander_image"
+COMPARED_FIELDS = (
+    "fecha_de_corte",
+    "periodo_inicio",
+    "periodo_termino",
+    "numero_de_cuenta",
+    "numero_de_cliente",
+    "saldo_anterior",
+    "depositos",
+    "retiros",
+    "saldo_final",
+)
+# how the image PDF files were OCR'd before the 'ocr' preprocessing settings
+FULL_PAGES_OCR_CONFIGURATION = {
+    "dpi": 200,
+    "grayscale": False,
+    "binarize_threshold": None,
+    "tesseract_lang": None,
+    "tesseract_psm": None,
+    "header_first": False,
+}
+# the preprocessing settings measured with the header first OCR
+# (the 'header_regions' are the ones of the config.yaml)
+HEADER_FIRST_OCR_CONFIGURATION = {
+    "dpi": 300,
+    "grayscale": True,
+    "binarize_threshold": 160,
+    "tesseract_lang": "spa",
+    "tesseract_psm": 6,
+    "header_first": True,
+}
+
+
+def _generate_statements(output_dir: str, total_files: int, pages: int, seed: int) -> list[tuple[str, str]]:
+    """
+    Get the [(PDF file path, text of the header of its first page)] of the statements.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    statements = []
+    for index in range(total_files):
+        pdf_file_path = os.path.join(output_dir, f"{index:06d}_{LAYOUT}.pdf")
+        header_text = generate_statement_pdf(pdf_file_path, LAYOUT, index, random.Random(seed + index), pages=pages)
+        statements.append((pdf_file_path, header_text))
+    return statements
+
+
+def _get_bank_account_state_fields(pdf_file_path: str, pdf_file_contents: Union[str, PdfTextSource]) -> dict:
+    from banks.account_state_manager import BANK_ACCOUNT_STATE_REGISTRY
+
+    bank_account_state_class = BANK_ACCOUNT_STATE_REGISTRY.get_bank_account_state_class(
+        pdf_file_contents,
+        is_image_pdf=True,
+    )
+    if bank_account_state_class is None:
+        return {}
+    try:
+        bank_account_state_obj = bank_account_state_class(pdf_file_path, pdf_file_contents)
+    except RuntimeError:
+        # the mandatory fields were not found
+        return {"class_name": bank_account_state_class.__name__}
+    return {
+        "class_name": bank_account_state_class.__name__,
+        **{field_name: getattr(bank_account_state_obj, field_name) for field_name in COMPARED_FIELDS},
+    }
+
+
+def _get_megapixels(pdf_file_path: str, dpi: int, first_page_region: tuple = None) -> float:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_file_path)
+    try:
+        page_rects = [doc[0].rect] if first_page_region else [page.rect for page in doc]
+    finally:
+        doc.close()
+    left, top, right, bottom = first_page_region or (0, 0, 1, 1)
+    return sum(
+        (page_rect.width * (right - left) * dpi / 72) * (page_rect.height * (bottom - top) * dpi / 72)
+        for page_rect in page_rects
+    ) / 10 ** 6
+
+
+def _ocr_full_pages(pdf_file_path: str) -> tuple[str, float]:
+    from pdf_utils.parsers import parse_pdf_with_pdf2image
+
+    return parse_pdf_with_pdf2image(pdf_file_path), _get_megapixels(pdf_file_path, settings.get_ocr_dpi())
+
+
+def _ocr_header_first(pdf_file_path: str) -> tuple[PdfTextSource, float]:
+    from banks.account_state_manager import PDFBankAccountStateManager
+    from pdf_utils.parsers import PdfParseManager
+
+    header_regions = {tuple(header_region) for header_region in settings.get_ocr_header_regions().values()}
+    megapixels = sum(
+        _get_megapixels(pdf_file_path, settings.get_ocr_dpi(), header_region) for header_region in header_regions
+    )
+    pdf_text_source, _ = PdfParseManager().get_pdf_text_source(
+        pdf_file_path,
+        header_text_validator=PDFBankAccountStateManager.is_ocr_header_text_enough,
+    )
+    if not pdf_text_source.is_partial():
+        # the header is not enough, all the pages were OCR'd
+        return pdf_text_source, megapixels + _get_megapixels(pdf_file_path, settings.get_ocr_dpi())
+    # the fields are read from the header, the full pages are not OCR'd
+    return pdf_text_source, megapixels
+
+
+def get_ocr_mode_results(statements: list[tuple[str, str]], ocr_function) -> dict:
+    field_matches = {field_name: 0 for field_name in ("class_name", *COMPARED_FIELDS)}
+    total_seconds = 0.0
+    total_megapixels = 0.0
+    for pdf_file_path, header_text in statements:
+        expected_fields = _get_bank_account_state_fields(pdf_file_path, header_text)
+        start_time = time.perf_counter()
+        pdf_file_contents, megapixels = ocr_function(pdf_file_path)
+        total_seconds += time.perf_counter() - start_time
+        total_megapixels += megapixels
+        fields = _get_bank_account_state_fields(pdf_file_path, pdf_file_contents)
+        for field_name in field_matches:
+            if field_name in fields and fields[field_name] == expected_fields.get(field_name):
+                field_matches[field_name] += 1
+    return {
+        "seconds_per_statement": total_seconds / len(statements),
+        "megapixels_per_statement": total_megapixels / len(statements),
+        "field_accuracy": {
+            field_name: total_matches / len(statements) for field_name, total_matches in field_matches.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10, help="PDF files of the corpus")
+    parser.add_argument("--pages", type=int, default=3, help="pages of each PDF file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to save the results")
+    args = parser.parse_args()
+
+    missing_commands = [command for command in ("tesseract", "pdfinfo") if shutil.which(command) is None]
+    if missing_commands:
+        print(f"OCR benchmark skipped, not installed: {', '.join(missing_commands)}")
+        sys.exit(1)
+
+    # own (empty) tmp dir, so the caches of the project are not used
+    tmp_dir = tempfile.mkdtemp(prefix="bank_account_manager_benchmark_")
+    os.environ[settings.TMP_DIR_ENV_VARIABLE] = tmp_dir
+    configuration_data = settings.get_configuration_data()
+    config_ocr_configuration = dict(configuration_data.get("ocr", None) or {})
+    try:
+        statements = _generate_statements(f"{tmp_dir}/corpus", args.files, args.pages, args.seed)
+        results = {}
+        for mode_name, ocr_configuration, ocr_function in (
+            ("full_pages", {**config_ocr_configuration, **FULL_PAGES_OCR_CONFIGURATION}, _ocr_full_pages),
+            ("header_first", {**config_ocr_configuration, **HEADER_FIRST_OCR_CONFIGURATION}, _ocr_header_first),
+        ):
+            configuration_data["ocr"] = ocr_configuration
+            results[mode_name] = get_ocr_mode_results(statements, ocr_function)
+    finally:
+        configuration_data["ocr"] = config_ocr_configuration
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"OCR of [{args.files}] image statements ({args.pages} pages):")
+    for mode_name, mode_results in results.items():
+        field_accuracy = mode_results["field_accuracy"]
+        print(
+            f" > {mode_name:12} {mode_results['seconds_per_statement']:8.3f} s per statement | "
+            f"{mode_results['megapixels_per_statement']:6.2f} megapixels | "
+            f"accuracy: {sum(field_accuracy.values()) / len(field_accuracy):6.1%}"
+        )
+        for field_name, accuracy in field_accuracy.items():
+            print(f"     - {field_name:18} {accuracy:6.1%}")
+    if args.output:
+        ReportManager().generate_json_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
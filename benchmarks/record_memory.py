@@ -0,0 +1,108 @@
+"""
+Memory per loaded bank account state: the parsed BankAccountStatePDF objects
+(with the text of the PDF file, as they were kept before) against the
+compact BankAccountStateRecord kept by the PDFBankAccountStateManager.
+
+The memory is measured with 'tracemalloc', as the python allocations that
+stay alive while the objects of all the files of the corpus are kept. The
+caches (parse cache, date caches...) are warmed up first, so they are not
+part of the measure.
+
+Usage:
+    python -m benchmarks.record_memory [--files 100] [--pages 3] [--seed 0] [--output results.json]
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+import settings
+from benchmarks.corpus import generate_corpus
+from common.report_manager import ReportManager
+
+
+def _get_bank_account_state_objects(pdf_files: list[str]) -> list:
+    from banks.account_state_manager import PDFBankAccountStateManager
+
+    bank_account_state_objects = []
+    for pdf_file in pdf_files:
+        bank_account_state_obj = PDFBankAccountStateManager.get_bank_account_state_object_from_pdf_file(pdf_file)
+        # the unique hash loads the full text, as in the duplicates check
+        bank_account_state_obj.get_unique_hash_file_value()
+        bank_account_state_objects.append(bank_account_state_obj)
+    return bank_account_state_objects
+
+
+def _get_alive_memory(function, *args) -> tuple[int, object]:
+    """
+    Get the bytes allocated by the function that are still alive (held by its result).
+    """
+    gc.collect()
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    gc.collect()
+    alive_memory = tracemalloc.get_traced_memory()[0] - start_memory
+    tracemalloc.stop()
+    return alive_memory, result
+
+
+def get_record_memory_results(pdf_files: list[str]) -> dict:
+    from banks.records import BankAccountStateRecord
+
+    # warm up the caches
+    _get_bank_account_state_objects(pdf_files)
+
+    objects_memory, bank_account_state_objects = _get_alive_memory(
+        _get_bank_account_state_objects, pdf_files
+    )
+    records_memory, bank_account_state_records = _get_alive_memory(
+        lambda: [
+            BankAccountStateRecord.from_bank_account_state(bank_account_state_obj)
+            for bank_account_state_obj in bank_account_state_objects
+        ]
+    )
+    total_files = len(pdf_files)
+    return {
+        "total_files": total_files,
+        "bank_account_state_pdf_bytes_per_record": objects_memory / total_files,
+        "bank_account_state_record_bytes_per_record": records_memory / total_files,
+        "reduction_bytes_per_record": (objects_memory - records_memory) / total_files,
+        "reduction_ratio": objects_memory / records_memory if records_memory else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=3, help="pages per PDF file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to save the results")
+    args = parser.parse_args()
+
+    corpus_dir = f"{settings.get_tmp_dir()}/benchmarks/corpus_{args.files}_{args.pages}_0.0_{args.seed}"
+    pdf_files = generate_corpus(corpus_dir, total_files=args.files, pages=args.pages, seed=args.seed)
+
+    # own (empty) tmp dir, so the parse cache of the project is not used
+    tmp_dir = tempfile.mkdtemp(prefix="bank_account_manager_benchmark_")
+    os.environ[settings.TMP_DIR_ENV_VARIABLE] = tmp_dir
+    try:
+        results = get_record_memory_results(pdf_files)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"Memory per record: [{results['total_files']}] PDF files ({args.pages} pages)")
+    print(f" > BankAccountStatePDF:    {results['bank_account_state_pdf_bytes_per_record']:10.0f} bytes")
+    print(f" > BankAccountStateRecord: {results['bank_account_state_record_bytes_per_record']:10.0f} bytes")
+    print(
+        f" > reduction:              {results['reduction_bytes_per_record']:10.0f} bytes "
+        f"({results['reduction_ratio']:.1f}x)"
+    )
+    if args.output:
+        ReportManager().generate_json_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
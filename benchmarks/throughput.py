@@ -0,0 +1,333 @@
+"""
+Throughput benchmark of the PDF pipeline, over a synthetic corpus ('benchmarks.corpus').
+
+Stages (timed over every file of the corpus):
+    parse_pdf_file          PdfParseManager.parse_pdf_file, empty cache
+    parse_pdf_file_cached   PdfParseManager.parse_pdf_file, all files in the cache
+    classification          bank class of the text (BANK_ACCOUNT_STATE_REGISTRY)
+    load_bank_data_from_pdf field extraction of the bank class
+    date_parsing            fecha de corte + periodo strings (empty date caches)
+    build_output_project    output project of the loaded bank accounts
+
+Each run is done in a new process with its own (empty) tmp dir, so the runs
+are independent from each other and from the cache of the project. The
+timings are the median of '--repeat' runs; the peak memory of each stage
+(python allocations, 'tracemalloc') is measured in one extra run.
+
+The results are saved as JSON. With '--baseline', each stage is compared
+against a previous result (time per file and peak memory), and the run
+fails (exit code 1) when a stage is slower/bigger than the '--threshold'.
+
+Usage:
+    python -m benchmarks.throughput [--scale 10|1k|50k] [--files N] [--repeat 3]
+        [--image-ratio 0] [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import settings
+from common.report_manager import ReportManager
+from benchmarks.corpus import CORPUS_MANIFEST_FILE_NAME, generate_corpus
+
+SCALES = {
+    "10": 10,
+    "1k": 1000,
+    "50k": 50000,
+}
+STAGES = (
+    "parse_pdf_file",
+    "parse_pdf_file_cached",
+    "classification",
+    "load_bank_data_from_pdf",
+    "date_parsing",
+    "build_output_project",
+)
+# stages faster than this are not compared (too noisy)
+MIN_SECONDS_TO_COMPARE = 0.005
+MIN_PEAK_MEMORY_MB_TO_COMPARE = 1.0
+
+
+class StageRecorder:
+    """
+    Records the wall time (and the peak memory, when tracing) of each stage.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    def run(self, stage_name: str, function, *args):
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start_time
+        self.stages[stage_name] = {"seconds": seconds}
+        if self.trace_memory:
+            self.stages[stage_name]["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+        return result
+
+
+def _parse_pdf_files(pdf_files: list[str]) -> list[tuple[str, bool]]:
+    from pdf_utils.parsers import PdfParseManager
+
+    pdf_parse_manager = PdfParseManager()
+    pdf_files_contents = [pdf_parse_manager.parse_pdf_file(pdf_file) for pdf_file in pdf_files]
+    pdf_parse_manager.save_mapping_table()
+    return pdf_files_contents
+
+
+def _classify_pdf_files_contents(pdf_files_contents: list[tuple[str, bool]]) -> list:
+    from banks.account_state_manager import BANK_ACCOUNT_STATE_REGISTRY
+
+    return [
+        BANK_ACCOUNT_STATE_REGISTRY.get_bank_account_state_class(text, is_image_pdf=is_image_pdf)
+        for text, is_image_pdf in pdf_files_contents
+    ]
+
+
+def _load_bank_data(bank_account_state_objects: list):
+    for bank_account_state_obj in bank_account_state_objects:
+        bank_account_state_obj.load_bank_data_from_pdf()
+
+
+def _parse_dates(date_strings: list[tuple[str, str]]):
+    from common import dates
+
+    dates._get_date_data.cache_clear()
+    dates.format_date_string_into_datetime.cache_clear()
+    dates.format_date_period_string_into_datetime_tuple.cache_clear()
+    for fecha_de_corte, periodo in date_strings:
+        dates.format_date_string_into_datetime(fecha_de_corte)
+        dates.format_date_period_string_into_datetime_tuple(periodo)
+
+
+def run_stages(pdf_files: list[str], trace_memory: bool = False) -> dict:
+    """
+    Run all the stages over the PDF files (the tmp dir must be empty).
+    """
+    from banks.account_state_manager import PDFBankAccountStateManager
+    from banks.records import BankAccountStateRecord
+    # the PDF backend is imported lazily, its import time is not part of the stages
+    import fitz
+
+    recorder = StageRecorder(trace_memory=trace_memory)
+    pdf_files_contents = recorder.run("parse_pdf_file", _parse_pdf_files, pdf_files)
+    recorder.run("parse_pdf_file_cached", _parse_pdf_files, pdf_files)
+    bank_account_state_classes = recorder.run(
+        "classification", _classify_pdf_files_contents, pdf_files_contents
+    )
+
+    bank_account_state_objects = []
+    for pdf_file, (text, _), bank_account_state_class in zip(
+        pdf_files, pdf_files_contents, bank_account_state_classes
+    ):
+        if bank_account_state_class is None:
+            raise RuntimeError(f"No bank account state class found for the PDF file: '{pdf_file}'")
+        bank_account_state_objects.append(bank_account_state_class(pdf_file, text))
+    recorder.run("load_bank_data_from_pdf", _load_bank_data, bank_account_state_objects)
+
+    date_strings = [
+        (bank_account_state_obj.raw_data["fecha_de_corte"], bank_account_state_obj.raw_data["periodo"])
+        for bank_account_state_obj in bank_account_state_objects
+    ]
+    recorder.run("date_parsing", _parse_dates, date_strings)
+
+    bank_account_state_manager = PDFBankAccountStateManager()
+    for pdf_file, bank_account_state_obj in zip(pdf_files, bank_account_state_objects):
+        bank_account_state_manager.register_bank_account_state_object(
+            pdf_file, BankAccountStateRecord.from_bank_account_state(bank_account_state_obj)
+        )
+    recorder.run("build_output_project", bank_account_state_manager.build_output_project, True)
+
+    return recorder.stages
+
+
+def _run_stages_in_new_process(corpus_manifest_file_path: str, trace_memory: bool = False) -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix="bank_account_manager_benchmark_")
+    try:
+        worker_output_file_path = os.path.join(tmp_dir, "stages.json")
+        command = [
+            sys.executable, "-m", "benchmarks.throughput",
+            "--worker-corpus", corpus_manifest_file_path,
+            "--worker-output", worker_output_file_path,
+        ]
+        if trace_memory:
+            command.append("--worker-trace-memory")
+        process = subprocess.run(
+            command,
+            cwd=settings.get_project_root_dir(),
+            env={**os.environ, settings.TMP_DIR_ENV_VARIABLE: os.path.join(tmp_dir, "tmp")},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"Benchmark run failed:\n{process.stderr}")
+        with open(worker_output_file_path, "r") as f_obj:
+            return json.load(f_obj)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def get_benchmark_results(
+    pdf_files: list[str],
+    corpus_manifest_file_path: str,
+    repeat: int = 3,
+    trace_memory: bool = True,
+) -> dict:
+    runs = [_run_stages_in_new_process(corpus_manifest_file_path) for _ in range(repeat)]
+    memory_run = _run_stages_in_new_process(corpus_manifest_file_path, trace_memory=True) if trace_memory else {}
+
+    stages = {}
+    for stage_name in STAGES:
+        seconds_runs = [run[stage_name]["seconds"] for run in runs]
+        seconds = statistics.median(seconds_runs)
+        stages[stage_name] = {
+            "seconds": seconds,
+            "seconds_runs": seconds_runs,
+            "per_file_us": seconds / len(pdf_files) * 1e6,
+            "files_per_second": len(pdf_files) / seconds if seconds else None,
+            "peak_memory_mb": memory_run.get(stage_name, {}).get("peak_memory_mb"),
+        }
+    return {
+        "metadata": {
+            "total_files": len(pdf_files),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "stages": stages,
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Get the regressions of the results against the baseline (time per file and peak memory).
+    """
+    regressions = []
+    for stage_name, stage_data in results["stages"].items():
+        baseline_stage_data = baseline.get("stages", {}).get(stage_name)
+        if not baseline_stage_data:
+            continue
+        if min(stage_data["seconds"], baseline_stage_data["seconds"]) >= MIN_SECONDS_TO_COMPARE:
+            ratio = stage_data["per_file_us"] / baseline_stage_data["per_file_us"]
+            stage_data["baseline_time_ratio"] = ratio
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"'{stage_name}' is x{ratio:.2f} slower: "
+                    f"{stage_data['per_file_us']:.1f} us/file "
+                    f"(baseline: {baseline_stage_data['per_file_us']:.1f} us/file)"
+                )
+        peak_memory_mb = stage_data.get("peak_memory_mb")
+        baseline_peak_memory_mb = baseline_stage_data.get("peak_memory_mb")
+        if (
+            peak_memory_mb is not None and baseline_peak_memory_mb is not None
+            and results["metadata"]["total_files"] == baseline["metadata"]["total_files"]
+            and max(peak_memory_mb, baseline_peak_memory_mb) >= MIN_PEAK_MEMORY_MB_TO_COMPARE
+        ):
+            ratio = peak_memory_mb / max(baseline_peak_memory_mb, 1e-9)
+            stage_data["baseline_memory_ratio"] = ratio
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"'{stage_name}' peak memory is x{ratio:.2f} bigger: "
+                    f"{peak_memory_mb:.1f} MB (baseline: {baseline_peak_memory_mb:.1f} MB)"
+                )
+    return regressions
+
+
+def print_benchmark_results(results: dict):
+    metadata = results["metadata"]
+    print(f"Throughput benchmark: [{metadata['total_files']}] PDF files | {metadata['repeat']} runs")
+    print(f" {'stage':<26}{'total':>12}{'per file':>14}{'files/s':>12}{'peak mem':>12}")
+    for stage_name, stage_data in results["stages"].items():
+        peak_memory_mb = stage_data.get("peak_memory_mb")
+        print(
+            f" {stage_name:<26}"
+            f"{stage_data['seconds'] * 1000:>9.1f} ms"
+            f"{stage_data['per_file_us']:>11.1f} us"
+            f"{stage_data['files_per_second'] or 0:>12.0f}"
+            f"{'' if peak_memory_mb is None else f'{peak_memory_mb:.1f} MB':>12}"
+        )
+
+
+def _run_worker(corpus_manifest_file_path: str, worker_output_file_path: str, trace_memory: bool):
+    with open(corpus_manifest_file_path, "r") as f_obj:
+        pdf_files = json.load(f_obj)["pdf_files"]
+    stages = run_stages(pdf_files, trace_memory=trace_memory)
+    with open(worker_output_file_path, "w") as f_obj:
+        json.dump(stages, f_obj)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10", help="number of PDF files")
+    parser.add_argument("--files", type=int, help="number of PDF files (instead of '--scale')")
+    parser.add_argument("--pages", type=int, default=3, help="pages per PDF file")
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="share of image-only PDF files (OCR)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs (the median is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory run")
+    parser.add_argument("--corpus-dir", help="directory of the corpus (generated if needed)")
+    parser.add_argument("--output", help="JSON file to save the results")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    parser.add_argument("--worker-corpus", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-trace-memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_corpus:
+        _run_worker(args.worker_corpus, args.worker_output, args.worker_trace_memory)
+        return
+
+    total_files = args.files or SCALES[args.scale]
+    corpus_dir = args.corpus_dir or (
+        f"{settings.get_tmp_dir()}/benchmarks/corpus_{total_files}_{args.pages}_{args.image_ratio}_{args.seed}"
+    )
+    print(f"Generating corpus: [{total_files}] PDF files at '{corpus_dir}'")
+    pdf_files = generate_corpus(
+        corpus_dir,
+        total_files=total_files,
+        pages=args.pages,
+        image_ratio=args.image_ratio,
+        seed=args.seed,
+    )
+    results = get_benchmark_results(
+        pdf_files,
+        corpus_manifest_file_path=os.path.join(corpus_dir, CORPUS_MANIFEST_FILE_NAME),
+        repeat=args.repeat,
+        trace_memory=not args.no_memory,
+    )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f_obj:
+            baseline = json.load(f_obj)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        results["baseline"] = {"file_path": args.baseline, "threshold": args.threshold}
+        results["regressions"] = regressions
+
+    print_benchmark_results(results)
+    if args.output:
+        ReportManager().generate_json_report(results, args.output)
+    for regression in regressions:
+        print(f"[!] REGRESSION: {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
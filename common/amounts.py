@@ -0,0 +1,45 @@
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Union
+
+# Regex Pattern for the amounts of the bank account states
+# ('1,234.56', '$ 1,234.56', '-1,234.56', '1,234.56-')
+RE_PATTERN__AMOUNT = r"(-?\$?\s?\d[\d,]*\.\d{2}-?)"
+
+_RE_AMOUNT_CHARACTERS_TO_REMOVE = re.compile(r"[\s$,]")
+
+
+def parse_amount(amount_string: Union[str, None]) -> Union[Decimal, None]:
+    """
+    Formats:
+        '1,234.56', '$ 1,234.56', '-1,234.56', '1,234.56-', '(1,234.56)'
+    """
+    if not amount_string:
+        return None
+    amount_string = _RE_AMOUNT_CHARACTERS_TO_REMOVE.sub("", amount_string)
+    is_negative = amount_string.startswith(("-", "(")) or amount_string.endswith("-")
+    try:
+        amount = Decimal(amount_string.strip("-()"))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: '{amount_string}'")
+    return -amount if is_negative else amount
+
+
+def get_amount_in_cents(amount: Decimal) -> int:
+    return int(amount.scaleb(2).to_integral_value())
+
+
+def parse_amount_in_cents(amount_string: Union[str, None]) -> Union[int, None]:
+    amount = parse_amount(amount_string)
+    return None if amount is None else get_amount_in_cents(amount)
+
+
+def get_amount_from_cents(amount_in_cents: Union[int, None]) -> Union[Decimal, None]:
+    return None if amount_in_cents is None else Decimal(amount_in_cents).scaleb(-2)
+
+
+def format_amount_in_cents(amount_in_cents: int) -> str:
+    """
+    Format: '-1,234.56'
+    """
+    return f"{get_amount_from_cents(amount_in_cents):,.2f}"
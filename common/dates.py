@@ -0,0 +1,270 @@
+"""
+Parser of the (spanish) date strings found in the bank account states.
+
+All the supported formats are compiled into a single regex (one named
+alternative per format, tried in order), and the datetime objects are built
+directly from the month tables, instead of 'datetime.strptime' (which is
+slow and depends on the locale of the process).
+
+The bank account states share a few hundred date strings, so the results
+are memoized (bounded LRU caches).
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+DATE_STRINGS_CACHE_SIZE = 4096
+
+SHORT_MONTH_MAPPING = {
+    'ene': 'enero',
+    'feb': 'febrero',
+    'mar': 'marzo',
+    'abr': 'abril',
+    'may': 'mayo',
+    'jun': 'junio',
+    'jul': 'julio',
+    'ago': 'agosto',
+    'sep': 'septiembre',
+    'oct': 'octubre',
+    'nov': 'noviembre',
+    'dic': 'diciembre'
+}
+
+# Map Spanish month names to English month names
+MONTH_MAPPING_ESP_TO_ENG = {
+    'enero': 'January',
+    'febrero': 'February',
+    'marzo': 'March',
+    'abril': 'April',
+    'mayo': 'May',
+    'junio': 'June',
+    'julio': 'July',
+    'agosto': 'August',
+    'septiembre': 'September',
+    'octubre': 'October',
+    'noviembre': 'November',
+    'diciembre': 'December'
+}
+
+MONTH_MAPPING_SPANISH_BY_NUMBER = {
+    1: 'Enero',
+    2: 'Febrero',
+    3: 'Marzo',
+    4: 'Abril',
+    5: 'Mayo',
+    6: 'Junio',
+    7: 'Julio',
+    8: 'Agosto',
+    9: 'Septiembre',
+    10: 'Octubre',
+    11: 'Noviembre',
+    12: 'Diciembre',
+}
+
+MONTH_NUMBER_BY_SPANISH_NAME = {
+    month_name.lower(): month_number
+    for month_number, month_name in MONTH_MAPPING_SPANISH_BY_NUMBER.items()
+}
+
+# Regex Patterns for dates
+# (a month is '(\w+)', not '(\w+)+': both match and capture the same text,
+# but the nested quantifier backtracks exponentially on strings without spaces)
+#   > '15 al 15 marzo de 2024'
+RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY = r'^(\d{2})\s*al\s*(\d{2})\s*de\s*(\w+)\s*de\s*(\d{4})$'
+#   > '15 de marzo de 2024'
+RE_PATTERN__DD_DE_MONTH_DE_YYYY = r'^(\d{1,2})\s*de\s*(\w+)\s*de\s*(\d{4})$'
+#   > '15 de marzo al 15 de abril de 2024'
+RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY = (
+    r'^(\d{1,2})\s*de\s*(\w+)\s*al\s*(\d{1,2})\s*de\s*(\w+)\s*de[l]?\s*(\d{4})$'
+)
+#   > '15 de marzo del 2024 al 15 de abril del 2024'
+RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY = (
+    r'^(\d{1,2})\s*de\s*(\w+)\s*de[l]?\s*(\d{4})\s*al\s*(\d{1,2})\s*de\s*(\w+)\s*de[l]?\s*(\d{4})$'
+)
+#   > '15-Mar-2024 al 15-Ago-2024'
+RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY = (
+    r'^(\d{1,2})\-(\w+)\-(\d{4})\s*al\s*(\d{1,2})\-(\w+)\-(\d{4})$'
+)
+#   > '15-Mar-2024'
+RE_PATTERN__DD_dash_MONTH_dash_YYYY = (
+    r'^(\d{1,2})\-(\w+)\-(\d{4})$'
+)
+#   > '15 Ago 2024'
+RE_PATTERN__DD_MMM_YYYY = (
+    r'^(\d{1,2})\s*(\w{3})\s*(\d{4})$'
+)
+#   > '01 Ago 2024 al 31 Ago 2024'
+RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY = (
+    r'^(\d{1,2})\s*(\w{3})\s*(\d{4})\s*al\s*(\d{1,2})\s*(\w{3})\s*(\d{4})$'
+)
+#   > '10/01/2024'
+RE_PATTERN__DD_slash_MM_slash_YYYY = (
+    r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})$'
+)
+#   > '11/12/2023 al 10/01/2024'
+RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY = (
+    r'^\s?(\d{1,2})\/(\d{1,2})\/(\d{4})\s*al\s*(\d{1,2})\/(\d{1,2})\/(\d{4})$'
+)
+
+# [(pattern, names of its groups)] in the order they are tried
+# (the first pattern that matches is the one used)
+_DATE_FORMATS = [
+    (RE_PATTERN__DD_AL_DD_MONTH_DE_YYYY, ("start_day", "end_day", "start_month", "year")),
+    (RE_PATTERN__DD_DE_MONTH_DE_YYYY, ("start_day", "start_month", "year")),
+    (
+        RE_PATTERN__DD_DE_MONTH_AL_DD_DE_MONTH_DE_YYYY,
+        ("start_day", "start_month", "end_day", "end_month", "year"),
+    ),
+    (
+        RE_PATTERN__DD_DE_MONTH_DEL_YYYY_AL_DD_DE_MONTH_DEL_YYYY,
+        ("start_day", "start_month", "start_year", "end_day", "end_month", "year"),
+    ),
+    (
+        RE_PATTERN__DD_dash_MONTH_dash_YYYY_AL_DD_dash_MONTH_dash_YYYY,
+        ("start_day", "start_month", "start_year", "end_day", "end_month", "year"),
+    ),
+    (RE_PATTERN__DD_dash_MONTH_dash_YYYY, ("start_day", "start_month", "year")),
+    (RE_PATTERN__DD_MMM_YYYY, ("start_day", "start_month", "year")),
+    (
+        RE_PATTERN__DD_MMM_YYYY_AL_DD_MMM_YYYY,
+        ("start_day", "start_month", "start_year", "end_day", "end_month", "year"),
+    ),
+    (RE_PATTERN__DD_slash_MM_slash_YYYY, ("start_day", "start_month", "year")),
+    (
+        RE_PATTERN__DD_slash_MM_slash_YYYY_AL_DD_slash_MM_slash_YYYY,
+        ("start_day", "start_month", "start_year", "end_day", "end_month", "year"),
+    ),
+]
+
+# the same '%d' regex used by 'datetime.strptime'
+_RE_DAY_OF_MONTH = re.compile(r'3[01]|[12]\d|0[1-9]|[1-9]')
+
+
+def _name_pattern_groups(pattern: str, format_index: int, group_names: tuple) -> str:
+    """
+    Replace the (unnamed) groups of the pattern with the given group names,
+    prefixed with the format index (the names must be unique in the regex).
+    """
+    group_names_iterator = iter(group_names)
+    return re.sub(
+        r'(?<!\\)\((?!\?)',
+        lambda _: f"(?P<f{format_index}_{next(group_names_iterator)}>",
+        pattern,
+    )
+
+
+_RE_DATE_FORMATS = re.compile("|".join(
+    f"(?P<f{format_index}>{_name_pattern_groups(pattern, format_index, group_names)})"
+    for format_index, (pattern, group_names) in enumerate(_DATE_FORMATS)
+))
+
+
+def _match_date_string(date_string: str) -> tuple[int, re.Match]:
+    """
+    Get the (format index, match) of the date string (already in lower case).
+    """
+    match = _RE_DATE_FORMATS.match(date_string)
+    if not match:
+        raise RuntimeError(
+            f"RE Pattern not supported for date string value: '{date_string}'"
+        )
+    return int(match.lastgroup[1:]), match
+
+
+def get_regex_pattern_from_date_string(date_string: str) -> str:
+    format_index, _ = _match_date_string(date_string.lower())
+    return _DATE_FORMATS[format_index][0]
+
+
+@lru_cache(maxsize=DATE_STRINGS_CACHE_SIZE)
+def _get_date_data(date_string: str) -> tuple:
+    format_index, match = _match_date_string(date_string.lower())
+    group_names = _DATE_FORMATS[format_index][1]
+    date_data = {
+        group_name: match.group(f"f{format_index}_{group_name}")
+        for group_name in group_names
+    }
+
+    start_month = date_data.get("start_month")
+    end_month = date_data.get("end_month")
+    # '15 al 15 marzo de 2024': both days are in the same month
+    if "end_day" in date_data and "end_month" not in date_data:
+        end_month = start_month
+
+    if start_month in SHORT_MONTH_MAPPING:
+        start_month = SHORT_MONTH_MAPPING[start_month]
+    if end_month in SHORT_MONTH_MAPPING:
+        end_month = SHORT_MONTH_MAPPING[end_month]
+
+    return (
+        date_data.get("start_day"),
+        start_month,
+        date_data.get("end_day"),
+        end_month,
+        date_data.get("year"),
+    )
+
+
+def get_datetime_data_from_date_string(date_string: str) -> dict:
+    """
+    Get the {start_day, start_month, end_day, end_month, year} strings of the
+    date string (the missing values are None, the short month names are expanded).
+    """
+    start_day, start_month, end_day, end_month, year = _get_date_data(date_string)
+    return {
+        "start_day": start_day,
+        "start_month": start_month,
+        "end_day": end_day,
+        "end_month": end_month,
+        "year": year,
+    }
+
+
+@lru_cache(maxsize=DATE_STRINGS_CACHE_SIZE)
+def format_date_string_into_datetime(date_string: str) -> datetime:
+    """
+    Get the datetime of the (start) date of the date string.
+    """
+    day, month, _, _, year = _get_date_data(date_string)
+
+    # Convert month number to month name in Spanish
+    if month.isdigit():
+        month = MONTH_MAPPING_SPANISH_BY_NUMBER.get(int(month)).lower()
+
+    month_number = MONTH_NUMBER_BY_SPANISH_NAME[month]
+
+    if not _RE_DAY_OF_MONTH.fullmatch(day):
+        raise ValueError(
+            f"time data '{day} {MONTH_MAPPING_ESP_TO_ENG[month]} {year}' "
+            "does not match format '%d %B %Y'"
+        )
+    return datetime(int(year), month_number, int(day))
+
+
+@lru_cache(maxsize=DATE_STRINGS_CACHE_SIZE)
+def format_date_period_string_into_datetime_tuple(date_period_string: str) -> tuple[datetime, datetime]:
+    """
+    Formats:
+        '4 de febrero al 3 de marzo del 2024'
+    """
+    start_day, start_month, end_day, end_month, year = _get_date_data(
+        date_period_string.lower()
+    )
+
+    # Handle year offset in case of December being the start month
+    # and January being the end month.
+    # e.g. '4 de diciembre al 3 de enero del 2024'
+    year_offset = 0
+    if start_month.lower() == 'diciembre' and end_month.lower() == 'enero':
+        year_offset = 1
+
+    # the dates are parsed as '{day} de {month} de {year}' (memoized too),
+    # which keeps the validation of the day, month and year in one place
+    start_date = format_date_string_into_datetime(
+        f"{start_day} de {start_month} de {int(year)-year_offset}"
+    )
+    end_date = format_date_string_into_datetime(
+        f"{end_day} de {end_month} de {year}"
+    )
+
+    return start_date, end_date
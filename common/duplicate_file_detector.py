@@ -0,0 +1,99 @@
+import hashlib
+import os
+from typing import Union
+
+from common.file_hash_registry import FileHashRegistry
+from common.instrumentation import PipelineInstrumentation
+
+
+def get_file_partial_hash(file_path: str, block_size: int) -> str:
+    """
+    Hash of the first and last blocks of a file (the whole file if it is smaller).
+    """
+    hash_object = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file_obj:
+        hash_object.update(file_obj.read(block_size))
+        file_size = os.fstat(file_obj.fileno()).st_size
+        if file_size > block_size:
+            file_obj.seek(max(block_size, file_size - block_size))
+            hash_object.update(file_obj.read(block_size))
+    return hash_object.hexdigest()
+
+
+class DuplicateFileDetector:
+    """
+    Online detection of byte-identical files, as they are found:
+
+        size -> partial hash (first and last blocks) -> full hash
+
+    Each step only runs for the files that collide in the previous one,
+    so a file with a unique size is never read. The full hashes come from
+    the FileHashRegistry, so they are not computed again later.
+    """
+
+    PARTIAL_HASH_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.file_hash_registry = FileHashRegistry()
+        self.instrumentation = PipelineInstrumentation()
+        # {size: [file paths, in the order they were added]}
+        self.files_by_size = {}
+        # {file path: partial hash}
+        self.partial_hashes = {}
+        # {file path: size}
+        self.file_sizes = {}
+
+    def _get_partial_hash(self, file_path: str) -> str:
+        partial_hash = self.partial_hashes.get(file_path)
+        if partial_hash is None:
+            with self.instrumentation.stage("partial_hash", file_path):
+                partial_hash = get_file_partial_hash(file_path, self.PARTIAL_HASH_BLOCK_SIZE)
+            self.partial_hashes[file_path] = partial_hash
+        return partial_hash
+
+    def add(self, file_path: str) -> Union[str, None]:
+        """
+        Add a file and get the first file added with the same bytes (None if it is not a duplicate).
+        """
+        file_size = os.path.getsize(file_path)
+        same_size_files = self.files_by_size.setdefault(file_size, [])
+        self.file_sizes[file_path] = file_size
+        if file_path in same_size_files:
+            return None
+        original_file_path = None
+        if same_size_files:
+            partial_hash = self._get_partial_hash(file_path)
+            for same_size_file_path in same_size_files:
+                try:
+                    if (
+                        self._get_partial_hash(same_size_file_path) == partial_hash
+                        and self.file_hash_registry.get_file_hash(same_size_file_path)
+                        == self.file_hash_registry.get_file_hash(file_path)
+                    ):
+                        original_file_path = same_size_file_path
+                        break
+                except FileNotFoundError:
+                    continue
+        same_size_files.append(file_path)
+        if original_file_path is not None:
+            self.instrumentation.count("duplicate_files.detected")
+        return original_file_path
+
+    def remove(self, file_path: str):
+        """
+        Forget a file (e.g. deleted or modified).
+        """
+        file_size = self.file_sizes.pop(file_path, None)
+        if file_size is not None:
+            self.files_by_size[file_size].remove(file_path)
+        self.partial_hashes.pop(file_path, None)
+
+    def rename(self, file_path: str, new_file_path: str):
+        file_size = self.file_sizes.pop(file_path, None)
+        if file_size is None:
+            return
+        same_size_files = self.files_by_size[file_size]
+        same_size_files[same_size_files.index(file_path)] = new_file_path
+        self.file_sizes[new_file_path] = file_size
+        if file_path in self.partial_hashes:
+            self.partial_hashes[new_file_path] = self.partial_hashes.pop(file_path)
@@ -0,0 +1,65 @@
+import settings
+from common.instrumentation import PipelineInstrumentation
+from common.utils import singleton, get_file_hashes, get_file_stat_signature
+
+
+@singleton
+class FileHashRegistry:
+    """
+    Per-run registry of file hashes, keyed by (path, size, mtime_ns, inode).
+
+    A file whose stat signature is already known is never read again.
+    The registry can be seeded with the signatures persisted by a previous
+    run, so a warm run over unchanged files does not hash anything.
+    """
+
+    def __init__(self):
+        self.algorithm = settings.get_hash_algorithm()
+        # {(path, size, mtime_ns, inode): {algorithm: hash}}
+        self.file_hashes = {}
+        self.total_files_hashed = 0
+        self.instrumentation = PipelineInstrumentation()
+
+    @staticmethod
+    def _get_registry_key(file_path: str, stat_signature) -> tuple:
+        return (file_path, *stat_signature)
+
+    def add_file_hash(self, file_path: str, stat_signature, file_hash: str, algorithm: str = None):
+        """
+        Register a hash already known for the given path and stat signature.
+        """
+        registry_key = self._get_registry_key(file_path, stat_signature)
+        self.file_hashes.setdefault(registry_key, {})[algorithm or self.algorithm] = file_hash
+
+    def get_cached_file_hash(self, file_path: str, algorithm: str = None) -> str | None:
+        """
+        Get the hash of a file only if it is known for its current stat signature.
+        """
+        registry_key = self._get_registry_key(file_path, get_file_stat_signature(file_path))
+        file_hash = self.file_hashes.get(registry_key, {}).get(algorithm or self.algorithm)
+        if file_hash is not None:
+            self.instrumentation.count("file_hash.cached")
+        return file_hash
+
+    def get_file_hashes(self, file_path: str, algorithms=None) -> dict[str, str]:
+        """
+        Get the hashes of a file, computing the missing ones in a single read.
+        """
+        algorithms = algorithms or (self.algorithm,)
+        registry_key = self._get_registry_key(file_path, get_file_stat_signature(file_path))
+        file_hashes = self.file_hashes.setdefault(registry_key, {})
+        missing_algorithms = [
+            algorithm for algorithm in algorithms if algorithm not in file_hashes
+        ]
+        if missing_algorithms:
+            with self.instrumentation.stage("file_hash", file_path):
+                file_hashes.update(get_file_hashes(file_path, missing_algorithms))
+            self.total_files_hashed += 1
+            self.instrumentation.count("file_hash.computed")
+        else:
+            self.instrumentation.count("file_hash.cached")
+        return {algorithm: file_hashes[algorithm] for algorithm in algorithms}
+
+    def get_file_hash(self, file_path: str, algorithm: str = None) -> str:
+        algorithm = algorithm or self.algorithm
+        return self.get_file_hashes(file_path, (algorithm,))[algorithm]
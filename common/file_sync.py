@@ -0,0 +1,178 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from common.logging import get_logger
+
+logger = get_logger(__name__)
+
+LINK_MODE_COPY = "copy"
+LINK_MODE_REFLINK = "reflink"
+LINK_MODE_HARDLINK = "hardlink"
+LINK_MODE_SYMLINK = "symlink"
+LINK_MODES = (LINK_MODE_COPY, LINK_MODE_REFLINK, LINK_MODE_HARDLINK, LINK_MODE_SYMLINK)
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def reflink_file(src_file_path: str, dst_file_path: str):
+    """
+    Copy a file sharing its data blocks (copy-on-write) when the file system
+    supports it (FICLONE: btrfs, XFS...). Otherwise the data is copied in the
+    kernel ('copy_file_range') or, as a last resort, in user space.
+    """
+    with open(src_file_path, "rb") as src_file_obj, open(dst_file_path, "wb") as dst_file_obj:
+        try:
+            import fcntl
+
+            fcntl.ioctl(dst_file_obj.fileno(), FICLONE, src_file_obj.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+        try:
+            remaining_bytes = os.fstat(src_file_obj.fileno()).st_size
+            while remaining_bytes > 0:
+                copied_bytes = os.copy_file_range(
+                    src_file_obj.fileno(), dst_file_obj.fileno(), remaining_bytes
+                )
+                if copied_bytes == 0:
+                    break
+                remaining_bytes -= copied_bytes
+            return
+        except (AttributeError, OSError):
+            src_file_obj.seek(0)
+            dst_file_obj.seek(0)
+            dst_file_obj.truncate()
+        shutil.copyfileobj(src_file_obj, dst_file_obj)
+
+
+def _copy_file(src_file_path: str, dst_file_path: str, link_mode: str):
+    if link_mode == LINK_MODE_REFLINK:
+        reflink_file(src_file_path, dst_file_path)
+    else:
+        shutil.copyfile(src_file_path, dst_file_path)
+    # the same mtime as the source marks the copy as up to date
+    src_stat = os.stat(src_file_path)
+    os.utime(dst_file_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+
+def is_file_synced(src_file_path: str, dst_file_path: str, link_mode: str) -> bool:
+    """
+    Check if the destination already is the source file, as the link mode creates it.
+    """
+    try:
+        dst_lstat = os.lstat(dst_file_path)
+        src_stat = os.stat(src_file_path)
+    except FileNotFoundError:
+        return False
+    if link_mode == LINK_MODE_SYMLINK:
+        return os.path.islink(dst_file_path) and os.readlink(dst_file_path) == src_file_path
+    if os.path.islink(dst_file_path):
+        return False
+    is_same_file = (dst_lstat.st_dev, dst_lstat.st_ino) == (src_stat.st_dev, src_stat.st_ino)
+    is_same_copy = (
+        dst_lstat.st_size == src_stat.st_size and dst_lstat.st_mtime_ns == src_stat.st_mtime_ns
+    )
+    if link_mode == LINK_MODE_HARDLINK:
+        # a hardlink is not possible across devices: a copy is used instead
+        return is_same_file or (is_same_copy and dst_lstat.st_dev != src_stat.st_dev)
+    return is_same_copy and not is_same_file
+
+
+def sync_file(src_file_path: str, dst_file_path: str, link_mode: str = LINK_MODE_COPY):
+    """
+    Create (or replace) the destination as a copy/reflink/hardlink/symlink of the source.
+    The hardlinks and symlinks fall back to a copy when they are not possible.
+    """
+    os.makedirs(os.path.dirname(dst_file_path), exist_ok=True)
+    # created aside and replaced, so the destination is never half-written
+    tmp_file_path = f"{dst_file_path}.sync-tmp"
+    if os.path.lexists(tmp_file_path):
+        os.remove(tmp_file_path)
+    try:
+        if link_mode == LINK_MODE_HARDLINK:
+            os.link(src_file_path, tmp_file_path)
+        elif link_mode == LINK_MODE_SYMLINK:
+            os.symlink(src_file_path, tmp_file_path)
+        else:
+            _copy_file(src_file_path, tmp_file_path, link_mode)
+    except OSError as exc:
+        if link_mode not in (LINK_MODE_HARDLINK, LINK_MODE_SYMLINK):
+            raise
+        logger.debug("Not possible to %s '%s', copying it instead: %s", link_mode, src_file_path, exc)
+        _copy_file(src_file_path, tmp_file_path, LINK_MODE_COPY)
+    os.replace(tmp_file_path, dst_file_path)
+
+
+class DirectorySync:
+    """
+    Syncs a directory with the desired layout {dst file path: src file path}:
+    only the missing or outdated entries are created, and the entries that
+    are not in the layout anymore are removed (with their empty directories).
+    The files are copied/linked on a small pool of I/O threads.
+    """
+
+    def __init__(self, output_dir: str, link_mode: str = LINK_MODE_COPY, workers: int = 4):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Invalid link mode '{link_mode}', available: {LINK_MODES}")
+        self.output_dir = output_dir
+        self.link_mode = link_mode
+        self.workers = max(1, workers)
+
+    def _get_existing_files(self) -> set[str]:
+        existing_files = set()
+        for dir_path, _, file_names in os.walk(self.output_dir):
+            for file_name in file_names:
+                existing_files.add(os.path.join(dir_path, file_name))
+        return existing_files
+
+    def _remove_empty_dirs(self):
+        for dir_path, dir_names, file_names in os.walk(self.output_dir, topdown=False):
+            if dir_path != self.output_dir and not os.listdir(dir_path):
+                os.rmdir(dir_path)
+
+    def get_sync_plan(
+        self,
+        desired_files: dict[str, str],
+        remove_extra_files: bool = True,
+    ) -> tuple[dict[str, str], set[str], set[str]]:
+        """
+        Get what a sync would do: ({dst file path: src file path} to copy/link,
+        dst file paths to remove, dst file paths that already exist).
+        """
+        existing_files = self._get_existing_files()
+        files_to_sync = {
+            dst_file_path: src_file_path
+            for dst_file_path, src_file_path in desired_files.items()
+            if dst_file_path not in existing_files
+            or not is_file_synced(src_file_path, dst_file_path, self.link_mode)
+        }
+        files_to_remove = existing_files - desired_files.keys() if remove_extra_files else set()
+        return files_to_sync, files_to_remove, existing_files
+
+    def sync(self, desired_files: dict[str, str], remove_extra_files: bool = True) -> dict[str, int]:
+        """
+        Sync the directory and get the number of files added/updated/removed/unchanged.
+        """
+        files_to_sync, files_to_remove, existing_files = self.get_sync_plan(desired_files, remove_extra_files)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            sync_futures = [
+                executor.submit(sync_file, src_file_path, dst_file_path, self.link_mode)
+                for dst_file_path, src_file_path in files_to_sync.items()
+            ]
+            for file_path in files_to_remove:
+                os.remove(file_path)
+            for sync_future in sync_futures:
+                sync_future.result()
+        if files_to_remove:
+            self._remove_empty_dirs()
+
+        files_added = len(files_to_sync.keys() - existing_files)
+        return {
+            "added": files_added,
+            "updated": len(files_to_sync) - files_added,
+            "removed": len(files_to_remove),
+            "unchanged": len(desired_files) - len(files_to_sync),
+        }
@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import settings
+from common.report_manager import ReportManager
+from common.utils import singleton
+
+
+class _ProfileStats:
+    """
+    cProfile stats (e.g. received from a worker process) that 'pstats.Stats' can load.
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+@singleton
+class PipelineInstrumentation:
+    """
+    Wall and CPU time of the stages of the pipeline (per stage and per file)
+    and counters (e.g. cache hits/misses), summarized at the end of the run.
+
+    Stages can be nested (e.g. 'classification' inside 'load_pdf_file'), so
+    their times are inclusive. With 'profile: true' in the configuration,
+    the outermost stages are also profiled with cProfile, and their stats
+    are dumped next to the run summary.
+
+    Worker processes send their data back to the parent process
+    ('pop_data'/'merge_data'), so the summary covers the whole run.
+    The stages can also be recorded from several threads (e.g. the I/O
+    stages of the asyncio pipeline).
+    """
+
+    OUTPUT_DIR_NAME = "_PipelineInstrumentation"
+    RUN_SUMMARY_FILE_NAME = "run_summary.json"
+
+    def __init__(self):
+        self.is_profile_enabled = settings.is_profile_enabled()
+        # {stage_name: {"calls": int, "wall_seconds": float, "cpu_seconds": float}}
+        self.stages = {}
+        # {file_path: {stage_name: {"wall_seconds": float, "cpu_seconds": float}}}
+        self.files = {}
+        # {counter_name: value}
+        self.counters = {}
+        # {stage_name: cProfile.Profile}
+        self.profilers = {}
+        # {stage_name: [cProfile stats received from the worker processes]}
+        self.profile_stats = {}
+        self._is_profiling = False
+        # (hits, misses) of the date parser cache already counted
+        self._date_cache_info_counted = (0, 0)
+        self.start_wall_time = time.perf_counter()
+        self.start_cpu_time = time.process_time()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_output_dir(cls) -> str:
+        return f"{settings.get_tmp_dir()}/{cls.OUTPUT_DIR_NAME}"
+
+    def _start_profiler(self, stage_name: str):
+        # only one profiler can be active at a time: the outermost stage
+        if not self.is_profile_enabled or self._is_profiling:
+            return None
+        if stage_name not in self.profilers:
+            import cProfile
+
+            self.profilers[stage_name] = cProfile.Profile()
+        profiler = self.profilers[stage_name]
+        self._is_profiling = True
+        profiler.enable()
+        return profiler
+
+    @contextmanager
+    def stage(self, stage_name: str, file_path: str = None):
+        """
+        Record the wall and CPU time of the code block as the given stage
+        (of the given file, if any).
+        """
+        profiler = self._start_profiler(stage_name)
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - start_wall_time
+            cpu_seconds = time.process_time() - start_cpu_time
+            if profiler is not None:
+                profiler.disable()
+                self._is_profiling = False
+            self.add_stage_time(stage_name, wall_seconds, cpu_seconds, file_path)
+
+    def add_stage_time(
+        self,
+        stage_name: str,
+        wall_seconds: float,
+        cpu_seconds: float,
+        file_path: str = None,
+        calls: int = 1,
+    ):
+        with self._lock:
+            stage_data = self.stages.setdefault(
+                stage_name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+            )
+            stage_data["calls"] += calls
+            stage_data["wall_seconds"] += wall_seconds
+            stage_data["cpu_seconds"] += cpu_seconds
+            if file_path is not None:
+                file_stage_data = self.files.setdefault(file_path, {}).setdefault(
+                    stage_name, {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+                )
+                file_stage_data["wall_seconds"] += wall_seconds
+                file_stage_data["cpu_seconds"] += cpu_seconds
+
+    def count(self, counter_name: str, value: int = 1):
+        with self._lock:
+            self.counters[counter_name] = self.counters.get(counter_name, 0) + value
+
+    def _count_date_cache_info(self):
+        from common import dates
+
+        date_cache_info = dates.format_date_period_string_into_datetime_tuple.cache_info()
+        hits, misses = self._date_cache_info_counted
+        self.count("date_cache.hit", date_cache_info.hits - hits)
+        self.count("date_cache.miss", date_cache_info.misses - misses)
+        self._date_cache_info_counted = (date_cache_info.hits, date_cache_info.misses)
+
+    def pop_data(self) -> dict:
+        """
+        Get the data recorded since the last call and reset it
+        (used to send the data of a worker process to the parent process).
+        """
+        self._count_date_cache_info()
+        profile_stats = {}
+        for stage_name, profiler in self.profilers.items():
+            profiler.create_stats()
+            profile_stats[stage_name] = [profiler.stats]
+        data = {
+            "stages": self.stages,
+            "files": self.files,
+            "counters": self.counters,
+            "profile_stats": profile_stats,
+        }
+        self.stages, self.files, self.counters, self.profilers = {}, {}, {}, {}
+        return data
+
+    def merge_data(self, data: dict):
+        """
+        Merge the data recorded by a worker process.
+        """
+        for stage_name, stage_data in data["stages"].items():
+            self.add_stage_time(
+                stage_name, stage_data["wall_seconds"], stage_data["cpu_seconds"], calls=stage_data["calls"]
+            )
+        with self._lock:
+            for file_path, file_stages in data["files"].items():
+                for stage_name, file_stage_data in file_stages.items():
+                    file_stage_data_merged = self.files.setdefault(file_path, {}).setdefault(
+                        stage_name, {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+                    )
+                    file_stage_data_merged["wall_seconds"] += file_stage_data["wall_seconds"]
+                    file_stage_data_merged["cpu_seconds"] += file_stage_data["cpu_seconds"]
+        for counter_name, value in data["counters"].items():
+            self.count(counter_name, value)
+        for stage_name, stats_list in data["profile_stats"].items():
+            self.profile_stats.setdefault(stage_name, []).extend(stats_list)
+
+    def get_run_summary(self) -> dict:
+        self._count_date_cache_info()
+        return {
+            "wall_seconds": time.perf_counter() - self.start_wall_time,
+            "cpu_seconds": time.process_time() - self.start_cpu_time,
+            "total_files": len(self.files),
+            "stages": self.stages,
+            "counters": self.counters,
+            "files": self.files,
+        }
+
+    def dump_profile_stats(self, output_dir: str) -> list[str]:
+        """
+        Dump the cProfile stats of each stage ('{stage_name}.prof', for 'pstats'/snakeviz).
+        """
+        import pstats
+
+        profile_file_paths = []
+        for stage_name in sorted(set(self.profilers) | set(self.profile_stats)):
+            stats = None
+            stats_sources = [
+                *([self.profilers[stage_name]] if stage_name in self.profilers else []),
+                *(_ProfileStats(worker_stats) for worker_stats in self.profile_stats.get(stage_name, [])),
+            ]
+            for stats_source in stats_sources:
+                if stats is None:
+                    stats = pstats.Stats(stats_source)
+                else:
+                    stats.add(stats_source)
+            profile_file_path = f"{output_dir}/{stage_name}.prof"
+            stats.dump_stats(profile_file_path)
+            profile_file_paths.append(profile_file_path)
+        return profile_file_paths
+
+    def generate_run_summary(self, report_file_path: str = None) -> str:
+        """
+        Save the run summary (JSON) and print the time of each stage.
+        """
+        output_dir = self.get_output_dir()
+        os.makedirs(output_dir, exist_ok=True)
+        report_file_path = report_file_path or f"{output_dir}/{self.RUN_SUMMARY_FILE_NAME}"
+        run_summary = self.get_run_summary()
+        if self.is_profile_enabled:
+            run_summary["profile_files"] = self.dump_profile_stats(output_dir)
+        ReportManager().generate_json_report(run_summary, report_file_path)
+
+        print(
+            f"[instrumentation] Run summary: [{run_summary['total_files']}] files | "
+            f"wall: {run_summary['wall_seconds']:.2f} s | cpu: {run_summary['cpu_seconds']:.2f} s | "
+            f"'{report_file_path}'"
+        )
+        for stage_name, stage_data in sorted(
+            run_summary["stages"].items(), key=lambda item: -item[1]["wall_seconds"]
+        ):
+            print(
+                f" > {stage_name:<24} calls: {stage_data['calls']:>7} | "
+                f"wall: {stage_data['wall_seconds']:8.3f} s | cpu: {stage_data['cpu_seconds']:8.3f} s"
+            )
+        print(" > counters: " + ", ".join(
+            f"{counter_name}={value}" for counter_name, value in sorted(run_summary["counters"].items())
+        ))
+        return report_file_path
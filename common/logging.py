@@ -1,18 +1,164 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import settings
+
+LEVELS = {
+    0: "DEBUG",
+    1: "INFO",
+    2: "WARNING",
+    3: "ERROR",
+    4: "CRITICAL",
+}
+
+
+class LogSink:
+    """
+    Destination of the log records.
+    """
+
+    def emit(self, record: dict):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+
+class ConsoleLogSink(LogSink):
+    """
+    Writes the records to 'sys.stdout'. The records share the stdout buffer
+    with 'print', so the output keeps its order; the buffer is only flushed
+    per line on a terminal (redirected output is written in blocks).
+    """
+
+    def emit(self, record: dict):
+        sys.stdout.write(f"[{record['name']}] {record['level']}: {record['message']}\n")
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class JsonLinesLogSink(LogSink):
+    """
+    Appends the records to a JSON-lines file (one JSON object per line).
+    The file is opened in append mode, so the worker processes can share it.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._file = None
+        self._pid = None
+
+    def emit(self, record: dict):
+        # a forked process opens its own file object
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            self._file = open(self.file_path, "a", encoding="utf-8")
+            self._pid = os.getpid()
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.flush()
+
+
+class BackgroundLogSink(LogSink):
+    """
+    Emits the records to another sink from a background thread, so the
+    formatting and the I/O are off the calling thread. The sink is flushed
+    every time the queue of records is drained.
+    """
+
+    def __init__(self, sink: LogSink):
+        self.sink = sink
+        self._queue = None  # type: queue.Queue
+        self._pid = None
+
+    def _start_thread(self):
+        # threads don't survive a fork: each process starts its own
+        self._queue = queue.Queue()
+        self._pid = os.getpid()
+        threading.Thread(target=self._emit_records, name="BackgroundLogSink", daemon=True).start()
+
+    def _emit_records(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self.sink.emit(record)
+                if self._queue.empty():
+                    self.sink.flush()
+            finally:
+                self._queue.task_done()
+
+    def emit(self, record: dict):
+        if self._pid != os.getpid():
+            self._start_thread()
+        self._queue.put(record)
+
+    def flush(self):
+        if self._pid == os.getpid():
+            self._queue.join()
+
+
+_LOG_SINKS = None  # type: list[LogSink] | None
+_LOGGERS = {}  # type: dict[str, CustomLogger]
+
+
+def get_log_sinks() -> list[LogSink]:
+    """
+    Get the sinks of all the loggers (set up from the configuration on first use).
+    """
+    global _LOG_SINKS
+    if _LOG_SINKS is None:
+        _LOG_SINKS = [ConsoleLogSink()]
+        if settings.is_log_json_lines_enabled():
+            json_lines_file_path = f"{settings.get_tmp_dir()}/_Logs/log_{time.strftime('%Y%m%d')}.jsonl"
+            _LOG_SINKS.append(BackgroundLogSink(JsonLinesLogSink(json_lines_file_path)))
+        atexit.register(flush_logs)
+    return _LOG_SINKS
+
+
+def flush_logs():
+    """
+    Wait until all the log records were written.
+    """
+    for log_sink in _LOG_SINKS or []:
+        log_sink.flush()
+
+
+def get_logger(name: str) -> "CustomLogger":
+    """
+    Get the (cached) logger of the given name, e.g. 'get_logger(__name__)'.
+    """
+    logger = _LOGGERS.get(name)
+    if logger is None:
+        logger = _LOGGERS[name] = CustomLogger(name)
+    return logger
+
 
 class CustomLogger:
+    """
+    Level-gated logger. The messages are formatted lazily ('%' style args),
+    so a message below the configured level only costs the level check:
 
-    LEVELS = {
-        0: "DEBUG",
-        1: "INFO",
-        2: "WARNING",
-        3: "ERROR",
-        4: "CRITICAL",
-    }
+        logger.debug("Processing PDF file: '%s'", pdf_file_path)
+    """
 
-    def __init__(self, name, level="INFO"):
+    LEVELS = LEVELS
+
+    def __init__(self, name, level=None):
         self.name = name
-        self.level = level
-        self.level_value = self.get_level_value(level)
+        self.level = (level or settings.get_log_level()).upper()
+        self.level_value = self.get_level_value(self.level)
+
+    def __reduce__(self):
+        # the loggers of the objects sent by worker processes
+        return self.__class__, (self.name, self.level)
 
     def get_level_value(self, level):
         for value, name in self.LEVELS.items():
@@ -20,14 +166,38 @@ class CustomLogger:
                 return value
         return 1
 
-    def debug(self, message):
+    def is_enabled_for(self, level_value: int) -> bool:
+        return self.level_value <= level_value
+
+    def _log(self, level_value: int, message: str, args: tuple):
+        if args:
+            message = message % args
+        record = {
+            "time": time.time(),
+            "level": self.LEVELS[level_value],
+            "name": self.name,
+            "pid": os.getpid(),
+            "message": message,
+        }
+        for log_sink in get_log_sinks():
+            log_sink.emit(record)
+
+    def debug(self, message, *args):
         if self.level_value <= 0:
-            print(f"[{self.name}] DEBUG: {message}")
+            self._log(0, message, args)
 
-    def info(self, message):
+    def info(self, message, *args):
         if self.level_value <= 1:
-            print(f"[{self.name}] INFO: {message}")
+            self._log(1, message, args)
 
-    def warning(self, message):
+    def warning(self, message, *args):
         if self.level_value <= 2:
-            print(f"[{self.name}] WARNING: {message}")
+            self._log(2, message, args)
+
+    def error(self, message, *args):
+        if self.level_value <= 3:
+            self._log(3, message, args)
+
+    def critical(self, message, *args):
+        if self.level_value <= 4:
+            self._log(4, message, args)
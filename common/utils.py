@@ -2,6 +2,8 @@ import hashlib
 import os
 import json
 
+FILE_HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def singleton(cls):
     instances = {}
@@ -41,8 +43,8 @@ def load_json_file(json_file_path) -> dict:
     return json_data
 
 
-def read_txt_file(file_path):
-    with open(file_path, "r") as file_obj:
+def read_txt_file(file_path, newline=None):
+    with open(file_path, "r", newline=newline) as file_obj:
         file_contents = file_obj.read()
     return file_contents
 
@@ -55,7 +57,32 @@ def get_file_hash(file_path, algorithm='sha256'):
     """
     Compute the hash of a file using the specified algorithm.
     """
+    return get_file_hashes(file_path, (algorithm,))[algorithm]
+
+
+def get_file_hashes(file_path, algorithms) -> dict[str, str]:
+    """
+    Compute the hashes of a file for several algorithms at once.
+    The file is streamed in chunks and read only once.
+    """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    return hashlib.md5(open(file_path, 'rb').read()).hexdigest()
+    hash_objects = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    with open(file_path, 'rb') as file_obj:
+        while chunk := file_obj.read(FILE_HASH_CHUNK_SIZE):
+            for hash_object in hash_objects.values():
+                hash_object.update(chunk)
+    return {
+        algorithm: hash_object.hexdigest()
+        for algorithm, hash_object in hash_objects.items()
+    }
+
+
+def get_file_stat_signature(file_path) -> tuple[int, int, int]:
+    """
+    Get the (size, mtime_ns, inode) of a file. If the signature of a file
+    has not changed, its contents are assumed to be the same.
+    """
+    stat_result = os.stat(file_path)
+    return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino
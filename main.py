@@ -1,23 +1,229 @@
+import argparse
+from datetime import date
+
 import settings
 from banks.account_state_manager import PDFBankAccountStateManager
+from common.instrumentation import PipelineInstrumentation
+from common.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def watch(bank_account_state_manager: PDFBankAccountStateManager):
+    """
+    Keep watching the directories and process only the PDF files
+    that are created, modified or deleted (until Ctrl+C).
+    """
+    from pdf_utils.watcher import PdfDirectoryWatcher
+
+    pdf_directory_watcher = PdfDirectoryWatcher(
+        settings.get_directory_list_to_look_for_pdfs(),
+        poll_interval=settings.get_watch_poll_interval(),
+    )
+    pdf_directory_watcher.start()
+    try:
+        for pdf_file_path in pdf_directory_watcher.iter_changed_pdf_files():
+            try:
+                bank_account_state_manager.process_pdf_file_change(pdf_file_path)
+            except Exception as exc:
+                # e.g. a PDF file that is still being written
+                logger.error("Not possible to process the PDF file '%s': %s", pdf_file_path, exc)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pdf_directory_watcher.stop()
+
+
+def load_directories(
+    bank_account_state_manager: PDFBankAccountStateManager,
+    jobs: int,
+    add_to_output_project: bool,
+):
+    if settings.is_pipeline_enabled():
+        # with 'add_to_output_project', the files loaded are also renamed and copied into the output project
+        bank_account_state_manager.load_directories_with_pipeline(
+            directory_list=settings.get_directory_list_to_look_for_pdfs(),
+            jobs=jobs,
+            add_to_output_project=add_to_output_project,
+        )
+    else:
+        bank_account_state_manager.load_directories_to_search_for_pdfs(
+            directory_list=settings.get_directory_list_to_look_for_pdfs(),
+            jobs=jobs,
+        )
+
+
+def get_bank_account_state_manager_from_last_scan(args: argparse.Namespace) -> PDFBankAccountStateManager:
+    """
+    Get the manager with the bank accounts of the last scan (no PDF file is parsed).
+    """
+    bank_account_state_manager = PDFBankAccountStateManager()
+    bank_account_state_manager.load_bank_accounts_from_catalog(since=args.since, bank_name=args.bank)
+    return bank_account_state_manager
+
+
+def run_all(args: argparse.Namespace):
+    """
+    Scan, rename, list and build the output project (and keep watching with '--watch').
+    """
+    bank_account_state_manager = PDFBankAccountStateManager()
+    load_directories(bank_account_state_manager, get_jobs(args), add_to_output_project=True)
+
+    bank_account_state_manager.auto_rename_bank_accounts_loaded()
+    if settings.is_transactions_extraction_enabled():
+        bank_account_state_manager.extract_bank_accounts_transactions()
+    bank_account_state_manager.list_bank_accounts_loaded(
+        add_details=True,
+        order_by="date",
+    )
+    bank_account_state_manager.build_output_project(
+        start_clean=True,
+    )
+    PipelineInstrumentation().generate_run_summary()
+
+    if args.watch:
+        watch(bank_account_state_manager)
+
+
+def run_scan(args: argparse.Namespace):
+    bank_account_state_manager = PDFBankAccountStateManager()
+    if args.since is not None:
+        bank_account_state_manager.after_date_config = args.since
+    load_directories(bank_account_state_manager, get_jobs(args), add_to_output_project=False)
+    if settings.is_transactions_extraction_enabled():
+        bank_account_state_manager.extract_bank_accounts_transactions()
+    PipelineInstrumentation().generate_run_summary()
+
+
+def run_rename(args: argparse.Namespace):
+    bank_account_state_manager = get_bank_account_state_manager_from_last_scan(args)
+    bank_account_state_manager.auto_rename_bank_accounts_loaded(dry_run=args.dry_run)
+
+
+def run_list(args: argparse.Namespace):
+    bank_account_state_manager = get_bank_account_state_manager_from_last_scan(args)
+    bank_account_state_manager.list_bank_accounts_loaded(
+        add_details=True,
+        order_by="date",
+    )
+
+
+def run_build(args: argparse.Namespace):
+    bank_account_state_manager = get_bank_account_state_manager_from_last_scan(args)
+    bank_account_state_manager.build_output_project(
+        # with a filter, the files of the rest of the bank accounts are kept
+        start_clean=args.since is None and args.bank is None,
+        dry_run=args.dry_run,
+    )
+
+
+def run_report(args: argparse.Namespace):
+    bank_account_state_manager = get_bank_account_state_manager_from_last_scan(args)
+    print(f"Report: '{bank_account_state_manager.generate_report()}'")
+
+
+def print_cache_counts(title: str, cache_counts: dict[str, dict[str, int]]):
+    print(title)
+    for cache_name, counts in cache_counts.items():
+        print(f" - {cache_name}: " + ", ".join(f"{count_name}: {count}" for count_name, count in counts.items()))
+
+
+def run_cache_stats(args: argparse.Namespace):
+    print_cache_counts("Cache stats:", PDFBankAccountStateManager().get_cache_stats())
+
+
+def run_cache_prune(args: argparse.Namespace):
+    prune_counts = PDFBankAccountStateManager().prune_cache(dry_run=args.dry_run)
+    print_cache_counts("Cache entries to remove (dry-run):" if args.dry_run else "Cache entries removed:", prune_counts)
+
+
+def get_jobs(args: argparse.Namespace) -> int:
+    return getattr(args, "jobs", None) or settings.get_jobs()
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    # options shared by the commands
+    jobs_parser = argparse.ArgumentParser(add_help=False)
+    jobs_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=argparse.SUPPRESS,
+        help="worker processes used to parse the PDF files (default: 'jobs' in config.yaml)",
+    )
+    dry_run_parser = argparse.ArgumentParser(add_help=False)
+    dry_run_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only show what would be done",
+    )
+    filter_parser = argparse.ArgumentParser(add_help=False)
+    filter_parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        help="only the bank accounts whose period starts on/after the date (YYYY-MM-DD)",
+    )
+    filter_parser.add_argument(
+        "--bank",
+        help="only the bank accounts of the bank (name or short name, e.g. 'bbva')",
+    )
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Without a command: scan, rename, list and build the output project. "
+            "The commands run a single step, the ones after 'scan' from the state of the last scan "
+            "(no PDF file is parsed)."
+        ),
+        parents=[jobs_parser],
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after the first run, keep processing the new or modified PDF files",
+    )
+    parser.set_defaults(command_function=run_all)
+    subparsers = parser.add_subparsers(title="commands")
+
+    scan_parser = subparsers.add_parser(
+        "scan",
+        parents=[jobs_parser],
+        help="find and load the PDF files (and extract their transactions)",
+    )
+    scan_parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        help="only load the bank accounts whose period starts on/after the date "
+             "(YYYY-MM-DD, default: 'get_bank_accounts_after_date' in config.yaml)",
+    )
+    scan_parser.set_defaults(command_function=run_scan)
+    subparsers.add_parser(
+        "rename", parents=[dry_run_parser, filter_parser], help="rename the PDF files with readable names"
+    ).set_defaults(command_function=run_rename)
+    subparsers.add_parser(
+        "list", parents=[filter_parser], help="list the bank accounts loaded"
+    ).set_defaults(command_function=run_list)
+    subparsers.add_parser(
+        "build", parents=[dry_run_parser, filter_parser], help="sync the output project"
+    ).set_defaults(command_function=run_build)
+    subparsers.add_parser(
+        "report", parents=[filter_parser], help="write the JSON report of the bank accounts loaded"
+    ).set_defaults(command_function=run_report)
 
-DIR_LIST_TO_LOOK_FOR_PDFS = (
-    settings.get_directory_list_to_look_for_pdfs()
-)
+    cache_parser = subparsers.add_parser("cache", help="persisted state (run manifest, parse cache, transactions)")
+    cache_subparsers = cache_parser.add_subparsers(title="cache commands", required=True)
+    cache_subparsers.add_parser(
+        "stats", help="show the size of the persisted state"
+    ).set_defaults(command_function=run_cache_stats)
+    cache_subparsers.add_parser(
+        "prune", parents=[dry_run_parser], help="remove the state of the PDF files that don't exist anymore"
+    ).set_defaults(command_function=run_cache_prune)
+    return parser
 
 
-bank_account_state_manager = PDFBankAccountStateManager()
-bank_account_state_manager.load_directories_to_search_for_pdfs(
-    directory_list=DIR_LIST_TO_LOOK_FOR_PDFS,
-)
+def main():
+    args = get_argument_parser().parse_args()
+    args.command_function(args)
 
-bank_account_state_manager.auto_rename_bank_accounts_loaded()
-bank_account_state_manager.list_bank_accounts_loaded(
-    add_details=True,
-    order_by="date",
-)
-bank_account_state_manager.build_output_project(
-    start_clean=True,
-)
 
-a = 0
+# the guard keeps the process-pool workers from running the script again
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,136 @@
-import glob
+import fnmatch
 import os
+from typing import Iterator, Union
 
+from settings import get_pdf_files_search_configuration
 
-def get_pdf_files(directory: str) -> list[str]:
-    # Expand the tilde in the directory path
-    expanded_path = os.path.expanduser(directory)
 
-    # Use glob to get all PDF files in the specified directory
-    pdf_files = glob.glob(os.path.join(expanded_path, '*.pdf'))
+class PdfFileFinder:
+    """
+    Finds the PDF files of a list of directories (streaming 'os.scandir' walk).
+
+    - The directories are walked recursively, up to 'max_depth' levels of
+      sub-directories (0: only the directory itself, None: no limit).
+    - The '.pdf' extension is case-insensitive.
+    - 'include_patterns'/'exclude_patterns' are fnmatch patterns, matched
+      against the name and against the path relative to the searched
+      directory (e.g. '*estado*', '2023/*', '.*'). The exclude patterns also
+      prune the sub-directories.
+    - Each file (and directory) is only found once, even if the directories
+      overlap or are reached through symlinks: by (device, inode).
+    """
+
+    def __init__(
+        self,
+        max_depth: Union[int, None] = None,
+        include_patterns: list[str] = None,
+        exclude_patterns: list[str] = None,
+    ):
+        self.max_depth = max_depth
+        self.include_patterns = include_patterns or ["*"]
+        self.exclude_patterns = exclude_patterns or []
+
+    @classmethod
+    def from_settings(cls) -> "PdfFileFinder":
+        search_configuration = get_pdf_files_search_configuration()
+        return cls(
+            # not recursive unless it is configured
+            max_depth=search_configuration.get("max_depth", 0),
+            include_patterns=search_configuration.get("include_patterns"),
+            exclude_patterns=search_configuration.get("exclude_patterns"),
+        )
+
+    @staticmethod
+    def _matches_any_pattern(name: str, relative_path: str, patterns: list[str]) -> bool:
+        return any(
+            fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)
+            for pattern in patterns
+        )
+
+    def _is_excluded(self, name: str, relative_path: str) -> bool:
+        return self._matches_any_pattern(name, relative_path, self.exclude_patterns)
 
-    # Store absolute paths in a list
-    absolute_paths = [os.path.abspath(file) for file in pdf_files]
+    def _is_pdf_file_included(self, name: str, relative_path: str) -> bool:
+        return (
+            name.lower().endswith(".pdf")
+            and self._matches_any_pattern(name, relative_path, self.include_patterns)
+            and not self._is_excluded(name, relative_path)
+        )
 
-    return absolute_paths
+    def is_pdf_file_included(self, file_path: str, directory_list: list[str]) -> bool:
+        """
+        Check if the file would be found in one of the directories (e.g. for the watch mode events).
+        """
+        file_path = os.path.abspath(file_path)
+        for directory in directory_list:
+            directory = os.path.abspath(os.path.expanduser(directory))
+            relative_path = os.path.relpath(file_path, directory)
+            if relative_path.startswith(os.pardir):
+                continue
+            relative_parts = relative_path.split(os.sep)
+            depth = len(relative_parts) - 1
+            if self.max_depth is not None and depth > self.max_depth:
+                continue
+            if any(
+                self._is_excluded(dir_name, "/".join(relative_parts[:index + 1]))
+                for index, dir_name in enumerate(relative_parts[:-1])
+            ):
+                continue
+            if self._is_pdf_file_included(relative_parts[-1], "/".join(relative_parts)):
+                return True
+        return False
+
+    def iter_pdf_files(self, directory_list: list[str]) -> Iterator[str]:
+        """
+        Yield the absolute path of each PDF file as soon as it is found.
+        """
+        # (device, inode) of the files and directories already found
+        found_ids = set()
+        for directory in directory_list:
+            # Expand the tilde in the directory path
+            directory = os.path.abspath(os.path.expanduser(directory))
+            # [(directory path, path relative to the searched directory, depth)]
+            pending_dirs = [(directory, "", 0)]
+            while pending_dirs:
+                dir_path, dir_relative_path, depth = pending_dirs.pop()
+                try:
+                    dir_stat = os.stat(dir_path)
+                    dir_entries = os.scandir(dir_path)
+                except OSError:
+                    continue
+                if (dir_stat.st_dev, dir_stat.st_ino) in found_ids:
+                    dir_entries.close()
+                    continue
+                found_ids.add((dir_stat.st_dev, dir_stat.st_ino))
+
+                sub_dirs = []
+                with dir_entries:
+                    for dir_entry in dir_entries:
+                        relative_path = f"{dir_relative_path}{dir_entry.name}"
+                        try:
+                            if dir_entry.is_dir():
+                                if (
+                                    (self.max_depth is None or depth < self.max_depth)
+                                    and not self._is_excluded(dir_entry.name, relative_path)
+                                ):
+                                    sub_dirs.append(
+                                        (dir_entry.is_symlink(), dir_entry.path, f"{relative_path}/", depth + 1)
+                                    )
+                            elif self._is_pdf_file_included(dir_entry.name, relative_path):
+                                entry_stat = dir_entry.stat()
+                                if (entry_stat.st_dev, entry_stat.st_ino) not in found_ids:
+                                    found_ids.add((entry_stat.st_dev, entry_stat.st_ino))
+                                    yield dir_entry.path
+                        except OSError:
+                            # e.g. a broken symlink
+                            continue
+                # walked in the listing order, the symlinks after the real directories
+                sub_dirs.sort(key=lambda sub_dir: sub_dir[0])
+                pending_dirs.extend(sub_dir[1:] for sub_dir in reversed(sub_dirs))
+
+
+def get_pdf_files(directory: str) -> list[str]:
+    """
+    Get the absolute paths of the PDF files found in the directory (see PdfFileFinder).
+    """
+    return list(PdfFileFinder.from_settings().iter_pdf_files([directory]))
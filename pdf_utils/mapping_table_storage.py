@@ -0,0 +1,249 @@
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+
+from common.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MappingTableStorage(ABC):
+    """
+    Storage engine for the PdfParseManager mapping table:
+        {pdf_file_path: mapping_table_entry}
+    """
+
+    @abstractmethod
+    def load_mapping_table(self) -> dict[str, dict]:
+        pass
+
+    @abstractmethod
+    def save_mapping_table_entries(self, mapping_table_entries: dict[str, dict]):
+        """
+        Write the given entries in a single transaction.
+        """
+        pass
+
+    @abstractmethod
+    def delete_mapping_table_entries(self, pdf_file_paths: list[str]):
+        pass
+
+    @abstractmethod
+    def get_mapping_table_entries_by_pdf_file_hash(self, pdf_file_hash: str) -> dict[str, dict]:
+        pass
+
+    @abstractmethod
+    def get_mapping_table_entries_by_contents_hash(self, pdf_file_contents_hash: str) -> dict[str, dict]:
+        pass
+
+
+class JsonMappingTableStorage(MappingTableStorage):
+    """
+    Keeps the mapping table in a single JSON file, which is fully
+    re-written (atomically) on every save.
+    """
+
+    def __init__(self, json_file_path: str):
+        self.json_file_path = json_file_path
+        self.mapping_table = {}
+
+    def _write_json_file(self):
+        tmp_json_file_path = f"{self.json_file_path}.tmp"
+        with open(tmp_json_file_path, "w") as f_obj:
+            json.dump(self.mapping_table, f_obj, indent=4)
+        os.replace(tmp_json_file_path, self.json_file_path)
+
+    def load_mapping_table(self) -> dict[str, dict]:
+        if os.path.exists(self.json_file_path):
+            with open(self.json_file_path, "r") as f_obj:
+                self.mapping_table = json.load(f_obj)
+        else:
+            self._write_json_file()
+        return dict(self.mapping_table)
+
+    def save_mapping_table_entries(self, mapping_table_entries: dict[str, dict]):
+        self.mapping_table.update(mapping_table_entries)
+        self._write_json_file()
+
+    def delete_mapping_table_entries(self, pdf_file_paths: list[str]):
+        for pdf_file_path in pdf_file_paths:
+            self.mapping_table.pop(pdf_file_path, None)
+        self._write_json_file()
+
+    def _get_mapping_table_entries_by_field(self, field_name: str, field_value: str) -> dict[str, dict]:
+        return {
+            pdf_file_path: mapping_table_entry
+            for pdf_file_path, mapping_table_entry in self.mapping_table.items()
+            if mapping_table_entry.get(field_name) == field_value
+        }
+
+    def get_mapping_table_entries_by_pdf_file_hash(self, pdf_file_hash: str) -> dict[str, dict]:
+        return self._get_mapping_table_entries_by_field("pdf_file_hash", pdf_file_hash)
+
+    def get_mapping_table_entries_by_contents_hash(self, pdf_file_contents_hash: str) -> dict[str, dict]:
+        return self._get_mapping_table_entries_by_field("pdf_file_contents_hash", pdf_file_contents_hash)
+
+
+class SqliteMappingTableStorage(MappingTableStorage):
+    """
+    Keeps the mapping table in a SQLite database (WAL journal), indexed by
+    file hash and contents hash. Each save is a single transaction, so a
+    crash can only lose the batch being written, never the whole table.
+
+    The entries of an existing JSON mapping table are migrated on first use.
+
+    A connection is opened per operation (saves are batched, so this is cheap),
+    which keeps the storage safe to use from forked worker processes.
+    """
+
+    _COLUMNS = (
+        "pdf_file_path",
+        "pdf_file_hash",
+        "pdf_file_hash_algorithm",
+        "pdf_file_stat_signature",
+        "pdf_file_contents_hash",
+        "pdf_file_as_txt_file_path",
+        "is_image_pdf",
+    )
+
+    def __init__(self, db_file_path: str, json_file_path_to_migrate: str = None):
+        self.db_file_path = db_file_path
+        self.json_file_path_to_migrate = json_file_path_to_migrate
+        self._create_tables()
+        self._migrate_json_mapping_table()
+
+    @contextmanager
+    def _transaction(self):
+        with closing(sqlite3.connect(self.db_file_path)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                yield connection
+
+    def _create_tables(self):
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_mapping_table ("
+                " pdf_file_path TEXT PRIMARY KEY,"
+                " pdf_file_hash TEXT,"
+                " pdf_file_hash_algorithm TEXT,"
+                " pdf_file_stat_signature TEXT,"
+                " pdf_file_contents_hash TEXT,"
+                " pdf_file_as_txt_file_path TEXT,"
+                " is_image_pdf INTEGER"
+                ")"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pdf_mapping_table_pdf_file_hash "
+                "ON pdf_mapping_table (pdf_file_hash)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pdf_mapping_table_pdf_file_contents_hash "
+                "ON pdf_mapping_table (pdf_file_contents_hash)"
+            )
+
+    def _migrate_json_mapping_table(self):
+        if not self.json_file_path_to_migrate or not os.path.exists(self.json_file_path_to_migrate):
+            return
+        json_storage = JsonMappingTableStorage(self.json_file_path_to_migrate)
+        mapping_table = json_storage.load_mapping_table()
+        # keep the rows already in the database, they are newer
+        existing_pdf_file_paths = set(self._select_mapping_table_entries().keys())
+        self.save_mapping_table_entries({
+            pdf_file_path: mapping_table_entry
+            for pdf_file_path, mapping_table_entry in mapping_table.items()
+            if pdf_file_path not in existing_pdf_file_paths
+        })
+        os.replace(self.json_file_path_to_migrate, f"{self.json_file_path_to_migrate}.migrated")
+        logger.info(
+            "Migrated [%s] mapping table entries: '%s' -> '%s'",
+            len(mapping_table), self.json_file_path_to_migrate, self.db_file_path,
+        )
+
+    @classmethod
+    def _entry_to_row(cls, pdf_file_path: str, mapping_table_entry: dict) -> tuple:
+        stat_signature = mapping_table_entry.get("pdf_file_stat_signature")
+        is_image_pdf = mapping_table_entry.get("is_image_pdf")
+        return (
+            pdf_file_path,
+            mapping_table_entry.get("pdf_file_hash"),
+            mapping_table_entry.get("pdf_file_hash_algorithm"),
+            json.dumps(stat_signature) if stat_signature else None,
+            mapping_table_entry.get("pdf_file_contents_hash"),
+            mapping_table_entry.get("pdf_file_as_txt_file_path"),
+            None if is_image_pdf is None else int(is_image_pdf),
+        )
+
+    @classmethod
+    def _row_to_entry(cls, row: tuple) -> tuple[str, dict]:
+        mapping_table_entry = {}
+        for column_name, value in zip(cls._COLUMNS[1:], row[1:]):
+            # missing values are left out, so the entries written by older
+            # versions keep looking like older entries
+            if value is None:
+                continue
+            if column_name == "pdf_file_stat_signature":
+                value = json.loads(value)
+            elif column_name == "is_image_pdf":
+                value = bool(value)
+            mapping_table_entry[column_name] = value
+        return row[0], mapping_table_entry
+
+    def _select_mapping_table_entries(self, where_clause: str = "", parameters: tuple = ()) -> dict[str, dict]:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM pdf_mapping_table {where_clause}",
+                parameters,
+            )
+            return dict(self._row_to_entry(row) for row in cursor)
+
+    def load_mapping_table(self) -> dict[str, dict]:
+        return self._select_mapping_table_entries()
+
+    def save_mapping_table_entries(self, mapping_table_entries: dict[str, dict]):
+        if not mapping_table_entries:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO pdf_mapping_table ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                [
+                    self._entry_to_row(pdf_file_path, mapping_table_entry)
+                    for pdf_file_path, mapping_table_entry in mapping_table_entries.items()
+                ],
+            )
+
+    def delete_mapping_table_entries(self, pdf_file_paths: list[str]):
+        with self._transaction() as connection:
+            connection.executemany(
+                "DELETE FROM pdf_mapping_table WHERE pdf_file_path = ?",
+                [(pdf_file_path,) for pdf_file_path in pdf_file_paths],
+            )
+
+    def get_mapping_table_entries_by_pdf_file_hash(self, pdf_file_hash: str) -> dict[str, dict]:
+        return self._select_mapping_table_entries("WHERE pdf_file_hash = ?", (pdf_file_hash,))
+
+    def get_mapping_table_entries_by_contents_hash(self, pdf_file_contents_hash: str) -> dict[str, dict]:
+        return self._select_mapping_table_entries(
+            "WHERE pdf_file_contents_hash = ?", (pdf_file_contents_hash,)
+        )
+
+
+def get_mapping_table_storage(
+    storage_type: str,
+    parser_output_dir: str,
+) -> MappingTableStorage:
+    """
+    Get the mapping table storage engine for the given type ('sqlite' or 'json').
+    """
+    json_file_path = f"{parser_output_dir}/__PDF_MAPPING_TABLE.json"
+    if storage_type == "json":
+        return JsonMappingTableStorage(json_file_path)
+    elif storage_type == "sqlite":
+        return SqliteMappingTableStorage(
+            db_file_path=f"{parser_output_dir}/__PDF_MAPPING_TABLE.sqlite3",
+            json_file_path_to_migrate=json_file_path,
+        )
+    raise ValueError(f"Mapping table storage type not supported: '{storage_type}'")
@@ -1,92 +1,411 @@
-from pathlib import Path
-
-from pdf2image import convert_from_path
-from pdfminer.high_level import extract_text
-import fitz  # PyMuPDF
 import os
-import json
-import pytesseract
+from functools import lru_cache
+from typing import Callable, Iterator, Union
+
+from common.file_hash_registry import FileHashRegistry
+from common.instrumentation import PipelineInstrumentation
+from common.logging import get_logger
+from common.utils import get_file_stat_signature, singleton, get_hash_from_string, read_txt_file
+from pdf_utils.mapping_table_storage import MappingTableStorage, get_mapping_table_storage
+from pdf_utils.text_source import PdfTextSource
+from settings import get_tmp_dir, get_mapping_table_storage_type, get_ocr_batch_size, get_ocr_workers, \
+    get_ocr_dpi, is_ocr_grayscale_enabled, get_ocr_binarize_threshold, get_ocr_tesseract_lang, \
+    get_ocr_tesseract_psm, is_ocr_header_first_enabled, get_ocr_header_regions
 
-from common.utils import get_file_hash, singleton, get_hash_from_string, read_txt_file
-from settings import get_tmp_dir
+logger = get_logger(__name__)
+
+# tesseract language when the one of 'ocr.tesseract_lang' is not installed
+TESSERACT_FALLBACK_LANG = "eng"
 
 
 @singleton
 class PdfParseManager:
+    """
+    Parses PDF files into text and caches every extraction result
+    (text layer or OCR) in a mapping table, so each PDF is only parsed once.
+
+    The output directories and the mapping table are only set up
+    ('bootstrap') the first time a PDF file is looked up or added.
+    """
 
-    PARSER_OUTPUT_DIR = f"{get_tmp_dir()}/_PdfParseManager"
-    MAPPING_TABLE_FILE_PATH = f"{PARSER_OUTPUT_DIR}/__PDF_MAPPING_TABLE.json"
-    PDF_IMAGE_AS_TXT_FILES_DIR_PATH = f"{PARSER_OUTPUT_DIR}/pdf_image_as_txt_files"
+    PARSER_OUTPUT_DIR_NAME = "_PdfParseManager"
+    PDF_AS_TXT_FILES_DIR_NAME = "pdf_as_txt_files"
+
+    # entries written by older versions have no 'pdf_file_hash_algorithm'
+    LEGACY_HASH_ALGORITHM = "md5"
+    # max text-layer entries kept in memory before they are written
+    MAPPING_TABLE_SAVE_BATCH_SIZE = 500
 
     def __init__(self):
         self.mapping_table = {}
-        self.bootstrap()
+        self.mapping_table_storage = None  # type: MappingTableStorage
+        self.file_hash_registry = FileHashRegistry()
+        # reverse index of the mapping table:
+        #   {(pdf_file_hash_algorithm, pdf_file_hash): pdf_file_path}
+        self.pdf_file_hash_index = {}
+        # hash algorithms used in the index, other than the configured one:
+        #   {pdf_file_hash_algorithm: total_entries}
+        self.other_hash_algorithms_in_index = {}
+        # entries added since the last 'pop_new_mapping_table_entries' call
+        # (used to send worker process results back to the parent process)
+        self.new_mapping_table_entries = {}
+        # entries pending to be written to the mapping table storage
+        self.unsaved_mapping_table_entries = {}
+        self.auto_save_mapping_table = True
+        self.parser_output_dir = None  # type: str
+        self.pdf_as_txt_files_dir_path = None  # type: str
+        self.is_bootstrapped = False
 
     def _save_mapping_table(self):
-        with open(self.MAPPING_TABLE_FILE_PATH, "w") as f_obj:
-            json.dump(self.mapping_table, f_obj, indent=4)
+        self.mapping_table_storage.save_mapping_table_entries(
+            self.unsaved_mapping_table_entries
+        )
+        self.unsaved_mapping_table_entries = {}
+
+    def save_mapping_table(self):
+        """
+        Save the mapping table if there are entries pending to be written.
+        """
+        if self.unsaved_mapping_table_entries:
+            self._save_mapping_table()
 
     def bootstrap(self):
-        os.makedirs(self.PARSER_OUTPUT_DIR, exist_ok=True)
-        os.makedirs(self.PDF_IMAGE_AS_TXT_FILES_DIR_PATH, exist_ok=True)
+        if self.is_bootstrapped:
+            return
+        self.parser_output_dir = f"{get_tmp_dir()}/{self.PARSER_OUTPUT_DIR_NAME}"
+        self.pdf_as_txt_files_dir_path = f"{self.parser_output_dir}/{self.PDF_AS_TXT_FILES_DIR_NAME}"
+        os.makedirs(self.parser_output_dir, exist_ok=True)
+        os.makedirs(self.pdf_as_txt_files_dir_path, exist_ok=True)
         self.load_pdf_mapping_table()
+        self.is_bootstrapped = True
 
     def load_pdf_mapping_table(self):
-        if os.path.exists(self.MAPPING_TABLE_FILE_PATH):
-            with open(self.MAPPING_TABLE_FILE_PATH, "r") as f_obj:
-                self.mapping_table = json.load(f_obj)
-        else:
-            with open(self.MAPPING_TABLE_FILE_PATH, "w") as f_obj:
-                f_obj.write("{}")
+        self.mapping_table_storage = get_mapping_table_storage(
+            storage_type=get_mapping_table_storage_type(),
+            parser_output_dir=self.parser_output_dir,
+        )
+        self.mapping_table = self.mapping_table_storage.load_mapping_table()
+        self._build_pdf_file_hash_index()
+
+    def _build_pdf_file_hash_index(self):
+        self.pdf_file_hash_index = {}
+        self.other_hash_algorithms_in_index = {}
+        for pdf_file_path_key, pdf_file_mapping_data in self.mapping_table.items():
+            self._add_to_pdf_file_hash_index(pdf_file_path_key, pdf_file_mapping_data)
+
+    def _add_to_pdf_file_hash_index(self, pdf_file_path: str, mapping_table_entry: dict):
+        pdf_file_hash = mapping_table_entry.get("pdf_file_hash")
+        if not pdf_file_hash:
+            return
+        algorithm = mapping_table_entry.get("pdf_file_hash_algorithm", self.LEGACY_HASH_ALGORITHM)
+        index_key = (algorithm, pdf_file_hash)
+        if algorithm != self.file_hash_registry.algorithm:
+            if index_key not in self.pdf_file_hash_index:
+                self.other_hash_algorithms_in_index[algorithm] = (
+                    self.other_hash_algorithms_in_index.get(algorithm, 0) + 1
+                )
+            self.pdf_file_hash_index[index_key] = pdf_file_path
+            return
+        self.pdf_file_hash_index[index_key] = pdf_file_path
+        # let the unchanged files skip the hashing process
+        stat_signature = mapping_table_entry.get("pdf_file_stat_signature")
+        if stat_signature:
+            self.file_hash_registry.add_file_hash(pdf_file_path, stat_signature, pdf_file_hash)
 
-    def add_pdf_image_to_mapping_table(self, pdf_file_path: str, pdf_file_contents: str):
-        pdf_file_hash = get_file_hash(pdf_file_path)
+    def _remove_from_pdf_file_hash_index(self, algorithm: str, pdf_file_hash: str):
+        del self.pdf_file_hash_index[(algorithm, pdf_file_hash)]
+        if algorithm in self.other_hash_algorithms_in_index:
+            self.other_hash_algorithms_in_index[algorithm] -= 1
+            if not self.other_hash_algorithms_in_index[algorithm]:
+                del self.other_hash_algorithms_in_index[algorithm]
+
+    def _set_mapping_table_entry(self, pdf_file_path: str, mapping_table_entry: dict):
+        self.mapping_table[pdf_file_path] = mapping_table_entry
+        self._add_to_pdf_file_hash_index(pdf_file_path, mapping_table_entry)
+        self.new_mapping_table_entries[pdf_file_path] = mapping_table_entry
+        self.unsaved_mapping_table_entries[pdf_file_path] = mapping_table_entry
+
+    def _get_pdf_file_hash_data(self, pdf_file_path: str, pdf_file_hash: str) -> dict:
+        return {
+            "pdf_file_hash": pdf_file_hash,
+            "pdf_file_hash_algorithm": self.file_hash_registry.algorithm,
+            "pdf_file_stat_signature": list(get_file_stat_signature(pdf_file_path)),
+        }
+
+    def add_pdf_to_mapping_table(
+        self,
+        pdf_file_path: str,
+        pdf_file_contents: str,
+        is_image_pdf: bool = False,
+    ):
+        self.bootstrap()
+        pdf_file_hash = self.file_hash_registry.get_file_hash(pdf_file_path)
         pdf_file_contents_hash = get_hash_from_string(pdf_file_contents)
-        pdf_file_basename = Path(pdf_file_path).stem
-        pdf_file_as_txt_file_path = f"{self.PDF_IMAGE_AS_TXT_FILES_DIR_PATH}/{pdf_file_basename}.txt"
-        with open(pdf_file_as_txt_file_path, "w") as f_obj:
+        pdf_file_as_txt_file_path = f"{self.pdf_as_txt_files_dir_path}/{pdf_file_hash}.txt"
+        # 'newline=""' keeps the text exactly as extracted (no '\r' translation)
+        with open(pdf_file_as_txt_file_path, "w", newline="") as f_obj:
             f_obj.write(pdf_file_contents)
-        self.mapping_table[pdf_file_path] = {
-            "pdf_file_hash": pdf_file_hash,
+        mapping_table_entry = {
+            **self._get_pdf_file_hash_data(pdf_file_path, pdf_file_hash),
             "pdf_file_contents_hash": pdf_file_contents_hash,
             "pdf_file_as_txt_file_path": pdf_file_as_txt_file_path,
+            "is_image_pdf": is_image_pdf,
         }
-        self._save_mapping_table()
+        self._set_mapping_table_entry(pdf_file_path, mapping_table_entry)
+        # OCR results are expensive to re-compute, so they are saved right away.
+        # Text layer results are saved in batches.
+        if self.auto_save_mapping_table and (
+            is_image_pdf
+            or len(self.unsaved_mapping_table_entries) >= self.MAPPING_TABLE_SAVE_BATCH_SIZE
+        ):
+            self._save_mapping_table()
 
-    def get_pdf_contents_from_mapping_table(self, pdf_file_path: str):
-        pdf_file_hash = get_file_hash(pdf_file_path)
-        for pdf_file_path_key, pdf_file_mapping_data in self.mapping_table.items():
-            mapping_pdf_file_hash = pdf_file_mapping_data.get("pdf_file_hash")
-            if pdf_file_hash == mapping_pdf_file_hash:
-                return read_txt_file(pdf_file_mapping_data.get("pdf_file_as_txt_file_path"))
+    def _add_pdf_text_layer_to_mapping_table(self, pdf_file_path: str, pdf_file_contents: str):
+        # an empty text layer is not final: the PDF file is OCR'd next,
+        # and the OCR result is the one added (if the OCR doesn't fail)
+        if pdf_file_contents:
+            self.add_pdf_to_mapping_table(pdf_file_path, pdf_file_contents)
+
+    def pop_new_mapping_table_entries(self) -> dict:
+        new_mapping_table_entries = self.new_mapping_table_entries
+        self.new_mapping_table_entries = {}
+        return new_mapping_table_entries
+
+    def merge_mapping_table_entries(self, mapping_table_entries: dict):
+        """
+        Merge the entries created by another process into the mapping table.
+        """
+        if not mapping_table_entries:
+            return
+        self.bootstrap()
+        for pdf_file_path, mapping_table_entry in mapping_table_entries.items():
+            self.mapping_table[pdf_file_path] = mapping_table_entry
+            self._add_to_pdf_file_hash_index(pdf_file_path, mapping_table_entry)
+            self.unsaved_mapping_table_entries[pdf_file_path] = mapping_table_entry
+        if len(self.unsaved_mapping_table_entries) >= self.MAPPING_TABLE_SAVE_BATCH_SIZE:
+            self._save_mapping_table()
+
+    def rename_pdf_file(self, pdf_file_path: str, new_pdf_file_path: str):
+        """
+        Move the mapping table entry of a PDF file renamed by the program
+        (same bytes, so the entry is still valid for the new path).
+        """
+        self.bootstrap()
+        mapping_table_entry = self.mapping_table.pop(pdf_file_path, None)
+        if mapping_table_entry is None:
+            return
+        self.unsaved_mapping_table_entries.pop(pdf_file_path, None)
+        self.new_mapping_table_entries.pop(pdf_file_path, None)
+        self.mapping_table_storage.delete_mapping_table_entries([pdf_file_path])
+        if mapping_table_entry.get("pdf_file_stat_signature"):
+            mapping_table_entry = {
+                **mapping_table_entry,
+                "pdf_file_stat_signature": list(get_file_stat_signature(new_pdf_file_path)),
+            }
+        self._set_mapping_table_entry(new_pdf_file_path, mapping_table_entry)
+
+    def get_cache_stats(self) -> dict[str, int]:
+        """
+        Get the number of entries of the mapping table and the size of the cached text files.
+        """
+        self.bootstrap()
+        txt_file_paths = [entry.path for entry in os.scandir(self.pdf_as_txt_files_dir_path) if entry.is_file()]
+        return {
+            "entries": len(self.mapping_table),
+            "image_pdf_entries": sum(
+                1 for mapping_table_entry in self.mapping_table.values() if mapping_table_entry.get("is_image_pdf")
+            ),
+            "txt_files": len(txt_file_paths),
+            "txt_files_size_in_bytes": sum(os.path.getsize(txt_file_path) for txt_file_path in txt_file_paths),
+        }
+
+    def prune_mapping_table(self, dry_run: bool = False) -> dict[str, int]:
+        """
+        Remove the entries of the PDF files that don't exist anymore, and the
+        text files that no entry uses. Get how many of each were (or would be) removed.
+
+        NOTE: the text of a file moved/renamed outside the program is found by
+        its hash only while the entry of its previous path exists.
+        """
+        self.bootstrap()
+        self.save_mapping_table()
+        pdf_file_paths_to_remove = [
+            pdf_file_path for pdf_file_path in self.mapping_table if not os.path.exists(pdf_file_path)
+        ]
+        txt_file_paths_in_use = {
+            os.path.abspath(mapping_table_entry.get("pdf_file_as_txt_file_path") or "")
+            for pdf_file_path, mapping_table_entry in self.mapping_table.items()
+            if os.path.exists(pdf_file_path)
+        }
+        txt_file_paths_to_remove = [
+            entry.path for entry in os.scandir(self.pdf_as_txt_files_dir_path)
+            if entry.is_file() and os.path.abspath(entry.path) not in txt_file_paths_in_use
+        ]
+        if not dry_run:
+            self.mapping_table_storage.delete_mapping_table_entries(pdf_file_paths_to_remove)
+            for pdf_file_path in pdf_file_paths_to_remove:
+                del self.mapping_table[pdf_file_path]
+            self._build_pdf_file_hash_index()
+            for txt_file_path in txt_file_paths_to_remove:
+                os.remove(txt_file_path)
+        return {
+            "entries": len(pdf_file_paths_to_remove),
+            "txt_files": len(txt_file_paths_to_remove),
+        }
+
+    def get_mapping_table_entry(self, pdf_file_path: str) -> dict | None:
+        """
+        Find the mapping table entry of a PDF file by its file hash.
+
+        The hash comes from the FileHashRegistry, so an unchanged file is not
+        read at all. Entries found through a different path (renamed/copied
+        files) or an older hash algorithm are updated for the current file,
+        so the next run takes the fast path.
+        """
+        self.bootstrap()
+        algorithm = self.file_hash_registry.algorithm
+        pdf_file_hash = self.file_hash_registry.get_cached_file_hash(pdf_file_path)
+        if pdf_file_hash is not None:
+            pdf_file_path_key = self.pdf_file_hash_index.get((algorithm, pdf_file_hash))
+            if pdf_file_path_key == pdf_file_path:
+                return self.mapping_table[pdf_file_path_key]
+            file_hashes = {algorithm: pdf_file_hash}
+        else:
+            # compute all the algorithms still used in the index in a single read
+            file_hashes = self.file_hash_registry.get_file_hashes(
+                pdf_file_path,
+                (algorithm, *sorted(self.other_hash_algorithms_in_index)),
+            )
+            pdf_file_hash = file_hashes[algorithm]
+
+        for file_hash_algorithm, file_hash in file_hashes.items():
+            pdf_file_path_key = self.pdf_file_hash_index.get((file_hash_algorithm, file_hash))
+            if pdf_file_path_key is None:
+                continue
+            pdf_file_mapping_data = self.mapping_table[pdf_file_path_key]
+            pdf_file_hash_data = self._get_pdf_file_hash_data(pdf_file_path, pdf_file_hash)
+            if file_hash_algorithm != algorithm:
+                self._remove_from_pdf_file_hash_index(file_hash_algorithm, file_hash)
+                if pdf_file_path_key != pdf_file_path:
+                    # same bytes, so the old entry can be upgraded to the current algorithm too
+                    self._set_mapping_table_entry(
+                        pdf_file_path_key,
+                        {
+                            **pdf_file_mapping_data,
+                            "pdf_file_hash": pdf_file_hash,
+                            "pdf_file_hash_algorithm": algorithm,
+                            "pdf_file_stat_signature": None,
+                        },
+                    )
+            pdf_file_mapping_data = {**pdf_file_mapping_data, **pdf_file_hash_data}
+            self._set_mapping_table_entry(pdf_file_path, pdf_file_mapping_data)
+            return pdf_file_mapping_data
         return None
 
-    def parse_pdf_file(self, pdf_file_path: str) -> tuple[str, bool]:
+    def get_pdf_contents_from_mapping_table(self, pdf_file_path: str) -> tuple[str, bool] | None:
         """
-        Parse a PDF file and return its contents as text.
+        Get the cached (contents, is_image_pdf) of a PDF file, looked up by its file hash.
+        """
+        pdf_file_mapping_data = self.get_mapping_table_entry(pdf_file_path)
+        if pdf_file_mapping_data is None:
+            return None
+        pdf_file_as_txt_file_path = pdf_file_mapping_data.get("pdf_file_as_txt_file_path")
+        if not os.path.exists(pdf_file_as_txt_file_path):
+            return None
+        # entries without the flag come from older versions,
+        # which only cached the OCR results
+        is_image_pdf = pdf_file_mapping_data.get("is_image_pdf", True)
+        return read_txt_file(pdf_file_as_txt_file_path, newline=""), is_image_pdf
+
+    def get_pdf_text_source(
+        self,
+        pdf_file_path: str,
+        header_text_validator: Callable[[str, str], bool] = None,
+    ) -> tuple[PdfTextSource, bool]:
+        """
+        Get the lazy text source of a PDF file and whether it is an image PDF.
+
+        The text layer is extracted one page at a time, as the consumers need
+        it; it is added to the mapping table once the whole text was loaded.
+
+        An image PDF is OCR'd header first ('ocr.header_first'): when
+        'header_text_validator(bank_name, header_text)' accepts the text of
+        the header region of a bank, the text source is partial (the header
+        text, see PdfTextSource): the full pages are only OCR'd (and added to
+        the mapping table) when the rest of the document is needed.
         """
-        is_image_pdf = False
         # Check if the file is already in the mapping table
         # (to avoid re-processing the same file)
+        instrumentation = PipelineInstrumentation()
         pdf_contents_from_mapping_table = self.get_pdf_contents_from_mapping_table(pdf_file_path)
-        if pdf_contents_from_mapping_table:
-            is_image_pdf = True
-            return pdf_contents_from_mapping_table, is_image_pdf
+        if pdf_contents_from_mapping_table is not None:
+            instrumentation.count("parse_cache.hit")
+            pdf_file_contents, is_image_pdf = pdf_contents_from_mapping_table
+            return PdfTextSource.from_text(pdf_file_contents), is_image_pdf
+        instrumentation.count("parse_cache.miss")
 
         # Parse the PDF file
-        pdf_file_contents = parse_pdf_with_pymupdf(pdf_file_path)
+        # (the pages are extracted lazily, the time of each page is added to the stage)
+        pdf_text_source = PdfTextSource(
+            pages_iterator=_iter_instrumented(
+                iter_pdf_pages_with_pymupdf(pdf_file_path), "pymupdf_extraction", pdf_file_path
+            ),
+            on_fully_loaded=lambda text: self._add_pdf_text_layer_to_mapping_table(pdf_file_path, text),
+        )
+        if pdf_text_source.has_text():
+            return pdf_text_source, False
+
         # if the text is empty, try to parse it as an image
-        if not pdf_file_contents:
-            print(
-                f"[!] PDF file contents are empty. "
-                f"Trying OCR to extract text: '{pdf_file_path}'"
-            )
-            # parse the pdf as an image
+        logger.warning("PDF file contents are empty. Trying OCR to extract text: '%s'", pdf_file_path)
+        # parse the pdf as an image
+        if header_text_validator is not None and is_ocr_header_first_enabled():
+            pdf_header_contents = self.get_pdf_header_contents_with_ocr(pdf_file_path, header_text_validator)
+            if pdf_header_contents is not None:
+                # the header text is not the contents of the PDF file (it is not added to the mapping table)
+                return PdfTextSource(
+                    text=pdf_header_contents,
+                    full_text_loader=lambda: self._parse_pdf_file_with_ocr(pdf_file_path),
+                ), True
+        return PdfTextSource.from_text(self._parse_pdf_file_with_ocr(pdf_file_path)), True
+
+    def _parse_pdf_file_with_ocr(self, pdf_file_path: str) -> str:
+        with PipelineInstrumentation().stage("ocr", pdf_file_path):
             pdf_file_contents = parse_pdf_with_pdf2image(pdf_file_path)
-            # add the parsed text to the mapping table
-            self.add_pdf_image_to_mapping_table(pdf_file_path, pdf_file_contents)
-            is_image_pdf = True
-        return pdf_file_contents, is_image_pdf
+        # add the parsed text to the mapping table
+        self.add_pdf_to_mapping_table(pdf_file_path, pdf_file_contents, is_image_pdf=True)
+        return pdf_file_contents
+
+    def get_pdf_header_contents_with_ocr(
+        self,
+        pdf_file_path: str,
+        header_text_validator: Callable[[str, str], bool],
+    ) -> Union[str, None]:
+        """
+        OCR the header regions ('ocr.header_regions') of the first page, until
+        the text of one of them is accepted (None if none of them is enough).
+        """
+        instrumentation = PipelineInstrumentation()
+        # {header region: text}, the banks with the same region share its OCR
+        header_texts = {}
+        for bank_name, header_region in get_ocr_header_regions().items():
+            header_region = tuple(header_region)
+            if header_region not in header_texts:
+                with instrumentation.stage("ocr_header", pdf_file_path):
+                    header_texts[header_region] = parse_pdf_header_with_ocr(pdf_file_path, header_region)
+            if header_text_validator(bank_name, header_texts[header_region]):
+                instrumentation.count("ocr.header_accepted")
+                return header_texts[header_region]
+        instrumentation.count("ocr.header_rejected")
+        logger.info("The header of the PDF file is not enough, running the OCR of all the pages: '%s'", pdf_file_path)
+        return None
+
+    def parse_pdf_file(self, pdf_file_path: str) -> tuple[str, bool]:
+        """
+        Parse a PDF file and return its contents as text.
+        """
+        with PipelineInstrumentation().stage("parse_pdf_file", pdf_file_path):
+            pdf_text_source, is_image_pdf = self.get_pdf_text_source(pdf_file_path)
+            return pdf_text_source.get_full_text(), is_image_pdf
 
 
 def get_pdf_file_contents(pdf_filepath: str):
@@ -97,31 +416,180 @@ def get_pdf_file_contents(pdf_filepath: str):
 
 
 def parse_pdf_with_pdfminer(pdf_path):
+    from pdfminer.high_level import extract_text
+
     text = extract_text(pdf_path)
     return text
 
 
+def iter_pdf_pages_with_pymupdf(pdf_path: str) -> Iterator[str]:
+    """
+    Yield the text of the PDF file one page at a time.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(doc.page_count):
+            yield doc[page_num].get_text()
+    finally:
+        doc.close()
+
+
+def _iter_instrumented(iterator: Iterator[str], stage_name: str, file_path: str) -> Iterator[str]:
+    """
+    Yield the values of the iterator, recording the time of each 'next' call as the stage.
+    """
+    instrumentation = PipelineInstrumentation()
+    while True:
+        with instrumentation.stage(stage_name, file_path):
+            value = next(iterator, None)
+        if value is None:
+            return
+        yield value
+
+
 def parse_pdf_with_pymupdf(pdf_path: str):
+    return "".join(iter_pdf_pages_with_pymupdf(pdf_path))
+
+
+def preprocess_ocr_image(image, grayscale: bool = None, binarize_threshold: int = None):
+    """
+    Prepare a page image (PIL) for tesseract: grayscale and binarisation
+    ('ocr.grayscale', 'ocr.binarize_threshold').
+    """
+    grayscale = is_ocr_grayscale_enabled() if grayscale is None else grayscale
+    binarize_threshold = get_ocr_binarize_threshold() if binarize_threshold is None else binarize_threshold
+    if (grayscale or binarize_threshold) and image.mode != "L":
+        image = image.convert("L")
+    if binarize_threshold:
+        image = image.point(lambda pixel_value: 255 if pixel_value > binarize_threshold else 0)
+    return image
+
+
+@lru_cache(maxsize=None)
+def get_tesseract_lang(tesseract_lang: Union[str, None]) -> Union[str, None]:
+    """
+    Get the tesseract language to OCR with: 'tesseract_lang' (e.g. 'spa',
+    'spa+eng'), or 'eng' when its language data is not installed (checked
+    once, before the first OCR).
+    """
+    import pytesseract
+
+    if not tesseract_lang:
+        return tesseract_lang
+    try:
+        installed_langs = set(pytesseract.get_languages(config=""))
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError):
+        # the OCR itself reports the error
+        return tesseract_lang
+    missing_langs = [lang for lang in tesseract_lang.split("+") if lang not in installed_langs]
+    if missing_langs:
+        fallback_tesseract_lang = TESSERACT_FALLBACK_LANG if TESSERACT_FALLBACK_LANG in installed_langs else None
+        logger.warning(
+            "The tesseract language data is not installed: [%s] ('ocr.tesseract_lang'), using instead: %s",
+            ", ".join(missing_langs),
+            f"'{fallback_tesseract_lang}'" if fallback_tesseract_lang else "the default language of tesseract",
+        )
+        return fallback_tesseract_lang
+    return tesseract_lang
+
+
+def ocr_image(image) -> str:
+    """
+    OCR a page image with the tesseract settings ('ocr.tesseract_lang', 'ocr.tesseract_psm').
+    """
+    import pytesseract
+
+    tesseract_psm = get_ocr_tesseract_psm()
+    return pytesseract.image_to_string(
+        preprocess_ocr_image(image),
+        lang=get_tesseract_lang(get_ocr_tesseract_lang()),
+        config=f"--psm {tesseract_psm}" if tesseract_psm is not None else "",
+    )
+
+
+def render_pdf_page_region(pdf_path: str, region: tuple, page_number: int = 0, dpi: int = None):
+    """
+    Render only a region of a page of the PDF file as an image (PIL).
+
+    The region is [left, top, right, bottom], as fractions of the size of the
+    page; the pixels outside of it are not rendered (PyMuPDF 'clip').
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    dpi = dpi or get_ocr_dpi()
+    left, top, right, bottom = region
     doc = fitz.open(pdf_path)
-    text = ""
+    try:
+        page_rect = doc[page_number].rect
+        clip = fitz.Rect(
+            page_rect.x0 + left * page_rect.width,
+            page_rect.y0 + top * page_rect.height,
+            page_rect.x0 + right * page_rect.width,
+            page_rect.y0 + bottom * page_rect.height,
+        )
+        is_grayscale = is_ocr_grayscale_enabled()
+        pixmap = doc[page_number].get_pixmap(
+            dpi=dpi,
+            clip=clip,
+            colorspace=fitz.csGRAY if is_grayscale else fitz.csRGB,
+            alpha=False,
+        )
+    finally:
+        doc.close()
+    return Image.frombytes("L" if is_grayscale else "RGB", (pixmap.width, pixmap.height), pixmap.samples)
 
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        text += page.get_text()
 
-    doc.close()
-    return text
+def parse_pdf_header_with_ocr(pdf_path: str, header_region: tuple) -> str:
+    """
+    OCR only the header region of the first page of a PDF file.
+    """
+    logger.info("Running OCR parsing process of the header...")
+    return ocr_image(render_pdf_page_region(pdf_path, header_region))
 
 
-def parse_pdf_with_pdf2image(pdf_path: str):
-    # Convert PDF to images
-    print("Running OCR parsing process...")
-    images = convert_from_path(pdf_path)
-    text = ""
-    for image in images:
-        text += pytesseract.image_to_string(image)
+def parse_pdf_with_pdf2image(pdf_path: str, batch_size: int = None, workers: int = None):
+    """
+    OCR a PDF file page by page.
 
-    return text
+    The pages are rendered in batches of 'batch_size' and OCR'd on a pool of
+    'workers' threads (tesseract runs as a subprocess, so the threads run in
+    parallel). The next batch is rendered while the current one is OCR'd, so
+    at most two batches of page images are held in memory at once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pdf2image import convert_from_path, pdfinfo_from_path
+
+    batch_size = batch_size or get_ocr_batch_size()
+    workers = workers or get_ocr_workers()
+
+    logger.info("Running OCR parsing process...")
+    total_pages = pdfinfo_from_path(pdf_path)["Pages"]
+    pages_text = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending_ocr_futures = []
+        for first_page in range(1, total_pages + 1, batch_size):
+            # Convert the PDF pages of this batch to images
+            images = convert_from_path(
+                pdf_path,
+                dpi=get_ocr_dpi(),
+                grayscale=is_ocr_grayscale_enabled(),
+                first_page=first_page,
+                last_page=min(first_page + batch_size - 1, total_pages),
+            )
+            ocr_futures = [
+                executor.submit(ocr_image, image)
+                for image in images
+            ]
+            # collect the previous batch (in page order) while this one runs
+            pages_text.extend(ocr_future.result() for ocr_future in pending_ocr_futures)
+            pending_ocr_futures = ocr_futures
+        pages_text.extend(ocr_future.result() for ocr_future in pending_ocr_futures)
+
+    return "".join(pages_text)
 
 
 def get_pdf_file_size(pdf_file_path) -> int:
@@ -130,4 +598,4 @@ def get_pdf_file_size(pdf_file_path) -> int:
         size_bytes = os.path.getsize(pdf_file_path)
         return size_bytes
     except FileNotFoundError:
-        print(f"File not found: {pdf_file_path}")
+        logger.error("File not found: %s", pdf_file_path)
@@ -0,0 +1,259 @@
+import bisect
+import re
+from typing import Callable, Iterator, Union
+
+
+class PdfTextSource:
+    """
+    Lazy text of a PDF file, loaded one page at a time.
+
+    The consumers (bank classifier, field extraction) pull pages only until
+    they decide, so a PDF file that is not a bank account state is rejected
+    without extracting all its pages. A bank account state only loads the
+    rest of its pages when they are needed (e.g. its transactions): the whole
+    text is then extracted once, and cached by the PdfParseManager.
+
+    The pages are kept in a list, with the running end position and line
+    count of each one: the text is only joined on demand, and the consumers
+    can ask for the text added since a position (see 'get_loaded_text').
+
+    A partial text source (e.g. the OCR of the header region of an image PDF
+    file) only has the text the consumers scan: its full text is loaded with
+    'full_text_loader' the first time it is needed ('get_full_text',
+    'iter_new_text').
+    """
+
+    def __init__(
+        self,
+        pages_iterator: Iterator[str] = None,
+        text: str = None,
+        on_fully_loaded: Callable[[str], None] = None,
+        full_text_loader: Callable[[], str] = None,
+    ):
+        self._pages_iterator = pages_iterator
+        self._pages = []  # type: list[str]
+        # running totals, one per page: end position and number of newlines
+        self._page_end_positions = []  # type: list[int]
+        self._page_end_line_counts = []  # type: list[int]
+        # text joined so far (None if pages were loaded since the last join)
+        self._joined_text = ""  # type: Union[str, None]
+        self._is_fully_loaded = pages_iterator is None
+        self._on_fully_loaded = on_fully_loaded
+        self._full_text_loader = full_text_loader
+        if text:
+            self._add_page(text)
+
+    @classmethod
+    def from_text(cls, text: str) -> "PdfTextSource":
+        return cls(text=text)
+
+    def __getstate__(self):
+        # the pages iterator can't be pickled (e.g. process pool results)
+        full_text = self.get_full_text()
+        state = self.__dict__.copy()
+        state["_on_fully_loaded"] = None
+        state["_full_text_loader"] = None
+        # a single page, pickled once
+        state["_pages"] = [full_text] if full_text else []
+        state["_page_end_positions"] = [len(full_text)] if full_text else []
+        state["_page_end_line_counts"] = [full_text.count("\n")] if full_text else []
+        state["_joined_text"] = None
+        return state
+
+    def _add_page(self, page_text: str):
+        self._pages.append(page_text)
+        self._page_end_positions.append(self.get_loaded_length() + len(page_text))
+        self._page_end_line_counts.append(self.get_loaded_line_count() + page_text.count("\n"))
+        self._joined_text = None
+
+    def is_partial(self) -> bool:
+        """
+        Check if the text is only a part of the document (its full text is not loaded yet).
+        """
+        return self._full_text_loader is not None
+
+    def _load_full_text(self):
+        full_text = self._full_text_loader()
+        self._full_text_loader = None
+        self._pages = []
+        self._page_end_positions = []
+        self._page_end_line_counts = []
+        if full_text:
+            self._add_page(full_text)
+
+    def is_fully_loaded(self) -> bool:
+        return self._is_fully_loaded
+
+    def get_total_pages_loaded(self) -> int:
+        return len(self._pages)
+
+    def get_loaded_length(self) -> int:
+        return self._page_end_positions[-1] if self._page_end_positions else 0
+
+    def get_loaded_line_count(self) -> int:
+        """
+        Number of newlines of the text loaded so far.
+        """
+        return self._page_end_line_counts[-1] if self._page_end_line_counts else 0
+
+    def load_next_page(self) -> bool:
+        """
+        Load the next page of the document. Returns False if there are no more pages.
+        """
+        if self._is_fully_loaded:
+            return False
+        page_text = next(self._pages_iterator, None)
+        if page_text is None:
+            self._is_fully_loaded = True
+            self._pages_iterator = None
+            if self._on_fully_loaded is not None:
+                self._on_fully_loaded(self._get_joined_text())
+                self._on_fully_loaded = None
+            return False
+        if page_text:
+            self._add_page(page_text)
+        return True
+
+    def _get_joined_text(self) -> str:
+        if self._joined_text is None:
+            self._joined_text = "".join(self._pages)
+            # the joined text replaces the pages (the next joins only add the new pages)
+            self._pages = [self._joined_text] if self._joined_text else []
+            self._page_end_positions = self._page_end_positions[-1:]
+            self._page_end_line_counts = self._page_end_line_counts[-1:]
+        return self._joined_text
+
+    def _get_max_lines_position(self, max_lines: int) -> Union[int, None]:
+        """
+        Get the end position of the first 'max_lines' lines (None if they are not loaded yet).
+        """
+        # the 'max_lines' line is only complete once a newline follows it
+        if self.get_loaded_line_count() < max_lines:
+            return None
+        page_index = bisect.bisect_left(self._page_end_line_counts, max_lines)
+        page_start_position = self._page_end_positions[page_index - 1] if page_index else 0
+        page_start_line_count = self._page_end_line_counts[page_index - 1] if page_index else 0
+        position = -1
+        for _ in range(max_lines - page_start_line_count):
+            position = self._pages[page_index].index("\n", position + 1)
+        return page_start_position + position
+
+    def is_loaded(self, max_lines: int = None) -> bool:
+        """
+        Check if the document (or its first 'max_lines' lines) is fully loaded.
+        """
+        return self._is_fully_loaded or (
+            max_lines is not None and self.get_loaded_line_count() >= max_lines
+        )
+
+    def get_loaded_text(self, max_lines: int = None, start_position: int = 0) -> str:
+        """
+        Get the text loaded so far, limited to its first 'max_lines' lines,
+        from 'start_position' (only the pages from that position are joined).
+        """
+        end_position = self.get_loaded_length()
+        if max_lines is not None:
+            max_lines_position = self._get_max_lines_position(max_lines)
+            if max_lines_position is not None:
+                end_position = max_lines_position
+        if start_position >= end_position:
+            return ""
+        if start_position == 0 and end_position == self.get_loaded_length():
+            return self._get_joined_text()
+        first_page_index = bisect.bisect_right(self._page_end_positions, start_position)
+        first_page_start_position = self._page_end_positions[first_page_index - 1] if first_page_index else 0
+        last_page_index = bisect.bisect_left(self._page_end_positions, end_position)
+        text = "".join(self._pages[first_page_index:last_page_index + 1])
+        return text[start_position - first_page_start_position:end_position - first_page_start_position]
+
+    def iter_loaded_text(self, max_lines: int = None) -> Iterator[str]:
+        """
+        Yield the text loaded so far, then load one more page and yield again,
+        until the document (or its first 'max_lines' lines) is fully loaded.
+        Consumers stop iterating as soon as they found what they need.
+
+        NOTE: each text yielded is the whole text loaded so far, the consumers
+        that go through long documents should use 'iter_loaded_positions'.
+        """
+        for _ in self.iter_loaded_positions(max_lines):
+            yield self.get_loaded_text(max_lines)
+
+    def iter_loaded_positions(self, max_lines: int = None) -> Iterator[int]:
+        """
+        Same as 'iter_loaded_text', but yield the end position of the text
+        loaded so far (limited to the first 'max_lines' lines), so the
+        consumers only get the text added since their last position.
+        """
+        last_end_position = None
+        while True:
+            is_done = self.is_loaded(max_lines)
+            end_position = self.get_loaded_length()
+            max_lines_position = None if max_lines is None else self._get_max_lines_position(max_lines)
+            if max_lines_position is not None:
+                end_position = max_lines_position
+            if end_position != last_end_position and (end_position or is_done):
+                last_end_position = end_position
+                yield end_position
+            if is_done:
+                return
+            self.load_next_page()
+
+    def iter_new_text(self) -> Iterator[str]:
+        """
+        Yield the text loaded so far, then only the text of each page as it
+        is loaded (e.g. to process the document page by page).
+        """
+        if self.is_partial():
+            self._load_full_text()
+        if self.get_loaded_length():
+            yield self._get_joined_text()
+        while True:
+            total_pages_loaded = self.get_total_pages_loaded()
+            if not self.load_next_page():
+                return
+            if self.get_total_pages_loaded() != total_pages_loaded:
+                yield self._pages[-1]
+
+    def get_text(self, max_lines: int = None) -> str:
+        """
+        Get the first 'max_lines' lines of the text (or the full text),
+        loading only the pages needed.
+        """
+        for _ in self.iter_loaded_positions(max_lines):
+            pass
+        return self.get_loaded_text(max_lines)
+
+    def get_full_text(self) -> str:
+        if self.is_partial():
+            self._load_full_text()
+        while self.load_next_page():
+            pass
+        return self._get_joined_text()
+
+    def has_text(self) -> bool:
+        """
+        Check if the document has any text, loading pages until some is found.
+        """
+        while not self.get_loaded_length() and self.load_next_page():
+            pass
+        return self.get_loaded_length() > 0
+
+    def search(self, pattern: Union[str, re.Pattern], max_lines: int = None) -> re.Match | None:
+        """
+        Same as 're.search' over the text, loading pages until there is a match.
+
+        A match that reaches the end of the text loaded so far could continue
+        in the next page, so it is only accepted once more text is loaded.
+        """
+        match = None
+        for text in self.iter_loaded_text(max_lines):
+            match = re.search(pattern, text)
+            if match and (match.end() < len(text) or self.is_loaded(max_lines)):
+                return match
+        return match
+
+
+def as_pdf_text_source(pdf_contents: Union[str, PdfTextSource]) -> PdfTextSource:
+    if isinstance(pdf_contents, PdfTextSource):
+        return pdf_contents
+    return PdfTextSource.from_text(pdf_contents)
@@ -0,0 +1,123 @@
+import os
+import queue
+import threading
+import time
+from typing import Iterator
+
+from common.logging import get_logger
+from common.utils import get_file_stat_signature
+from pdf_utils.base import PdfFileFinder
+
+logger = get_logger(__name__)
+
+
+class PdfDirectoryWatcher:
+    """
+    Watches directories for created, modified, moved and deleted PDF files.
+
+    It uses watchdog (inotify/FSEvents/ReadDirectoryChangesW) when installed,
+    otherwise it polls the directories every 'poll_interval' seconds.
+
+    The events of a file are grouped until the file has been quiet for
+    'SETTLE_SECONDS' (a file being downloaded or copied triggers many
+    'modified' events), then its path is yielded once.
+    """
+
+    SETTLE_SECONDS = 0.25
+
+    def __init__(self, directory_list: list[str], poll_interval: float = 1.0):
+        self.directory_list = [
+            os.path.abspath(os.path.expanduser(directory)) for directory in directory_list
+        ]
+        self.poll_interval = poll_interval
+        self.pdf_file_finder = PdfFileFinder.from_settings()
+        self._changed_pdf_files = queue.Queue()  # type: queue.Queue[str]
+        self._stop_event = threading.Event()
+        self._observer = None
+
+    def _on_file_changed(self, file_path: str):
+        if self.pdf_file_finder.is_pdf_file_included(file_path, self.directory_list):
+            self._changed_pdf_files.put(os.path.abspath(file_path))
+
+    def _start_watchdog_observer(self) -> bool:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class _PdfFileEventHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                watcher._on_file_changed(event.src_path)
+                # moved: the old path is gone, the new one may be a PDF file
+                dest_path = getattr(event, "dest_path", None)
+                if dest_path:
+                    watcher._on_file_changed(dest_path)
+
+        self._observer = Observer()
+        for directory in self.directory_list:
+            if os.path.isdir(directory):
+                self._observer.schedule(
+                    _PdfFileEventHandler(), directory, recursive=self.pdf_file_finder.max_depth != 0
+                )
+        self._observer.start()
+        return True
+
+    def _get_pdf_files_stat_signatures(self) -> dict[str, tuple]:
+        stat_signatures = {}
+        for pdf_file_path in self.pdf_file_finder.iter_pdf_files(self.directory_list):
+            try:
+                stat_signatures[pdf_file_path] = get_file_stat_signature(pdf_file_path)
+            except FileNotFoundError:
+                pass
+        return stat_signatures
+
+    def _poll_directories(self):
+        stat_signatures = self._get_pdf_files_stat_signatures()
+        while not self._stop_event.wait(self.poll_interval):
+            new_stat_signatures = self._get_pdf_files_stat_signatures()
+            for pdf_file_path in stat_signatures.keys() | new_stat_signatures.keys():
+                if stat_signatures.get(pdf_file_path) != new_stat_signatures.get(pdf_file_path):
+                    self._on_file_changed(pdf_file_path)
+            stat_signatures = new_stat_signatures
+
+    def start(self):
+        if self._start_watchdog_observer():
+            logger.info("Watching %s (watchdog)", self.directory_list)
+        else:
+            logger.info(
+                "Watching %s (polling every %s s, install 'watchdog' for file system events)",
+                self.directory_list, self.poll_interval,
+            )
+            threading.Thread(target=self._poll_directories, name="PdfDirectoryWatcher", daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def iter_changed_pdf_files(self) -> Iterator[str]:
+        """
+        Yield the path of each changed PDF file once its events have settled
+        (the file may not exist anymore, if it was moved or deleted).
+        Runs until 'stop' is called.
+        """
+        # {pdf_file_path: time of its last event}
+        pending_pdf_files = {}
+        while not self._stop_event.is_set():
+            timeout = self.SETTLE_SECONDS if pending_pdf_files else self.poll_interval
+            try:
+                pdf_file_path = self._changed_pdf_files.get(timeout=timeout)
+                pending_pdf_files[pdf_file_path] = time.monotonic()
+            except queue.Empty:
+                pass
+            settled_time = time.monotonic() - self.SETTLE_SECONDS
+            for pdf_file_path, event_time in list(pending_pdf_files.items()):
+                if event_time <= settled_time:
+                    del pending_pdf_files[pdf_file_path]
+                    yield pdf_file_path
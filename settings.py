@@ -1,10 +1,13 @@
 import os
 import datetime
+from typing import Union
 
 import yaml
 from pathlib import Path
 
 TMP_DIR_NAME = ".tmp"
+# overrides the tmp dir (e.g. to run the benchmarks with an isolated cache)
+TMP_DIR_ENV_VARIABLE = "BANK_ACCOUNT_MANAGER_TMP_DIR"
 CONFIGURATION_DATA = None
 
 
@@ -33,6 +36,11 @@ def get_directory_list_to_look_for_pdfs() -> list:
     return config_data.get("directory_list_to_look_for_pdfs", [])
 
 
+def get_pdf_files_search_configuration() -> dict:
+    config_data = get_configuration_data()
+    return config_data.get("pdf_files_search", None) or {}
+
+
 def get_bank_account_after_date_config() -> datetime.date:
     config_data = get_configuration_data()
     after_date_value = config_data.get("get_bank_accounts_after_date", None)
@@ -66,7 +74,7 @@ def is_credit_account_type_enabled() -> bool:
 
 
 def get_tmp_dir():
-    tmp_dir_path = f"{get_project_root_dir()}/{TMP_DIR_NAME}"
+    tmp_dir_path = os.environ.get(TMP_DIR_ENV_VARIABLE) or f"{get_project_root_dir()}/{TMP_DIR_NAME}"
     os.makedirs(tmp_dir_path, exist_ok=True)
     return tmp_dir_path
 
@@ -74,3 +82,110 @@ def get_tmp_dir():
 def get_log_level() -> str:
     config_data = get_configuration_data()
     return config_data.get("log_level", "INFO")
+
+
+def get_jobs() -> int:
+    config_data = get_configuration_data()
+    return config_data.get("jobs", 1)
+
+
+def get_hash_algorithm() -> str:
+    config_data = get_configuration_data()
+    return config_data.get("hash_algorithm", "blake2b")
+
+
+def get_mapping_table_storage_type() -> str:
+    config_data = get_configuration_data()
+    return config_data.get("mapping_table_storage", "sqlite")
+
+
+def get_ocr_configuration() -> dict:
+    config_data = get_configuration_data()
+    return config_data.get("ocr", None) or {}
+
+
+def get_ocr_batch_size() -> int:
+    return get_ocr_configuration().get("batch_size", 4)
+
+
+def get_ocr_workers() -> int:
+    return get_ocr_configuration().get("workers", min(4, os.cpu_count() or 1))
+
+
+def get_ocr_dpi() -> int:
+    # pdf2image's default
+    return get_ocr_configuration().get("dpi", 200)
+
+
+def is_ocr_grayscale_enabled() -> bool:
+    return bool(get_ocr_configuration().get("grayscale", False))
+
+
+def get_ocr_binarize_threshold() -> Union[int, None]:
+    return get_ocr_configuration().get("binarize_threshold", None)
+
+
+def get_ocr_tesseract_lang() -> Union[str, None]:
+    return get_ocr_configuration().get("tesseract_lang", None)
+
+
+def get_ocr_tesseract_psm() -> Union[int, None]:
+    return get_ocr_configuration().get("tesseract_psm", None)
+
+
+def is_ocr_header_first_enabled() -> bool:
+    return bool(get_ocr_configuration().get("header_first", False))
+
+
+def get_ocr_header_regions() -> dict[str, list[float]]:
+    return get_ocr_configuration().get("header_regions", None) or {}
+
+
+def get_output_configuration() -> dict:
+    config_data = get_configuration_data()
+    return config_data.get("output", None) or {}
+
+
+def get_output_link_mode() -> str:
+    return get_output_configuration().get("link_mode", "copy")
+
+
+def get_output_io_workers() -> int:
+    return get_output_configuration().get("io_workers", 4)
+
+
+def get_pipeline_configuration() -> dict:
+    config_data = get_configuration_data()
+    return config_data.get("pipeline", None) or {}
+
+
+def is_pipeline_enabled() -> bool:
+    return bool(get_pipeline_configuration().get("enabled", True))
+
+
+def get_pipeline_queue_size() -> int:
+    return get_pipeline_configuration().get("queue_size", 8)
+
+
+def is_transactions_extraction_enabled() -> bool:
+    config_data = get_configuration_data()
+    return bool(config_data.get("extract_transactions", True))
+
+
+def is_profile_enabled() -> bool:
+    config_data = get_configuration_data()
+    return bool(config_data.get("profile", False))
+
+
+def is_log_json_lines_enabled() -> bool:
+    config_data = get_configuration_data()
+    return bool(config_data.get("log_json_lines", False))
+
+
+def get_watch_poll_interval() -> float:
+    """
+    Seconds between the scans of the directories in watch mode
+    (only used when 'watchdog' is not installed).
+    """
+    config_data = get_configuration_data()
+    return float(config_data.get("watch_poll_interval", 1.0))
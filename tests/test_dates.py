@@ -0,0 +1,92 @@
+"""
+The date parser ('common.dates') against the 'datetime.strptime' parsing it replaced.
+
+The reference is 'LegacyDateParser' (the sequential 're.match' dispatch +
+'datetime.strptime', kept in 'benchmarks.date_parsing'), over the random date
+strings of the benchmark: both must return the same value or raise the same error.
+"""
+import random
+import unittest
+from datetime import datetime
+
+from benchmarks.date_parsing import LegacyDateParser, generate_date_string
+from common import dates
+
+RANDOM_DATE_STRINGS = 20000
+RANDOM_SEED = 0
+
+
+def _get_outcome(function, date_string: str):
+    try:
+        return "value", function(date_string)
+    except Exception as error:
+        return "error", type(error).__name__, str(error)
+
+
+class TestDateParsing(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(RANDOM_SEED)
+        cls.date_strings = [generate_date_string(rng) for _ in range(RANDOM_DATE_STRINGS)]
+
+    def setUp(self):
+        dates._get_date_data.cache_clear()
+        dates.format_date_string_into_datetime.cache_clear()
+        dates.format_date_period_string_into_datetime_tuple.cache_clear()
+
+    def _assert_same_outcomes(self, legacy_function, function):
+        for date_string in self.date_strings:
+            with self.subTest(date_string=date_string):
+                self.assertEqual(
+                    _get_outcome(legacy_function, date_string),
+                    _get_outcome(function, date_string),
+                )
+
+    def test_get_datetime_data_from_date_string(self):
+        self._assert_same_outcomes(
+            LegacyDateParser.get_datetime_data_from_date_string,
+            dates.get_datetime_data_from_date_string,
+        )
+
+    def test_format_date_string_into_datetime(self):
+        self._assert_same_outcomes(
+            LegacyDateParser.format_date_string_into_datetime,
+            dates.format_date_string_into_datetime,
+        )
+
+    def test_format_date_period_string_into_datetime_tuple(self):
+        self._assert_same_outcomes(
+            LegacyDateParser.format_date_period_string_into_datetime_tuple,
+            dates.format_date_period_string_into_datetime_tuple,
+        )
+
+    def test_random_date_strings_include_valid_periods(self):
+        valid_period_strings = [
+            date_string for date_string in self.date_strings
+            if _get_outcome(dates.format_date_period_string_into_datetime_tuple, date_string)[0] == "value"
+        ]
+        self.assertGreater(len(valid_period_strings), RANDOM_DATE_STRINGS // 10)
+
+    def test_every_day_of_the_year_matches_strptime(self):
+        for year in (2023, 2024):
+            for month_number, spanish_month in dates.MONTH_MAPPING_SPANISH_BY_NUMBER.items():
+                english_month = dates.MONTH_MAPPING_ESP_TO_ENG[spanish_month.lower()]
+                for day in range(1, 32):
+                    date_strings = [
+                        f"{day} de {spanish_month} de {year}",
+                        f"{day:02d}-{spanish_month[:3]}-{year}",
+                        f"{day:02d} {spanish_month[:3].upper()} {year}",
+                        f"{day}/{month_number}/{year}",
+                    ]
+                    expected_outcome = _get_outcome(
+                        lambda _: datetime.strptime(f"{day} {english_month} {year}", "%d %B %Y"), None
+                    )
+                    for date_string in date_strings:
+                        with self.subTest(date_string=date_string):
+                            outcome = _get_outcome(dates.format_date_string_into_datetime, date_string)
+                            self.assertEqual(expected_outcome[:2], outcome[:2])
+
+
+if __name__ == "__main__":
+    unittest.main()